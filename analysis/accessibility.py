@@ -0,0 +1,155 @@
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components, dijkstra
+from data.compact_graph import CompactGraph
+from utils.profiling import profiler
+from config.settings import MAX_GRADE_NBR9050, ACCESS_CACHE_ROWS, ACCESS_BATCH_SIZE
+
+
+class AccessibilityEngine:
+    # Consultas de alcance sobre o grafo segmentado com elevação, com e sem a
+    # restrição de inclinação da NBR 9050. Componentes por limiar descartam de
+    # antemão pares sem caminho; linhas de distância completas ficam num cache
+    # LRU e as que faltam são calculadas em lote por um único dijkstra do scipy.
+    def __init__(self, G_seg_elev, max_grade=MAX_GRADE_NBR9050, weight='length',
+                 cache_rows=ACCESS_CACHE_ROWS, batch_size=ACCESS_BATCH_SIZE):
+        self.graph = G_seg_elev if isinstance(G_seg_elev, CompactGraph) else CompactGraph.from_networkx(G_seg_elev)
+        self.max_grade = max_grade
+        self.weight = weight
+        self.cache_rows = cache_rows
+        self.batch_size = batch_size
+        self._rows_cache = OrderedDict()
+        self._labels = {}
+
+        cg = self.graph
+        self.n = cg.number_of_nodes()
+        self._length = np.nan_to_num(cg.edge_column(weight, 1.0), nan=1.0)
+        self._grade = np.nan_to_num(cg.edge_column('grade_abs', 0.0), nan=0.0)
+        self._full = self._matrix(np.ones(cg.number_of_edges(), dtype=bool))
+        self._accessible = self._matrix(self._grade <= max_grade)
+
+        print(f"[Access] Grafo: N={self.n}, E={cg.number_of_edges()}, "
+              f"{int((self._grade > max_grade).sum())} arestas acima de {max_grade*100:.2f}%")
+
+    def _matrix(self, edge_mask) -> csr_matrix:
+        # arestas paralelas: o csr_matrix soma duplicatas, então fica só a menor
+        cg = self.graph
+        src, dst, w = cg.src[edge_mask], cg.dst[edge_mask], self._length[edge_mask]
+        order = np.lexsort((w, dst, src))
+        src, dst, w = src[order], dst[order], w[order]
+        first = np.ones(len(src), dtype=bool)
+        first[1:] = (src[1:] != src[:-1]) | (dst[1:] != dst[:-1])
+        # peso zero some da matriz esparsa; um epsilon mantém a aresta
+        w = np.maximum(w[first], 1e-9)
+        return csr_matrix((w, (src[first], dst[first])), shape=(self.n, self.n))
+
+    def component_labels(self, max_grade=None) -> np.ndarray:
+        # rótulos de componente (fraca) do grafo só com arestas de inclinação <= max_grade
+        if max_grade is None:
+            max_grade = self.max_grade
+        if max_grade not in self._labels:
+            if max_grade == self.max_grade:
+                A = self._accessible
+            else:
+                A = self._matrix(self._grade <= max_grade)
+            _, labels = connected_components(A, directed=True, connection='weak')
+            profiler.count('components_computed')
+            self._labels[max_grade] = labels
+        return self._labels[max_grade]
+
+    def index_of(self, nodes) -> np.ndarray:
+        return np.fromiter((self.graph.index_of(n) for n in nodes), dtype=np.int64)
+
+    def _compute(self, matrix, idx, limit=np.inf) -> np.ndarray:
+        out = np.empty((len(idx), self.n), dtype=np.float32)
+        for start in range(0, len(idx), self.batch_size):
+            chunk = idx[start:start + self.batch_size]
+            out[start:start + len(chunk)] = dijkstra(matrix, directed=True, indices=chunk, limit=limit)
+            profiler.count('access_sssp', len(chunk))
+        return out
+
+    def _rows(self, idx, accessible=True, limit=np.inf) -> np.ndarray:
+        # Linhas de distância (len(idx) x N); só linhas sem limite entram no cache
+        matrix = self._accessible if accessible else self._full
+        rows = np.empty((len(idx), self.n), dtype=np.float32)
+        missing = []
+        for i, o in enumerate(idx.tolist()):
+            row = self._rows_cache.get((accessible, o))
+            if row is None:
+                missing.append(i)
+            else:
+                self._rows_cache.move_to_end((accessible, o))
+                rows[i] = row
+        if not missing:
+            return rows
+
+        profiler.count('access_cache_misses', len(missing))
+        missing = np.asarray(missing)
+        unique, inverse = np.unique(idx[missing], return_inverse=True)
+        computed = self._compute(matrix, unique, limit)
+        rows[missing] = computed[inverse]
+        if np.isinf(limit) and self.cache_rows > 0:
+            keep = slice(-self.cache_rows, None)
+            for o, row in zip(unique[keep].tolist(), computed[keep]):
+                self._rows_cache[(accessible, o)] = row
+            while len(self._rows_cache) > self.cache_rows:
+                self._rows_cache.popitem(last=False)
+        return rows
+
+    def one_to_many(self, origin, targets, accessible=True) -> np.ndarray:
+        return self.many_to_many([origin], targets, accessible)[0]
+
+    def many_to_many(self, origins, targets, accessible=True) -> np.ndarray:
+        # Matriz de distâncias (origens x destinos), inf quando não há caminho
+        o_idx = self.index_of(origins)
+        t_idx = self.index_of(targets)
+        dist = np.full((len(o_idx), len(t_idx)), np.inf, dtype=np.float32)
+        if accessible:
+            # origens sem nenhum destino na mesma componente nem rodam o dijkstra
+            labels = self.component_labels()
+            useful = np.isin(labels[o_idx], labels[t_idx])
+        else:
+            useful = np.ones(len(o_idx), dtype=bool)
+        if useful.any():
+            dist[useful] = self._rows(o_idx[useful], accessible)[:, t_idx]
+        return dist
+
+    def isochrone(self, origins, max_distance, accessible=True) -> dict:
+        # {origem: (ids dos nós alcançáveis, distâncias)} até max_distance metros
+        o_idx = self.index_of(origins)
+        rows = self._rows(o_idx, accessible, limit=max_distance)
+        result = {}
+        for origin, row in zip(origins, rows):
+            reach = np.flatnonzero(row <= max_distance)
+            result[origin] = (self.graph.node_ids[reach], row[reach])
+        return result
+
+    @profiler.profiled('access.distance_ratio')
+    def distance_ratio(self, origins, targets=None) -> pd.DataFrame:
+        # Por origem: razão entre a distância acessível e a sem restrição para os
+        # destinos alcançáveis nas duas redes, e a fração de destinos que deixam
+        # de ser alcançáveis quando as ladeiras são proibidas.
+        o_idx = self.index_of(origins)
+        t_idx = np.arange(self.n) if targets is None else self.index_of(targets)
+        rows = []
+        for start in range(0, len(o_idx), self.batch_size):
+            chunk = o_idx[start:start + self.batch_size]
+            full = self._rows(chunk, accessible=False)[:, t_idx]
+            acc = self._rows(chunk, accessible=True)[:, t_idx]
+            ids = self.graph.node_ids[chunk].tolist()
+            for i, o in enumerate(chunk.tolist()):
+                both = np.isfinite(acc[i]) & (full[i] > 0)
+                reach_full = np.isfinite(full[i]) & (t_idx != o)
+                ratio = acc[i][both] / full[i][both]
+                rows.append({
+                    'origin': ids[i],
+                    'ratio_mean': float(ratio.mean()) if len(ratio) else np.nan,
+                    'ratio_median': float(np.median(ratio)) if len(ratio) else np.nan,
+                    'ratio_max': float(ratio.max()) if len(ratio) else np.nan,
+                    'reachable_unconstrained': int(reach_full.sum()),
+                    'reachable_accessible': int(both.sum()),
+                    'pct_lost': float(100 * (1 - both.sum() / reach_full.sum())) if reach_full.sum() else 0.0,
+                })
+        return pd.DataFrame(rows)
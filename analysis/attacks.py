@@ -0,0 +1,142 @@
+import heapq
+import numpy as np
+from analysis.centrality import CentralityAnalyzer
+from analysis.dynamic_centrality import DynamicBetweenness
+from config.settings import RANDOM_SEED, ATTACK_BETWEENNESS_K, ATTACK_BATCH_SIZE
+
+
+class AttackStrategy:
+    # Estratégia de ataque: devolve a sequência completa de remoção (índices de
+    # nós ou de arestas da LCC, um CompactGraph não-direcionado e simples).
+    # O PercolationSimulator percorre essa ordem ao contrário com union-find,
+    # então qualquer estratégia nova ganha o mesmo cálculo de G1/G2.
+    target = 'node'
+    name = 'attack'
+
+    def order(self, graph) -> np.ndarray:
+        raise NotImplementedError
+
+
+class RandomNodeAttack(AttackStrategy):
+    name = 'random_node'
+
+    def __init__(self, seed=RANDOM_SEED):
+        self.seed = seed
+
+    def order(self, graph) -> np.ndarray:
+        return np.random.default_rng(self.seed).permutation(graph.number_of_nodes())
+
+
+class DegreeAttack(AttackStrategy):
+    # Estático: grau inicial decrescente. Adaptativo: heap preguiçoso; os graus
+    # só diminuem, então uma entrada desatualizada é reinserida com o grau atual
+    # ao sair do topo, sem reordenar o heap a cada remoção.
+    def __init__(self, adaptive=False):
+        self.adaptive = adaptive
+        self.name = 'degree_adaptive' if adaptive else 'degree'
+
+    def order(self, graph) -> np.ndarray:
+        indptr, nbrs, _ = graph.adjacency()
+        degree = np.diff(indptr)
+        if not self.adaptive:
+            return np.argsort(-degree, kind='stable')
+
+        degree = degree.tolist()
+        indptr, nbrs = indptr.tolist(), nbrs.tolist()
+        removed = [False] * len(degree)
+        heap = [(-d, v) for v, d in enumerate(degree)]
+        heapq.heapify(heap)
+        order = []
+        while heap:
+            d, v = heapq.heappop(heap)
+            if removed[v]:
+                continue
+            if -d != degree[v]:
+                heapq.heappush(heap, (-degree[v], v))
+                continue
+            removed[v] = True
+            order.append(v)
+            for j in range(indptr[v], indptr[v + 1]):
+                w = nbrs[j]
+                if not removed[w]:
+                    degree[w] -= 1
+        return np.asarray(order, dtype=np.int64)
+
+
+class BetweennessAttack(AttackStrategy):
+    # Estático: betweenness (amostrada com k fontes) do grafo intacto.
+    # Adaptativo: DynamicBetweenness recalcula só as fontes afetadas, removendo
+    # `batch` nós por rodada; quando não sobra caminho entre nós distintos, o
+    # restante sai por grau.
+    def __init__(self, adaptive=False, weight='length', k=ATTACK_BETWEENNESS_K,
+                 batch=ATTACK_BATCH_SIZE, seed=RANDOM_SEED):
+        self.adaptive = adaptive
+        self.weight = weight
+        self.k = k
+        self.batch = batch
+        self.seed = seed
+        self.name = 'betweenness_adaptive' if adaptive else 'betweenness'
+
+    def order(self, graph) -> np.ndarray:
+        weight = self.weight if self.weight in graph.edge_data else None
+        if not self.adaptive:
+            # só o array local: o grafo da LCC é compartilhado e não ganha colunas
+            bc = CentralityAnalyzer(graph, n_jobs=1, seed=self.seed).calculate_betweenness_variants(
+                {self.name: weight}, k=self.k, store=False
+            )[self.name]
+            score = np.fromiter(bc.values(), dtype=float, count=len(bc))
+            return np.argsort(-score, kind='stable')
+
+        indptr, nbrs, _ = graph.adjacency()
+        ids = graph.node_ids.tolist()
+        dyn = DynamicBetweenness(graph, weight=weight, k=self.k, seed=self.seed)
+        alive = np.ones(graph.number_of_nodes(), dtype=bool)
+        order = []
+        while alive.any():
+            score = np.where(alive, dyn.total, -1.0)
+            if score.max() <= 0:
+                break
+            top = np.argsort(-score, kind='stable')[:self.batch]
+            top = top[score[top] > 0]
+            alive[top] = False
+            order.extend(top.tolist())
+            dyn.remove_edges([(ids[v], ids[w]) for v in top.tolist()
+                              for w in nbrs[indptr[v]:indptr[v + 1]].tolist()])
+
+        rest = np.flatnonzero(alive)
+        rest = rest[np.argsort(-np.diff(indptr)[rest], kind='stable')]
+        return np.concatenate((np.asarray(order, dtype=np.int64), rest))
+
+
+class EdgeAttributeAttack(AttackStrategy):
+    # Remove arestas pela ordem de um atributo (ex.: length, grade_abs)
+    target = 'edge'
+
+    def __init__(self, attribute='length', descending=True):
+        self.attribute = attribute
+        self.descending = descending
+        self.name = f'edge_{attribute}'
+
+    def order(self, graph) -> np.ndarray:
+        values = np.nan_to_num(graph.edge_column(self.attribute, 0.0), nan=0.0)
+        return np.argsort(-values if self.descending else values, kind='stable')
+
+
+ATTACK_STRATEGIES = {
+    'random_node': RandomNodeAttack,
+    'degree': lambda: DegreeAttack(adaptive=False),
+    'degree_adaptive': lambda: DegreeAttack(adaptive=True),
+    'betweenness': lambda: BetweennessAttack(adaptive=False),
+    'betweenness_adaptive': lambda: BetweennessAttack(adaptive=True),
+    'length': lambda: EdgeAttributeAttack('length'),
+    'grade': lambda: EdgeAttributeAttack('grade_abs'),
+}
+
+
+def get_attack(strategy) -> AttackStrategy:
+    if isinstance(strategy, AttackStrategy):
+        return strategy
+    if strategy not in ATTACK_STRATEGIES:
+        raise ValueError(f"Estratégia de ataque desconhecida: {strategy}. "
+                         f"Opções: {', '.join(ATTACK_STRATEGIES)}")
+    return ATTACK_STRATEGIES[strategy]()
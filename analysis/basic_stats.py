@@ -1,14 +1,179 @@
+from functools import cached_property
 import osmnx as ox
-import networkx as nx
 import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import shortest_path
+from data.compact_graph import CompactGraph
+from utils.profiling import profiler
 
 class NetworkStats:
-    
+
     def __init__(self, G_proj):
+        # Aceita o MultiDiGraph do osmnx ou um CompactGraph. Cada métrica é
+        # calculada no primeiro acesso e memorizada.
         self.G_proj = G_proj
-        self.G_simple = nx.Graph(G_proj)
-        self.stats = ox.basic_stats(G_proj)
-    
+        self._diameters = {}
+        self._ecc_bounds = {}
+
+    @cached_property
+    @profiler.profiled('stats.compact_graph')
+    def compact(self) -> CompactGraph:
+        # conversão O(M) só quando alguma métrica em arrays for pedida
+        if isinstance(self.G_proj, CompactGraph):
+            return self.G_proj
+        return CompactGraph.from_networkx(self.G_proj)
+
+    @cached_property
+    @profiler.profiled('stats.basic_stats')
+    def stats(self) -> dict:
+        if isinstance(self.G_proj, CompactGraph):
+            return self._compact_stats(self.G_proj)
+        return ox.basic_stats(self.G_proj)
+
+    @cached_property
+    @profiler.profiled('stats.simple_graph')
+    def G_simple(self):
+        # versão simples não-direcionada em arrays, sem uma cópia nx.Graph inteira;
+        # entre arestas paralelas fica a mais curta, para as distâncias
+        return self.compact.to_undirected_simple(keep='min_length')
+
+    @cached_property
+    def _lcc(self) -> tuple:
+        mask = self.G_simple.lcc_mask()
+        return mask, self.G_simple.edge_mask(mask)
+
+    def _compact_stats(self, cg) -> dict:
+        if 'street_count' in cg.node_data:
+            street_count = cg.node_data['street_count']
+        else:
+            simple = cg.to_undirected_simple()
+            no_loops = simple.src != simple.dst
+            street_count = np.bincount(np.concatenate((simple.src[no_loops], simple.dst[no_loops])),
+                                       minlength=cg.number_of_nodes())
+        return {
+            'n': cg.number_of_nodes(),
+            'm': cg.number_of_edges(),
+            'intersection_count': int(np.sum(street_count > 1))
+        }
+
+    def _adjacency_matrix(self, weight=None, lcc=False):
+        g = self.G_simple
+        keep = g.src != g.dst
+        n = g.number_of_nodes()
+        relabel = np.arange(n)
+        if lcc:
+            node_mask, edge_mask = self._lcc
+            keep &= edge_mask
+            relabel = np.cumsum(node_mask) - 1
+            n = int(node_mask.sum())
+        src, dst = relabel[g.src[keep]], relabel[g.dst[keep]]
+        if weight is None:
+            data = np.ones(len(src))
+        else:
+            data = np.nan_to_num(g.edge_column(weight, 1.0)[keep], nan=1.0)
+        return csr_matrix((np.concatenate((data, data)), (np.concatenate((src, dst)), np.concatenate((dst, src)))),
+                          shape=(n, n))
+
+    @cached_property
+    def degrees(self) -> np.ndarray:
+        g = self.G_simple
+        return np.bincount(np.concatenate((g.src, g.dst)), minlength=g.number_of_nodes())
+
+    @cached_property
+    @profiler.profiled('stats.clustering')
+    def _clustering(self) -> tuple:
+        # triângulos por nó via A² ∘ A (sem laços, como o networkx)
+        A = self._adjacency_matrix()
+        A.data[:] = 1.0
+        tri = np.asarray((A @ A).multiply(A).sum(axis=1)).ravel() / 2
+        deg = np.asarray(A.sum(axis=1)).ravel()
+        pairs = deg * (deg - 1)
+        clustering = np.divide(2 * tri, pairs, out=np.zeros_like(tri), where=pairs > 0)
+        transitivity = 2 * tri.sum() / pairs.sum() if tri.sum() > 0 else 0.0
+        return float(clustering.mean()), float(transitivity)
+
+    @property
+    def avg_clustering(self) -> float:
+        return self._clustering[0]
+
+    @property
+    def transitivity(self) -> float:
+        return self._clustering[1]
+
+    @property
+    def density(self) -> float:
+        n = self.G_simple.number_of_nodes()
+        return 2 * self.G_simple.number_of_edges() / (n * (n - 1)) if n > 1 else 0
+
+    def diameter(self, weight=None) -> float:
+        # Diâmetro exato da maior componente por iFUB: 4-sweep para escolher
+        # um nó central u e, a partir dele, excentricidades só dos nós mais
+        # distantes até o limite inferior alcançar 2·d(u, restante).
+        if weight not in self._diameters:
+            with profiler.stage('stats.diameter', weight=weight):
+                self._diameters[weight] = self._ifub(weight)
+        return self._diameters[weight]
+
+    def eccentricity_bounds(self, weight=None) -> tuple:
+        # (ids dos nós da LCC, limite inferior, limite superior) acumulados nas buscas do iFUB
+        self.diameter(weight)
+        lower, upper = self._ecc_bounds[weight]
+        node_mask, _ = self._lcc
+        return self.G_simple.node_ids[node_mask], lower, upper
+
+    def _ifub(self, weight, batch=16) -> float:
+        A = self._adjacency_matrix(weight, lcc=True)
+        n = A.shape[0]
+        unweighted = weight is None
+        lower = np.zeros(n)
+        upper = np.full(n, np.inf)
+
+        def sssp(sources):
+            profiler.count('diameter_sssp', len(sources))
+            dist, pred = shortest_path(A, directed=False, unweighted=unweighted,
+                                       indices=sources, return_predecessors=True)
+            dist = np.atleast_2d(dist)
+            ecc = dist.max(axis=1)
+            for d, e in zip(dist, ecc):
+                np.maximum(lower, np.maximum(d, e - d), out=lower)
+                np.minimum(upper, e + d, out=upper)
+            return dist, np.atleast_2d(pred), ecc
+
+        def midpoint(a, dist_a, pred_a):
+            target = int(np.argmax(dist_a))
+            path = [target]
+            while path[-1] != a:
+                path.append(int(pred_a[path[-1]]))
+            return path[len(path) // 2], target
+
+        lb = 0.0
+        r = int(np.argmax(np.diff(A.indptr)))
+        for _ in range(2):
+            dist_r, _, _ = sssp([r])
+            a = int(np.argmax(dist_r[0]))
+            dist_a, pred_a, ecc_a = sssp([a])
+            lb = max(lb, float(ecc_a[0]))
+            r, _ = midpoint(a, dist_a[0], pred_a[0])
+
+        u = r
+        dist_u, _, ecc_u = sssp([u])
+        dist_u = dist_u[0]
+        lb = max(lb, float(ecc_u[0]))
+        ub = 2 * float(ecc_u[0])
+
+        order = np.argsort(-dist_u, kind='stable')
+        i = 0
+        while i < n and lb < ub:
+            if lb >= 2 * dist_u[order[i]]:
+                ub = lb
+                break
+            chunk = order[i:i + batch]
+            _, _, ecc = sssp(chunk)
+            lb = max(lb, float(ecc.max()))
+            i += len(chunk)
+        self._ecc_bounds[weight] = (lower, upper)
+        return lb
+
     def get_basic_metrics(self) -> dict:
         return {
             'nodes': self.stats['n'],
@@ -16,27 +181,28 @@ class NetworkStats:
             'intersections': self.stats['intersection_count'],
             'dead_ends': self.stats['n'] - self.stats['intersection_count']
         }
-    
-    def get_metrics(self) -> dict:
-        degrees = [d for n, d in self.G_simple.degree()]
-        return {
+
+    def get_metrics(self, clustering: bool = True, diameter: bool = True) -> dict:
+        metrics = {
             'nodes': self.stats['n'],
             'edges': self.stats['m'],
-            'avg_degree': np.mean(degrees),
-            'avg_clustering': nx.average_clustering(self.G_simple),
-            'transitivity': nx.transitivity(self.G_simple),
-            'density': nx.density(self.G_simple),
-            'diameter_topo': f"{nx.diameter(self.G_simple):.2f}",
-            'diameter_meters': f"{nx.diameter(self.G_simple, weight='length'):.2f}"
+            'avg_degree': np.mean(self.degrees),
         }
-    
+        if clustering:
+            metrics['avg_clustering'] = self.avg_clustering
+            metrics['transitivity'] = self.transitivity
+        metrics['density'] = self.density
+        if diameter:
+            metrics['diameter_topo'] = f"{self.diameter():.2f}"
+            metrics['diameter_meters'] = f"{self.diameter(weight='length'):.2f}"
+        return metrics
+
     def get_gcc_info(self) -> dict:
-        components = sorted(nx.connected_components(self.G_simple), 
-                          key=len, reverse=True)
-        gcc_nodes = components[0]
-        
+        mask, _ = self._lcc
+        gcc_nodes = set(self.G_simple.node_ids[mask].tolist())
+
         return {
             'gcc_size': len(gcc_nodes),
-            'gcc_percentage': (len(gcc_nodes) / len(self.G_simple)) * 100,
+            'gcc_percentage': (len(gcc_nodes) / self.G_simple.number_of_nodes()) * 100,
             'gcc_nodes': gcc_nodes
-        }
\ No newline at end of file
+        }
@@ -1,23 +1,292 @@
+import heapq
+import math
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import networkx as nx
+import numpy as np
 import pandas as pd
+from config.settings import RANDOM_SEED, NUM_WORKERS
+from data.compact_graph import CompactGraph
+from utils.profiling import profiler
+
+# Grafo em CSR (listas Python), enviado uma única vez a cada processo do pool
+_worker_graph = {}
+
+def _init_worker(indptr, indices, weights):
+    _worker_graph['indptr'] = indptr.tolist()
+    _worker_graph['indices'] = indices.tolist()
+    _worker_graph['weights'] = {w: col.tolist() for w, col in weights.items()}
+
+def _single_source_dependencies(s, n, indptr, indices, lengths, return_dist=False):
+    # Brandes: caminhos mínimos a partir de s (BFS ou Dijkstra) + acumulação;
+    # com return_dist devolve também as distâncias (inf se inalcançável)
+    sigma = [0.0] * n
+    preds = [[] for _ in range(n)]
+    order = []
+    sigma[s] = 1.0
+
+    if lengths is None:
+        dist = [-1] * n
+        dist[s] = 0
+        queue = deque([s])
+        while queue:
+            v = queue.popleft()
+            order.append(v)
+            dv = dist[v] + 1
+            for j in range(indptr[v], indptr[v + 1]):
+                w = indices[j]
+                if dist[w] < 0:
+                    dist[w] = dv
+                    queue.append(w)
+                if dist[w] == dv:
+                    sigma[w] += sigma[v]
+                    preds[w].append(v)
+    else:
+        dist = {}
+        seen = {s: 0.0}
+        c = 0
+        heap = [(0.0, c, s, s)]
+        while heap:
+            d, _, pred, v = heapq.heappop(heap)
+            if v in dist:
+                continue
+            if pred != v:
+                sigma[v] += sigma[pred]
+            order.append(v)
+            dist[v] = d
+            for j in range(indptr[v], indptr[v + 1]):
+                w = indices[j]
+                vw = d + lengths[j]
+                if w not in dist and (w not in seen or vw < seen[w]):
+                    seen[w] = vw
+                    c += 1
+                    heapq.heappush(heap, (vw, c, v, w))
+                    sigma[w] = 0.0
+                    preds[w] = [v]
+                elif vw == seen[w]:
+                    sigma[w] += sigma[v]
+                    preds[w].append(v)
+
+    delta = [0.0] * n
+    for w in reversed(order):
+        coeff = (1.0 + delta[w]) / sigma[w]
+        for v in preds[w]:
+            delta[v] += sigma[v] * coeff
+    delta[s] = 0.0
+    if not return_dist:
+        return delta
+
+    if lengths is None:
+        dist_arr = np.asarray(dist, dtype=float)
+        dist_arr[dist_arr < 0] = np.inf
+    else:
+        dist_arr = np.full(n, np.inf)
+        dist_arr[list(dist)] = list(dist.values())
+    return delta, dist_arr
+
+def _accumulate_sources(sources, variants) -> dict:
+    indptr = _worker_graph['indptr']
+    indices = _worker_graph['indices']
+    n = len(indptr) - 1
+    partial = {}
+    for weight in variants:
+        lengths = _worker_graph['weights'][weight] if weight is not None else None
+        total = np.zeros(n)
+        total_sq = np.zeros(n)
+        for s in sources:
+            delta = np.asarray(_single_source_dependencies(s, n, indptr, indices, lengths))
+            total += delta
+            total_sq += delta * delta
+        partial[weight] = (total, total_sq)
+    return partial
+
 
 class CentralityAnalyzer:
-    
-    def __init__(self, G_proj):
+
+    def __init__(self, G_proj, n_jobs=NUM_WORKERS, seed=RANDOM_SEED):
         self.G_proj = G_proj
-    
-    def calculate_betweenness(self, weight='length', normalized=True, attribute='betweenness') -> dict:
-        bc = nx.betweenness_centrality(self.G_proj, weight=weight, normalized=normalized)
-        nx.set_node_attributes(self.G_proj, bc, attribute)
-        return bc
-    
+        self.n_jobs = n_jobs
+        self.seed = seed
+        self.sampling_info = {}
+        self._csr_cache = {}
+
+    @profiler.profiled('centrality.to_csr')
+    def _to_csr(self, weights) -> tuple:
+        # Arestas paralelas colapsam no menor peso, como o Dijkstra do networkx
+        key = tuple(sorted(weights))
+        if key not in self._csr_cache and isinstance(self.G_proj, CompactGraph):
+            self._csr_cache[key] = self._compact_csr(weights)
+        if key not in self._csr_cache:
+            nodes = list(self.G_proj.nodes())
+            index = {node: i for i, node in enumerate(nodes)}
+            indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+            indices = []
+            cols = {w: [] for w in weights}
+            for i, u in enumerate(nodes):
+                for v, edata in self.G_proj.adj[u].items():
+                    indices.append(index[v])
+                    attrs = edata.values() if self.G_proj.is_multigraph() else [edata]
+                    for w in weights:
+                        cols[w].append(min(d.get(w, 1) for d in attrs))
+                indptr[i + 1] = len(indices)
+            self._csr_cache[key] = (
+                nodes, indptr, np.asarray(indices, dtype=np.int64),
+                {w: np.asarray(c, dtype=float) for w, c in cols.items()}
+            )
+        return self._csr_cache[key]
+
+    def _compact_csr(self, weights) -> tuple:
+        cg = self.G_proj
+        indptr, nbrs, eids = cg.adjacency()
+        n = cg.number_of_nodes()
+        src = np.repeat(np.arange(n), np.diff(indptr))
+        order = np.lexsort((nbrs, src))
+        pair = src[order] * n + nbrs[order]
+        starts = np.flatnonzero(np.concatenate(([True], pair[1:] != pair[:-1])))
+        cols = {}
+        for w in weights:
+            col = np.nan_to_num(cg.edge_column(w, 1.0), nan=1.0)[eids[order]]
+            cols[w] = np.minimum.reduceat(col, starts) if len(starts) else col
+        indptr = np.concatenate(([0], np.cumsum(np.bincount(src[order][starts], minlength=n))))
+        return list(cg.node_ids.tolist()), indptr, nbrs[order][starts], cols
+
+    def _run_sources(self, pool, sources, variants, n) -> dict:
+        chunks = np.array_split(sources, max(1, min(len(sources), (self.n_jobs or 1) * 4)))
+        chunks = [c.tolist() for c in chunks if len(c)]
+        totals = {w: (np.zeros(n), np.zeros(n)) for w in variants}
+        profiler.count('betweenness_sources', len(sources))
+        if pool is None:
+            results = map(_accumulate_sources, chunks, [variants] * len(chunks))
+        else:
+            results = pool.map(_accumulate_sources, chunks, [variants] * len(chunks))
+        for partial in results:
+            for w in variants:
+                totals[w][0][:] += partial[w][0]
+                totals[w][1][:] += partial[w][1]
+        return totals
+
+    @profiler.profiled('centrality.betweenness')
+    def calculate_betweenness_variants(self, variants: dict, normalized=True, k=None,
+                                       epsilon=None, delta=0.1, store=True) -> dict:
+        # variants: {atributo: peso}; todas as variantes compartilham a conversão
+        # para CSR, o pool de processos e o mesmo conjunto de fontes amostradas.
+        # store=False não grava os atributos no grafo recebido.
+        weights = [w for w in set(variants.values()) if w is not None]
+        csr = self._to_csr(weights)
+        nodes = csr[0]
+        n = len(nodes)
+        rng = np.random.default_rng(self.seed)
+        value_range = n / (n - 1) if n > 1 else 1.0
+
+        if epsilon is not None:
+            # Hoeffding + união sobre os n nós: limite superior de fontes
+            k_max = math.ceil(value_range ** 2 * math.log(2 * n / delta) / (2 * epsilon ** 2))
+        else:
+            k_max = n if k is None else min(k, n)
+        k_max = min(k_max, n)
+        sources = rng.permutation(n)[:k_max] if k_max < n else np.arange(n)
+
+        weight_list = list(dict.fromkeys(variants.values()))
+        n_jobs = max(1, self.n_jobs or 1)
+        pool = None
+        _, indptr, indices, w_cols = csr
+        if n_jobs > 1:
+            pool = ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                                       initargs=(indptr, indices, w_cols))
+        else:
+            _init_worker(indptr, indices, w_cols)
+        try:
+            if epsilon is not None and k_max < n:
+                totals, used, eps_achieved = self._adaptive_sampling(
+                    pool, sources, weight_list, n, epsilon, delta, value_range
+                )
+            else:
+                totals = self._run_sources(pool, sources, weight_list, n)
+                used = len(sources)
+                eps_achieved = 0.0
+                if used < n:
+                    eps_achieved = value_range * math.sqrt(math.log(2 * n / delta) / (2 * used))
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        directed = self.G_proj.is_directed()
+        if normalized:
+            scale = 1 / ((n - 1) * (n - 2)) if n > 2 else 1.0
+        else:
+            scale = 1.0 if directed else 0.5
+        if used < n:
+            scale *= n / used
+
+        results = {}
+        for attribute, weight in variants.items():
+            values = totals[weight][0] * scale
+            bc = dict(zip(nodes, values.tolist()))
+            if store:
+                self._store(bc, attribute)
+            self.sampling_info[attribute] = {'k': used, 'epsilon': eps_achieved, 'delta': delta}
+            results[attribute] = bc
+        return results
+
+    def _adaptive_sampling(self, pool, sources, weight_list, n, epsilon, delta, value_range):
+        # Amostragem progressiva (tamanho dobrando) com parada pelo limite de
+        # Bernstein empírico; na pior hipótese chega ao k de Hoeffding.
+        n_checks = max(1, math.ceil(math.log2(max(2, len(sources) / 64))) + 1)
+        log_term = math.log(2 * n * n_checks * len(weight_list) / delta)
+        norm = n / ((n - 1) * (n - 2)) if n > 2 else 1.0
+
+        totals = {w: (np.zeros(n), np.zeros(n)) for w in weight_list}
+        used = 0
+        worst = value_range
+        batch = min(64, len(sources))
+        while used < len(sources):
+            new = self._run_sources(pool, sources[used:used + batch], weight_list, n)
+            for w in weight_list:
+                totals[w][0][:] += new[w][0]
+                totals[w][1][:] += new[w][1]
+            used = min(len(sources), used + batch)
+            batch = used
+
+            if used < 2:
+                continue
+            bounds = []
+            for w in weight_list:
+                mean = totals[w][0] * norm / used
+                # variância amostral (não viesada), como pede o limite de Maurer-Pontil
+                var = np.maximum(totals[w][1] * norm * norm / used - mean * mean, 0.0) * used / (used - 1)
+                bound = np.sqrt(2 * var * log_term / used) + 7 * value_range * log_term / (3 * (used - 1))
+                bounds.append(float(bound.max()))
+            worst = max(bounds)
+            if worst <= epsilon:
+                break
+        if used == len(sources):
+            # esgotou o orçamento de Hoeffding: vale o limite garantido por ele
+            worst = value_range * math.sqrt(math.log(2 * n / delta) / (2 * used))
+        return totals, used, worst
+
+    def _store(self, bc, attribute):
+        if isinstance(self.G_proj, CompactGraph):
+            self.G_proj.node_data[attribute] = np.fromiter(bc.values(), dtype=float, count=len(bc))
+        else:
+            nx.set_node_attributes(self.G_proj, bc, attribute)
+
+    def calculate_betweenness(self, weight='length', normalized=True, attribute='betweenness',
+                              k=None, epsilon=None, delta=0.1) -> dict:
+        return self.calculate_betweenness_variants(
+            {attribute: weight}, normalized=normalized, k=k, epsilon=epsilon, delta=delta
+        )[attribute]
+
     def get_top_nodes(self, centrality_dict: dict, n: int = 5) -> pd.Series:
         return pd.Series(centrality_dict).sort_values(ascending=False).head(n)
-    
+
     def get_node_info(self, node_id) -> dict:
-        node_data = self.G_proj.nodes[node_id]
+        if isinstance(self.G_proj, CompactGraph):
+            i = self.G_proj.index_of(node_id)
+            node_data = {k: col[i] for k, col in self.G_proj.node_data.items()}
+        else:
+            node_data = self.G_proj.nodes[node_id]
         return {
             'id': node_id,
             'lat': node_data.get('y'),
             'lon': node_data.get('x')
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,133 @@
+import numpy as np
+from tqdm import tqdm
+from analysis.centrality import CentralityAnalyzer, _single_source_dependencies
+from utils.profiling import profiler
+from config.settings import RANDOM_SEED
+
+
+class DynamicBetweenness:
+    # Betweenness (exato ou com k fontes amostradas) mantida sob remoção de
+    # arestas. Para cada fonte guarda as distâncias e as dependências de Brandes;
+    # um arco v->w está no DAG de caminhos mínimos da fonte s sse
+    # d_s(v) + l(v,w) == d_s(w). Ao remover uma aresta, só as fontes cujo DAG a
+    # continha são recalculadas. Memória: 2 · k · N floats.
+    def __init__(self, G, weight='length', k=None, normalized=True, seed=RANDOM_SEED):
+        self.G = G
+        self.weight = weight
+        analyzer = CentralityAnalyzer(G, seed=seed)
+        nodes, indptr, indices, cols = analyzer._to_csr([weight] if weight is not None else [])
+        self.nodes = nodes
+        self.n = n = len(nodes)
+        self.index = {node: i for i, node in enumerate(nodes)}
+
+        # listas Python mutáveis: um arco removido vira um laço v->v de peso
+        # infinito, que o Brandes ignora sem custo extra no laço interno
+        self.indptr = indptr.tolist()
+        self.indices = indices.tolist()
+        self.lengths = cols[weight].tolist() if weight is not None else None
+        self._tails = np.repeat(np.arange(n), np.diff(indptr))
+        self._heads = indices.copy()
+        self._arc_len = cols[weight].copy() if weight is not None else np.ones(len(indices))
+
+        # mesmas fontes que CentralityAnalyzer.calculate_betweenness(k=k, seed=seed)
+        rng = np.random.default_rng(seed)
+        k = n if k is None else min(k, n)
+        self.sources = rng.permutation(n)[:k] if k < n else np.arange(n)
+
+        if normalized:
+            scale = 1 / ((n - 1) * (n - 2)) if n > 2 else 1.0
+        else:
+            scale = 1.0 if G.is_directed() else 0.5
+        self.scale = scale * (n / len(self.sources))
+
+        print(f"[Centrality] Betweenness dinâmica: {len(self.sources)} fontes, N={n}, arcos={len(indices)}")
+        self.dist = np.empty((len(self.sources), n))
+        self.delta = np.empty((len(self.sources), n))
+        for i in tqdm(range(len(self.sources)), desc="Fontes"):
+            self._compute(i)
+        self.total = self.delta.sum(axis=0)
+        self.removed = []
+
+    def _compute(self, i):
+        delta, dist = _single_source_dependencies(
+            int(self.sources[i]), self.n, self.indptr, self.indices, self.lengths, return_dist=True
+        )
+        self.delta[i] = delta
+        self.dist[i] = dist
+
+    def _arcs(self, u, v) -> np.ndarray:
+        # posições CSR ativas de u->v e v->u (uma rua fechada nos dois sentidos)
+        a, b = self.index[u], self.index[v]
+        found = []
+        for x, y in ((a, b), (b, a)):
+            lo, hi = self.indptr[x], self.indptr[x + 1]
+            found.append(lo + np.flatnonzero(self._heads[lo:hi] == y))
+        return np.unique(np.concatenate(found))
+
+    def affected_sources(self, u, v) -> np.ndarray:
+        arcs = self._arcs(u, v)
+        affected = np.zeros(len(self.sources), dtype=bool)
+        for j in arcs.tolist():
+            t, h = self._tails[j], self._heads[j]
+            affected |= np.isfinite(self.dist[:, h]) & (self.dist[:, t] + self._arc_len[j] == self.dist[:, h])
+        return np.flatnonzero(affected)
+
+    def remove_edges(self, edges) -> int:
+        # Remove um lote de arestas e recalcula uma única vez cada fonte afetada
+        # por qualquer uma delas: o DAG de uma fonte não afetada não muda, então
+        # o teste das arestas seguintes continua válido. Devolve o nº de recálculos.
+        affected = np.zeros(len(self.sources), dtype=bool)
+        for u, v in edges:
+            arcs = self._arcs(u, v)
+            if len(arcs) == 0:
+                continue
+            affected[self.affected_sources(u, v)] = True
+            for j in arcs.tolist():
+                self.indices[j] = int(self._tails[j])
+                self._heads[j] = -1
+                if self.lengths is not None:
+                    self.lengths[j] = float('inf')
+            self.removed.append((u, v))
+
+        affected = np.flatnonzero(affected)
+        if len(affected):
+            old = self.delta[affected].sum(axis=0)
+            for i in affected.tolist():
+                self._compute(i)
+            self.total += self.delta[affected].sum(axis=0) - old
+        profiler.count('dynamic_bc_removals', len(edges))
+        profiler.count('dynamic_bc_recomputed_sources', len(affected))
+        return len(affected)
+
+    def remove_edge(self, u, v) -> int:
+        return self.remove_edges([(u, v)])
+
+    def values(self) -> dict:
+        return dict(zip(self.nodes, (self.total * self.scale).tolist()))
+
+    @profiler.profiled('centrality.dynamic_trajectory')
+    def trajectory(self, removals, every=1, track=None) -> dict:
+        # Remove as arestas na ordem dada (ex.: removed_edges de
+        # run_targeted_percolation) em lotes de `every` e registra a betweenness
+        # após cada lote, para todos os nós ou só os de `track`.
+        cols = np.arange(self.n) if track is None else np.fromiter(
+            (self.index[t] for t in track), dtype=np.int64)
+        removals = list(removals)
+        steps = [0]
+        recomputed = [0]
+        snapshots = [self.total[cols] * self.scale]
+        for start in tqdm(range(0, len(removals), every), desc="Removendo arestas"):
+            batch = removals[start:start + every]
+            recomputed.append(self.remove_edges(batch))
+            steps.append(start + len(batch))
+            snapshots.append(self.total[cols] * self.scale)
+
+        print(f"[Centrality] {len(removals)} remoções, {sum(recomputed)} recálculos de fonte "
+              f"(de {len(removals) * len(self.sources)} no recálculo completo)")
+        return {
+            'nodes': [self.nodes[c] for c in cols.tolist()],
+            'steps': np.asarray(steps),
+            'removed_edges': removals,
+            'recomputed_sources': np.asarray(recomputed),
+            'betweenness': np.vstack(snapshots),
+        }
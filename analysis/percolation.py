@@ -1,99 +1,350 @@
+import hashlib
+import json
+import os
 import numpy as np
-import networkx as nx
+from concurrent.futures import ProcessPoolExecutor
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import shortest_path
+from scipy.stats import norm as norm_dist
 from tqdm import tqdm
+from analysis.union_find import percolation_curve, node_percolation_curve
+from analysis.attacks import get_attack
+from data.compact_graph import CompactGraph
+from utils.profiling import profiler
+from config.settings import (
+    RANDOM_SEED, NUM_WORKERS, MC_CI_WIDTH, MC_MAX_SIMULATIONS, MC_BATCH_SIZE, MC_CONFIDENCE, MC_CHECKPOINT_DIR,
+    FRACTION_COARSE_STEPS, FRACTION_RESOLUTION, FSS_SIZES, FSS_NU
+)
+
+# Grafo em forma de arrays, enviado uma única vez a cada processo do pool
+_worker_graph = {}
+
+def _init_worker(n, src, dst):
+    _worker_graph['n'] = n
+    _worker_graph['src'] = src
+    _worker_graph['dst'] = dst
+
+def _run_realizations(seeds, positions=None) -> tuple:
+    # Somas inteiras das curvas completas e, se positions for dado, os valores
+    # de cada realização nessas posições (nº de arestas presentes)
+    n, src, dst = _worker_graph['n'], _worker_graph['src'], _worker_graph['dst']
+    sum_G1 = np.zeros(len(src) + 1, dtype=np.int64)
+    sum_G2 = np.zeros(len(src) + 1, dtype=np.int64)
+    samples = None if positions is None else np.empty((len(seeds), len(positions), 2), dtype=np.int32)
+    for i, seed in enumerate(seeds):
+        order = np.random.default_rng(seed).permutation(len(src))
+        g1, g2 = percolation_curve(n, src, dst, order)
+        sum_G1 += g1
+        sum_G2 += g2
+        if samples is not None:
+            samples[i, :, 0] = g1[positions]
+            samples[i, :, 1] = g2[positions]
+    return len(seeds), sum_G1, sum_G2, samples
+
+def refine_fractions(curve_G1, curve_G2, total, coarse=FRACTION_COARSE_STEPS,
+                     resolution=FRACTION_RESOLUTION) -> np.ndarray:
+    # Grade adaptativa: começa com `coarse` pontos e, a cada rodada, bissecta
+    # os intervalos vizinhos ao pico de G2 e o de maior queda de G1 dentro de
+    # um intervalo de busca que só encolhe (o ruído do pico não faz a busca
+    # voltar para trás), até a largura ficar abaixo de `resolution`. As curvas
+    # são indexadas pelo nº de removidos; a fração é esse nº dividido por `total`.
+    removable = len(curve_G1) - 1
+    resolution = max(resolution, 1 / total)
+    grid = set(np.linspace(0, removable / total, max(2, coarse)).tolist())
+    lo, hi = 0.0, removable / total
+    while True:
+        f = np.array(sorted(x for x in grid if lo <= x <= hi))
+        idx = np.minimum((total * f).astype(np.int64), removable)
+        g1, g2 = curve_G1[idx], curve_G2[idx]
+        peak = int(np.argmax(g2))
+        steep = int(np.argmax(g1[:-1] - g1[1:])) if len(f) > 1 else 0
+        first, last = max(0, min(peak - 1, steep)), min(len(f) - 1, max(peak + 1, steep + 1))
+        lo, hi = f[first], f[last]
+        new = [(f[i] + f[i + 1]) / 2 for i in {peak - 1, peak, steep}
+               if first <= i < last and f[i + 1] - f[i] > resolution]
+        if not new:
+            return np.array(sorted(grid))
+        grid.update(new)
 
 class PercolationSimulator:
-    def __init__(self, G_simple, G_simple_segmented=None, num_simulations=100):
-        self.G_lcc = self._extract_lcc(G_simple)
-        self.N_lcc = self.G_lcc.number_of_nodes()
-        self.M_lcc = self.G_lcc.number_of_edges()
+    @profiler.profiled('percolation.init')
+    def __init__(self, G_simple, G_simple_segmented=None, num_simulations=100,
+                 seed=RANDOM_SEED, n_jobs=NUM_WORKERS):
+        # Aceita grafos networkx ou CompactGraph; a LCC é guardada como máscara
+        self.lcc = self._extract_lcc(G_simple)
+        self.N_lcc = len(self.lcc['nodes'])
+        self.M_lcc = len(self.lcc['edges'])
         
         if G_simple_segmented is not None:
-            self.G_lcc_seg = self._extract_lcc(G_simple_segmented)
-            self.N_seg = self.G_lcc_seg.number_of_nodes()
-            self.M_seg = self.G_lcc_seg.number_of_edges()
+            self.lcc_seg = self._extract_lcc(G_simple_segmented)
+            self.N_seg = len(self.lcc_seg['nodes'])
+            self.M_seg = len(self.lcc_seg['edges'])
         else:
-            self.G_lcc_seg = None
+            self.lcc_seg = None
             self.N_seg = 0
             self.M_seg = 0
         
         self.num_simulations = num_simulations
+        self.seed = seed
+        self.n_jobs = n_jobs
         
         print(f"[Percolation] LCC original: N={self.N_lcc}, E={self.M_lcc}")
-        if self.G_lcc_seg:
+        if self.lcc_seg:
             print(f"[Percolation] LCC segmentado: N={self.N_seg}, E={self.M_seg}")
     
-    def _extract_lcc(self, G):
-        if G.is_directed():
-            G_u = G.to_undirected()
-        else:
-            G_u = G.copy()
+    def _extract_lcc(self, G) -> dict:
+        cg = G if isinstance(G, CompactGraph) else CompactGraph.from_networkx(G)
+        if cg.is_directed():
+            cg = cg.to_undirected_simple()
         
-        comps = sorted(nx.connected_components(G_u), key=len, reverse=True)
-        if not comps:
+        if cg.number_of_nodes() == 0:
             raise ValueError("Grafo vazio ou sem componentes conectados.")
+        node_mask = cg.lcc_mask()
+        edge_mask = cg.edge_mask(node_mask)
         
-        return G_u.subgraph(comps[0]).copy()
+        # índices 0..N_lcc-1 dentro da LCC, sem copiar o grafo
+        relabel = np.cumsum(node_mask) - 1
+        edges = np.flatnonzero(edge_mask)
+        return {
+            'graph': cg,
+            'nodes': np.flatnonzero(node_mask),
+            'edges': edges,
+            'src': relabel[cg.src[edges]],
+            'dst': relabel[cg.dst[edges]],
+        }
     
-    def run_simulation(self, fractions: np.ndarray) -> dict:
+    @profiler.profiled('percolation.random')
+    def run_simulation(self, fractions=None, ci_width=MC_CI_WIDTH, max_simulations=MC_MAX_SIMULATIONS,
+                       checkpoint_dir=MC_CHECKPOINT_DIR) -> dict:
+        # fractions=None: grade adaptativa (refine_fractions) escolhida a partir
+        # de uma rodada piloto e refinada de novo nas curvas finais. ci_width=None: exatamente num_simulations
+        # realizações. Com ci_width, roda em rodadas de MC_BATCH_SIZE até o IC
+        # (MC_CONFIDENCE) de G1/N e G2/N ficar mais estreito que ci_width em
+        # todas as frações, entre num_simulations e max_simulations realizações.
         print(f"[Percolation] Simulando percolação aleatória (N={self.N_lcc}, E={self.M_lcc})...")
-        results_G1 = {f: [] for f in fractions}
-        results_G2 = {f: [] for f in fractions}
-        
-        for f in tqdm(fractions, desc="Simulando"):
-            num_edges_to_remove = int(self.M_lcc * f)
-            
-            for _ in range(self.num_simulations):
-                g1, g2 = self._simulate_removal(num_edges_to_remove)
-                results_G1[f].append(g1)
-                results_G2[f].append(g2)
-        
-        return self._process_results(fractions, results_G1, results_G2)
-    
-    def _simulate_removal(self, num_edges: int) -> tuple:
-        H = self.G_lcc.copy()
+        src = self.lcc['src'].astype(np.int32)
+        dst = self.lcc['dst'].astype(np.int32)
+        recentre = fractions is None
+        if recentre:
+            fractions = self._pilot_fractions(src, dst)
+        fractions = np.asarray(fractions, dtype=float)
+        num_removed = np.clip((self.M_lcc * fractions).astype(np.int64), 0, self.M_lcc)
+        positions = self.M_lcc - num_removed
+        
+        adaptive = ci_width is not None
+        total = max(max_simulations, self.num_simulations) if adaptive else self.num_simulations
+        z = norm_dist.ppf(0.5 + MC_CONFIDENCE / 2)
         
-        if num_edges > 0:
-            edges = list(H.edges())
-            num_edges = min(num_edges, len(edges))
-            if num_edges > 0:
-                indices = np.random.choice(len(edges), num_edges, replace=False)
-                H.remove_edges_from([edges[i] for i in indices])
+        # Uma stream independente por realização: a realização i usa sempre o
+        # filho i da SeedSequence, então rodadas, retomadas e nº de workers não
+        # mudam o resultado (as somas são inteiras).
+        seeds = np.random.SeedSequence(self.seed).spawn(total)
+        state = self._open_checkpoint(checkpoint_dir, total, fractions)
+        samples, sum_G1, sum_G2, done = state['samples'], state['sum_G1'], state['sum_G2'], state['done']
+        if done:
+            print(f"[Percolation] Retomando do checkpoint: {done} realizações já feitas")
+        
+        n_jobs = max(1, self.n_jobs or 1)
+        # rodadas de MC_BATCH_SIZE também no modo de nº fixo: cada rodada grava
+        # o checkpoint, então uma execução interrompida retoma de onde parou
+        round_size = max(1, MC_BATCH_SIZE)
+        halfwidth = np.inf
+        pool = None
+        if n_jobs > 1:
+            pool = ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                                       initargs=(self.N_lcc, src, dst))
+        else:
+            _init_worker(self.N_lcc, src, dst)
         
-        comps = sorted(nx.connected_components(H), key=len, reverse=True)
+        # Newman-Ziff: uma ordem aleatória por realização, arestas readicionadas
+        # com union-find; a curva completa sai de uma única passada O(M·α(N)).
+        try:
+            with tqdm(total=total, initial=done, desc="Simulando") as pbar:
+                while done < total:
+                    # rodadas alinhadas em múltiplos de round_size: uma execução
+                    # retomada para nos mesmos pontos que uma ininterrupta
+                    if adaptive and done % round_size == 0 and done >= max(2, self.num_simulations):
+                        halfwidth = self._ci_halfwidth(samples[:done], z)
+                        if halfwidth <= ci_width / 2:
+                            break
+                    end = min(total, (done // round_size + 1) * round_size)
+                    chunk = max(1, (end - done) // (n_jobs * 4))
+                    starts = list(range(done, end, chunk))
+                    if pool is None:
+                        results = (_run_realizations(seeds[i:min(i + chunk, end)], positions) for i in starts)
+                    else:
+                        results = pool.map(_run_realizations, [seeds[i:min(i + chunk, end)] for i in starts],
+                                           [positions] * len(starts))
+                    for i, (count, g1, g2, part) in zip(starts, results):
+                        sum_G1 += g1
+                        sum_G2 += g2
+                        samples[i:i + count] = part
+                        pbar.update(count)
+                    done = end
+                    self._save_checkpoint(state, done)
+        finally:
+            if pool is not None:
+                pool.shutdown()
         
-        g1 = len(comps[0]) / self.N_lcc if comps else 0.0
-        g2 = len(comps[1]) / self.N_lcc if len(comps) > 1 else 0.0
+        if adaptive and done >= 2:
+            halfwidth = self._ci_halfwidth(samples[:done], z)
+        profiler.count('realizations', done - state['done'])
+        self.realizations = done
+        if adaptive:
+            print(f"[Percolation] {done} realizações; meia-largura máxima do IC: {halfwidth:.4f}")
         
-        return g1, g2
+        # índice k = arestas presentes; invertido fica indexado por arestas removidas
+        norm = done * self.N_lcc
+        self.curve_G1 = sum_G1[::-1] / norm
+        self.curve_G2 = sum_G2[::-1] / norm
+        
+        values = samples[:done] / self.N_lcc
+        ddof = 1 if done > 1 else 0
+        se = values.std(axis=0, ddof=ddof) / np.sqrt(done)
+        sampled = fractions
+        if recentre:
+            # a grade do piloto pode estar longe do pico final: refina de novo
+            # sobre as curvas completas e junta à grade amostrada; o erro padrão
+            # só existe nas frações do piloto (nan nas novas)
+            fractions = np.union1d(sampled, refine_fractions(self.curve_G1, self.curve_G2, self.M_lcc))
+            full = np.full((len(fractions), 2), np.nan)
+            full[np.searchsorted(fractions, sampled)] = se
+            se = full
+        
+        results = self._process_results(fractions)
+        results['se_G1'] = se[:, 0].tolist()
+        results['se_G2'] = se[:, 1].tolist()
+        results['num_simulations'] = done
+        return results
+    
+    def _pilot_fractions(self, src, dst) -> np.ndarray:
+        # Curva média das primeiras MC_BATCH_SIZE realizações (mesmas sementes da
+        # execução principal) só para posicionar a grade; determinística.
+        pilot = min(MC_BATCH_SIZE, max(1, self.num_simulations))
+        _init_worker(self.N_lcc, src, dst)
+        _, sum_G1, sum_G2, _ = _run_realizations(np.random.SeedSequence(self.seed).spawn(pilot))
+        fractions = refine_fractions(sum_G1[::-1] / (pilot * self.N_lcc), sum_G2[::-1] / (pilot * self.N_lcc),
+                                     self.M_lcc)
+        print(f"[Percolation] Grade adaptativa: {len(fractions)} frações (resolução {FRACTION_RESOLUTION})")
+        return fractions
     
-    def _process_results(self, fractions, results_G1, results_G2) -> dict:
-        avg_G1 = [np.mean(results_G1[f]) for f in fractions]
-        avg_G2 = [np.mean(results_G2[f]) for f in fractions]
+    def _ci_halfwidth(self, samples, z) -> float:
+        # maior meia-largura do IC entre todas as frações, para G1/N e G2/N
+        values = samples / self.N_lcc
+        se = values.std(axis=0, ddof=1) / np.sqrt(len(values))
+        return float(z * se.max())
+    
+    def _open_checkpoint(self, checkpoint_dir, total, fractions) -> dict:
+        # Realizações nas frações pedidas num array pré-alocado (memmap em disco
+        # se houver checkpoint_dir); somas das curvas e progresso ao lado. Um
+        # checkpoint de outra configuração (grafo, semente, frações) é recomeçado.
+        shape = (total, len(fractions), 2)
+        state = {'dir': checkpoint_dir, 'done': 0,
+                 'sum_G1': np.zeros(self.M_lcc + 1, dtype=np.int64),
+                 'sum_G2': np.zeros(self.M_lcc + 1, dtype=np.int64)}
+        if not checkpoint_dir:
+            state['samples'] = np.zeros(shape, dtype=np.int32)
+            return state
+        
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        state['config'] = {
+            'seed': int(self.seed), 'N': int(self.N_lcc), 'M': int(self.M_lcc),
+            'src_hash': hashlib.sha1(self.lcc['src'].tobytes() + self.lcc['dst'].tobytes()).hexdigest(),
+            'fractions': [float(f) for f in fractions],
+        }
+        meta_path = os.path.join(checkpoint_dir, 'state.json')
+        samples_path = os.path.join(checkpoint_dir, 'realizations.npy')
+        sums_path = os.path.join(checkpoint_dir, 'sums.npz')
+        meta = None
+        if os.path.exists(meta_path) and os.path.exists(samples_path) and os.path.exists(sums_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta.get('config') != state['config']:
+                print("[Percolation] Checkpoint de outra configuração, recomeçando")
+                meta = None
         
-        idx_critical = int(np.argmax(avg_G2))
+        if meta is not None and meta['done'] > total:
+            # pedido menor que o já feito: as somas em disco cobrem realizações demais
+            print("[Percolation] Checkpoint com mais realizações que o pedido, recomeçando")
+            meta = None
+        
+        if meta is not None:
+            old = np.load(samples_path, mmap_mode='r')
+            if old.shape[0] < total:
+                # mais realizações que antes: cresce o arquivo mantendo as feitas
+                grown = np.lib.format.open_memmap(samples_path + '.tmp', mode='w+', dtype=np.int32, shape=shape)
+                grown[:meta['done']] = old[:meta['done']]
+                grown.flush()
+                del grown
+                os.replace(samples_path + '.tmp', samples_path)
+            del old
+            state['samples'] = np.lib.format.open_memmap(samples_path, mode='r+')
+            sums = np.load(sums_path)
+            state['sum_G1'][:] = sums['sum_G1']
+            state['sum_G2'][:] = sums['sum_G2']
+            state['done'] = meta['done']
+        else:
+            state['samples'] = np.lib.format.open_memmap(samples_path, mode='w+', dtype=np.int32, shape=shape)
+        return state
+    
+    def _save_checkpoint(self, state, done):
+        if not state['dir']:
+            return
+        d = state['dir']
+        state['samples'].flush()
+        np.savez(os.path.join(d, 'sums.tmp.npz'), sum_G1=state['sum_G1'], sum_G2=state['sum_G2'])
+        os.replace(os.path.join(d, 'sums.tmp.npz'), os.path.join(d, 'sums.npz'))
+        with open(os.path.join(d, 'state.json.tmp'), 'w') as f:
+            json.dump({'done': done, 'config': state['config']}, f)
+        os.replace(os.path.join(d, 'state.json.tmp'), os.path.join(d, 'state.json'))
+    
+    def curve_at(self, fractions) -> tuple:
+        fractions = np.asarray(fractions, dtype=float)
+        num_removed = np.clip((self.M_lcc * fractions).astype(np.int64), 0, self.M_lcc)
+        return self.curve_G1[num_removed], self.curve_G2[num_removed]
+    
+    def _process_results(self, fractions) -> dict:
+        avg_G1, avg_G2 = self.curve_at(fractions)
+        avg_G1 = avg_G1.tolist()
+        avg_G2 = avg_G2.tolist()
+        
+        # f* sai da curva completa (resolução de uma aresta, mesmo custo com
+        # Newman-Ziff); a grade de frações serve só para amostrar a saída
+        idx_critical = int(np.argmax(self.curve_G2))
         
         return {
             'fractions': fractions,
             'avg_G1': avg_G1,
             'avg_G2': avg_G2,
-            'critical_threshold': fractions[idx_critical],
-            'max_G2': avg_G2[idx_critical]
+            'critical_threshold': idx_critical / self.M_lcc,
+            'max_G2': float(self.curve_G2[idx_critical])
         }
     
-    def run_targeted_percolation(self, max_grade_threshold=0.0833):
-        if self.G_lcc_seg is None:
+    def _grid(self, g1_sizes, g2_sizes, total, num_steps) -> tuple:
+        # Curvas por nº de removidos amostradas numa grade de frações:
+        # None = todos os passos, 'adaptive' = refine_fractions, int = linspace
+        if num_steps is None:
+            return np.arange(len(g1_sizes)) / total, g1_sizes, g2_sizes
+        if num_steps == 'adaptive':
+            fractions = refine_fractions(g1_sizes, g2_sizes, total)
+        else:
+            fractions = np.linspace(0, (len(g1_sizes) - 1) / total, num_steps)
+        num_removed = np.minimum((total * fractions).astype(np.int64), len(g1_sizes) - 1)
+        return fractions, g1_sizes[num_removed], g2_sizes[num_removed]
+    
+    @profiler.profiled('percolation.targeted')
+    def run_targeted_percolation(self, max_grade_threshold=0.0833, num_steps=None):
+        if self.lcc_seg is None:
             raise ValueError("Grafo segmentado não foi fornecido no __init__.")
         
         print(f"[Percolation] Percolação direcionada: removendo APENAS arestas inacessíveis (grade > {max_grade_threshold*100:.2f}%)")
         
-        inaccessible_edges = [
-            (u, v, d.get('grade_abs', 0)) 
-            for u, v, d in self.G_lcc_seg.edges(data=True)
-            if d.get('grade_abs', 0) > max_grade_threshold
-        ]
+        cg = self.lcc_seg['graph']
+        grades = cg.edge_column('grade_abs', 0.0)[self.lcc_seg['edges']]
+        inaccessible = np.flatnonzero(grades > max_grade_threshold)
+        accessible = np.flatnonzero(~(grades > max_grade_threshold))
         
-        num_inaccessible = len(inaccessible_edges)
+        num_inaccessible = len(inaccessible)
         pct_inaccessible = (num_inaccessible / self.M_seg) * 100 if self.M_seg > 0 else 0
         
         print(f"[Percolation] Total de arestas: {self.M_seg}")
@@ -105,44 +356,171 @@ class PercolationSimulator:
                 'fractions': [0],
                 'avg_G1': [1.0],
                 'avg_G2': [0.0],
+                'critical_threshold': 0,
+                'max_G2': 0.0,
+                'critical_edge': None,
+                'critical_grade': None,
+                'g1_sizes': np.ones(1),
+                'g2_sizes': np.zeros(1),
+                'removed_edges': [],
                 'num_inaccessible': 0,
                 'pct_inaccessible': 0
             }
         
-        inaccessible_edges_sorted = sorted(inaccessible_edges, key=lambda x: x[2], reverse=True)
-        edges_to_remove = [(u, v) for u, v, _ in inaccessible_edges_sorted]
-        
-        max_fraction = num_inaccessible / self.M_seg  
-        fractions = np.linspace(0, max_fraction, 50)
-        
-        results_G1 = []
-        results_G2 = []
-        
-        for f in tqdm(fractions, desc="Removendo inacessíveis"):
-            num_to_remove = int(self.M_seg * f)
-            num_to_remove = min(num_to_remove, num_inaccessible)  
-            
-            H = self.G_lcc_seg.copy()
-            
-            if num_to_remove > 0:
-                H.remove_edges_from(edges_to_remove[:num_to_remove])
-            
-            comps = sorted(nx.connected_components(H), key=len, reverse=True)
-            
-            g1 = len(comps[0]) / self.N_seg if comps else 0.0
-            g2 = len(comps[1]) / self.N_seg if len(comps) > 1 else 0.0
-            
-            results_G1.append(g1)
-            results_G2.append(g2)
-        
-        idx_critical = int(np.argmax(results_G2))
+        # ordem estável por inclinação decrescente, como o sorted(reverse=True) original
+        removal = inaccessible[np.argsort(-grades[inaccessible], kind='stable')]
+        
+        # A ordem de remoção é determinística: percorrida ao contrário, basta
+        # uma passada de union-find partindo só das arestas acessíveis.
+        sequence = np.concatenate((accessible, removal[::-1]))
+        g1, g2 = percolation_curve(self.N_seg, self.lcc_seg['src'], self.lcc_seg['dst'], sequence)
+        profiler.count('union_find_passes')
+        
+        # posição r = nº de arestas inacessíveis já removidas
+        num_accessible = self.M_seg - num_inaccessible
+        g1_sizes = g1[num_accessible:][::-1] / self.N_seg
+        g2_sizes = g2[num_accessible:][::-1] / self.N_seg
+        edge_fractions = np.arange(num_inaccessible + 1) / self.M_seg
+        
+        idx_edge = int(np.argmax(g2_sizes))
+        if idx_edge > 0:
+            e = self.lcc_seg['edges'][removal[idx_edge - 1]]
+            critical_edge = tuple(cg.node_ids[[cg.src[e], cg.dst[e]]].tolist())
+            critical_grade = float(grades[removal[idx_edge - 1]])
+        else:
+            critical_edge, critical_grade = None, None
+        
+        # arestas na ordem de remoção, em ids de nó (ex.: para DynamicBetweenness.trajectory)
+        removed = self.lcc_seg['edges'][removal]
+        removed_edges = list(zip(cg.node_ids[cg.src[removed]].tolist(), cg.node_ids[cg.dst[removed]].tolist()))
+        
+        fractions, results_G1, results_G2 = self._grid(g1_sizes, g2_sizes, self.M_seg, num_steps)
         
         return {
             'fractions': fractions,
             'avg_G1': results_G1,
             'avg_G2': results_G2,
-            'critical_threshold': fractions[idx_critical],
-            'max_G2': results_G2[idx_critical],
+            'critical_threshold': edge_fractions[idx_edge],
+            'max_G2': float(g2_sizes[idx_edge]),
+            'critical_edge': critical_edge,
+            'critical_grade': critical_grade,
+            'g1_sizes': g1_sizes,
+            'g2_sizes': g2_sizes,
+            'removed_edges': removed_edges,
             'num_inaccessible': num_inaccessible,
             'pct_inaccessible': pct_inaccessible
-        }
\ No newline at end of file
+        }
+    
+    @profiler.profiled('percolation.finite_size_scaling')
+    def finite_size_scaling(self, sizes=FSS_SIZES, num_simulations=None, nu=FSS_NU) -> dict:
+        # Limiar pseudo-crítico f*(N) (pico de G2, na resolução de uma aresta) em
+        # janelas centrais com frações `sizes` dos nós da LCC, e extrapolação
+        # f*(N) = f*_inf + a·L^(-1/ν), com L = sqrt(N) (rede plana, ν = 4/3 em 2D).
+        graph = self._lcc_graph(self.lcc)
+        n = graph.number_of_nodes()
+        num_simulations = num_simulations or self.num_simulations
+        if 'x' in graph.node_data and 'y' in graph.node_data:
+            x, y = graph.node_data['x'], graph.node_data['y']
+            # janela quadrada em torno da mediana das coordenadas
+            dist = np.maximum(np.abs(x - np.nanmedian(x)), np.abs(y - np.nanmedian(y)))
+        else:
+            # sem coordenadas: distância em saltos a partir do nó de maior grau
+            indptr, nbrs, _ = graph.adjacency()
+            A = csr_matrix((np.ones(len(nbrs)), nbrs, indptr), shape=(n, n))
+            dist = shortest_path(A, unweighted=True, indices=int(np.argmax(np.diff(indptr))))
+        rank = np.argsort(dist, kind='stable')
+        seeds = np.random.SeedSequence(self.seed).spawn(num_simulations)
+        
+        Ns, Ms, thresholds = [], [], []
+        for frac in sorted(sizes):
+            window = np.zeros(n, dtype=bool)
+            window[rank[:max(3, int(round(frac * n)))]] = True
+            node_mask = graph.lcc_mask(graph.edge_mask(window))
+            edges = np.flatnonzero(graph.edge_mask(node_mask))
+            relabel = np.cumsum(node_mask) - 1
+            n_sub, m_sub = int(node_mask.sum()), len(edges)
+            if m_sub == 0:
+                continue
+            _init_worker(n_sub, relabel[graph.src[edges]].astype(np.int32), relabel[graph.dst[edges]].astype(np.int32))
+            _, _, sum_G2, _ = _run_realizations(seeds)
+            Ns.append(n_sub)
+            Ms.append(m_sub)
+            thresholds.append(int(np.argmax(sum_G2[::-1])) / m_sub)
+            print(f"[Percolation] FSS: N={n_sub}, E={m_sub}, f*={thresholds[-1]:.4f}")
+        profiler.count('realizations', num_simulations * len(Ns))
+        
+        if len(Ns) >= 2:
+            X = np.asarray(Ns, dtype=float) ** (-1 / (2 * nu))
+            slope, f_inf = np.polyfit(X, thresholds, 1)
+        else:
+            slope, f_inf = np.nan, thresholds[-1] if thresholds else np.nan
+        print(f"[Percolation] FSS: f*(N→∞) ≈ {f_inf:.4f}")
+        return {
+            'sizes': Ns,
+            'edges': Ms,
+            'thresholds': thresholds,
+            'f_inf': float(f_inf),
+            'slope': float(slope),
+            'nu': nu
+        }
+    
+    def _lcc_graph(self, lcc) -> CompactGraph:
+        # LCC como CompactGraph próprio (índices 0..N_lcc-1), para as estratégias de ataque
+        if 'lcc_graph' not in lcc:
+            cg = lcc['graph']
+            lcc['lcc_graph'] = CompactGraph(
+                cg.node_ids[lcc['nodes']], lcc['src'], lcc['dst'],
+                {k: v[lcc['nodes']] for k, v in cg.node_data.items()},
+                {k: v[lcc['edges']] for k, v in cg.edge_data.items()},
+                directed=False, graph=cg.graph
+            )
+        return lcc['lcc_graph']
+    
+    @profiler.profiled('percolation.attack')
+    def run_attack(self, strategy='degree', segmented=False, num_steps=None) -> dict:
+        # strategy: nome em ATTACK_STRATEGIES ou instância de AttackStrategy.
+        # A ordem de remoção sai da estratégia; G1/G2 vêm de uma única passada
+        # de union-find na ordem inversa (arestas ou nós readicionados).
+        lcc = self.lcc_seg if segmented else self.lcc
+        if lcc is None:
+            raise ValueError("Grafo segmentado não foi fornecido no __init__.")
+        attack = get_attack(strategy)
+        graph = self._lcc_graph(lcc)
+        N, M = graph.number_of_nodes(), graph.number_of_edges()
+        
+        print(f"[Percolation] Ataque '{attack.name}' ({attack.target}s) em N={N}, E={M}...")
+        order = np.asarray(attack.order(graph), dtype=np.int64)
+        
+        # elementos que a estratégia não remove entram primeiro na passada inversa
+        total = M if attack.target == 'edge' else N
+        kept = np.setdiff1d(np.arange(total), order)
+        sequence = np.concatenate((kept, order[::-1]))
+        if attack.target == 'edge':
+            g1, g2 = percolation_curve(N, graph.src, graph.dst, sequence)
+            removed = list(zip(graph.node_ids[graph.src[order]].tolist(), graph.node_ids[graph.dst[order]].tolist()))
+        else:
+            indptr, nbrs, _ = graph.adjacency()
+            g1, g2 = node_percolation_curve(N, indptr, nbrs, sequence)
+            removed = graph.node_ids[order].tolist()
+        profiler.count('union_find_passes')
+        
+        # posição r = nº de elementos removidos, na ordem da estratégia
+        g1_sizes = g1[len(kept):][::-1] / N
+        g2_sizes = g2[len(kept):][::-1] / N
+        step_fractions = np.arange(len(order) + 1) / total
+        idx_critical = int(np.argmax(g2_sizes))
+        
+        fractions, results_G1, results_G2 = self._grid(g1_sizes, g2_sizes, total, num_steps)
+        
+        return {
+            'fractions': fractions,
+            'avg_G1': results_G1,
+            'avg_G2': results_G2,
+            'critical_threshold': step_fractions[idx_critical],
+            'max_G2': float(g2_sizes[idx_critical]),
+            'strategy': attack.name,
+            'target': attack.target,
+            'removed': removed,
+            'g1_sizes': g1_sizes,
+            'g2_sizes': g2_sizes
+        }
@@ -0,0 +1,110 @@
+import numpy as np
+
+
+class UnionFind:
+    # Union-find ponderado que mantém o tamanho do maior (G1) e do segundo
+    # maior (G2) componente a cada união, via histograma de tamanhos.
+    # Com active=False os nós começam ausentes e entram via activate() (percolação de nós).
+    def __init__(self, n: int, active: bool = True):
+        self.parent = list(range(n))
+        self.size = [1] * n
+        self.count = [0] * (n + 1)
+        present = n if active else 0
+        self.count[1] = present
+        self.g1 = 1 if present > 0 else 0
+        self.g2 = 1 if present > 1 else 0
+
+    def activate(self):
+        # um nó isolado passa a existir (o chamador garante que ainda não estava ativo)
+        self.count[1] += 1
+        if self.g1 == 0:
+            self.g1 = 1
+        elif self.g2 == 0:
+            self.g2 = 1
+
+    def find(self, a: int) -> int:
+        parent = self.parent
+        root = a
+        while parent[root] != root:
+            root = parent[root]
+        while parent[a] != root:
+            parent[a], a = root, parent[a]
+        return root
+
+    def union(self, a: int, b: int) -> bool:
+        ra = self.find(a)
+        rb = self.find(b)
+        if ra == rb:
+            return False
+
+        size = self.size
+        sa, sb = size[ra], size[rb]
+        if sa < sb:
+            ra, rb = rb, ra
+        self.parent[rb] = ra
+        s = sa + sb
+        size[ra] = s
+
+        count = self.count
+        count[sa] -= 1
+        count[sb] -= 1
+        count[s] += 1
+
+        # Novo G2 é no máximo o antigo G1 (se ainda existir), o antigo G2 ou s;
+        # a varredura descendente do histograma parte do menor limite válido.
+        old_g1 = self.g1
+        if s > old_g1:
+            self.g1 = s
+            c = old_g1 if count[old_g1] > 0 else self.g2
+        else:
+            c = max(self.g2, s)
+
+        g1 = self.g1
+        while c > 0 and count[c] - (1 if c == g1 else 0) <= 0:
+            c -= 1
+        self.g2 = c
+        return True
+
+
+def percolation_curve(n: int, src, dst, order) -> tuple:
+    # Adiciona as arestas na ordem dada e devolve (G1, G2) em tamanho absoluto
+    # após cada adição; o índice k corresponde a k arestas presentes.
+    uf = UnionFind(n)
+    g1 = np.empty(len(order) + 1, dtype=np.int64)
+    g2 = np.empty(len(order) + 1, dtype=np.int64)
+    g1[0] = uf.g1
+    g2[0] = uf.g2
+
+    src = src.tolist() if hasattr(src, 'tolist') else list(src)
+    dst = dst.tolist() if hasattr(dst, 'tolist') else list(dst)
+    union = uf.union
+    for k, e in enumerate(order.tolist() if hasattr(order, 'tolist') else order, start=1):
+        union(src[e], dst[e])
+        g1[k] = uf.g1
+        g2[k] = uf.g2
+
+    return g1, g2
+
+
+def node_percolation_curve(n: int, indptr, nbrs, order) -> tuple:
+    # Ativa os nós na ordem dada, unindo cada um aos vizinhos já ativos, e
+    # devolve (G1, G2) após cada ativação; o índice k corresponde a k nós presentes.
+    uf = UnionFind(n, active=False)
+    g1 = np.zeros(len(order) + 1, dtype=np.int64)
+    g2 = np.zeros(len(order) + 1, dtype=np.int64)
+
+    indptr = indptr.tolist() if hasattr(indptr, 'tolist') else list(indptr)
+    nbrs = nbrs.tolist() if hasattr(nbrs, 'tolist') else list(nbrs)
+    active = [False] * n
+    union = uf.union
+    for k, v in enumerate(order.tolist() if hasattr(order, 'tolist') else order, start=1):
+        active[v] = True
+        uf.activate()
+        for j in range(indptr[v], indptr[v + 1]):
+            w = nbrs[j]
+            if active[w]:
+                union(v, w)
+        g1[k] = uf.g1
+        g2[k] = uf.g2
+
+    return g1, g2
@@ -0,0 +1,238 @@
+import argparse
+import json
+import os
+import re
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+import pandas as pd
+from config.settings import (
+    PLACES, MAX_GRADE_NBR9050, NUM_SIMULATIONS, PERCOLATION_STEPS, BATCH_OUTPUT_DIR, ELEVATION_SOURCE
+)
+from data.graph_cache import GraphCache
+from data.network_loader import NetworkLoader
+
+# Etapas por local: (dependências, tipo). Etapas 'io' rodam num pool de threads
+# e se sobrepõem às etapas 'cpu', que rodam num pool de processos. A elevação
+# só é I/O com a API; amostrar o DEM local é CPU e prenderia o GIL das threads.
+STAGES = {
+    'load': ((), 'io'),
+    'segment': (('load',), 'cpu'),
+    'elevation': (('segment',), 'cpu' if ELEVATION_SOURCE == 'raster' else 'io'),
+    'stats': (('load',), 'cpu'),
+    'centrality': (('load',), 'cpu'),
+    'percolation': (('load', 'elevation'), 'cpu'),
+}
+
+
+def _slug(place_name: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '_', place_name.lower()).strip('_')
+
+
+def _place_dir(out_dir: str, place_name: str) -> str:
+    path = os.path.join(out_dir, _slug(place_name))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _write_json(path: str, data: dict):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(data, f, indent=2, default=float)
+    os.replace(tmp, path)
+
+
+def _stage_done(stage: str, place_name: str, out_dir: str) -> bool:
+    cache = GraphCache()
+    if stage == 'load':
+        return cache.has(place_name, 'proj')
+    if stage == 'segment':
+        return cache.has(place_name, 'seg')
+    if stage == 'elevation':
+        return cache.has(place_name, 'seg_elev')
+    return os.path.exists(os.path.join(_place_dir(out_dir, place_name), f'{stage}.json'))
+
+
+def run_stage(stage: str, place_name: str, out_dir: str) -> float:
+    # Cada etapa lê suas entradas do cache em disco e grava a saída nele,
+    # então processos não trocam grafos e uma execução interrompida retoma daqui.
+    start = time.time()
+    cache = GraphCache()
+    loader = NetworkLoader()
+    place_dir = _place_dir(out_dir, place_name)
+
+    if stage == 'load':
+        cache.save(place_name, 'proj', loader.load_network(place_name))
+
+    elif stage == 'segment':
+        cache.save(place_name, 'seg', loader.segment_graph(cache.load(place_name, 'proj'), n_jobs=1))
+
+    elif stage == 'elevation':
+        G = loader.add_elevation_data(cache.load(place_name, 'seg'))
+        # incompleta (sem chave, lotes falhos): usada nesta execução, refeita na próxima
+        cache.save(place_name, 'seg_elev', G, complete=G.graph.get('elevation_complete', True))
+
+    elif stage == 'stats':
+        from analysis.basic_stats import NetworkStats
+        stats = NetworkStats(cache.load(place_name, 'proj'))
+        metrics = {**stats.get_basic_metrics(), **stats.get_metrics()}
+        _write_json(os.path.join(place_dir, 'stats.json'), metrics)
+
+    elif stage == 'centrality':
+        from analysis.centrality import CentralityAnalyzer
+        from config.settings import BETWEENNESS_EPSILON, BETWEENNESS_DELTA
+        centrality = CentralityAnalyzer(cache.load_compact(place_name, 'proj'), n_jobs=1)
+        bc = centrality.calculate_betweenness_variants(
+            {'betweenness': 'length', 'betweenness_topo': None},
+            epsilon=BETWEENNESS_EPSILON, delta=BETWEENNESS_DELTA
+        )
+        np.savez_compressed(os.path.join(place_dir, 'centrality.npz'),
+                            node_ids=centrality.G_proj.node_ids,
+                            **{k: np.fromiter(v.values(), dtype=float) for k, v in bc.items()})
+        _write_json(os.path.join(place_dir, 'centrality.json'), {
+            attr: {
+                'top': {str(k): v for k, v in centrality.get_top_nodes(values).items()},
+                **centrality.sampling_info[attr],
+            }
+            for attr, values in bc.items()
+        })
+
+    elif stage == 'percolation':
+        from analysis.percolation import PercolationSimulator
+        percolation = PercolationSimulator(
+            cache.load_compact(place_name, 'proj'), cache.load_compact(place_name, 'seg_elev'),
+            num_simulations=NUM_SIMULATIONS, n_jobs=1
+        )
+        # checkpoint por local: uma execução interrompida retoma as realizações feitas
+        results = percolation.run_simulation(np.linspace(0, 1, PERCOLATION_STEPS),
+                                             checkpoint_dir=os.path.join(place_dir, 'mc_checkpoint'))
+        targeted = percolation.run_targeted_percolation(max_grade_threshold=MAX_GRADE_NBR9050)
+        np.savez_compressed(
+            os.path.join(place_dir, 'percolation_curves.npz'),
+            random_G1=percolation.curve_G1, random_G2=percolation.curve_G2,
+            random_se_G1=np.asarray(results['se_G1']), random_se_G2=np.asarray(results['se_G2']),
+            targeted_fractions=np.asarray(targeted['fractions'], dtype=float),
+            targeted_G1=targeted['g1_sizes'], targeted_G2=targeted['g2_sizes'],
+        )
+        _write_json(os.path.join(place_dir, 'percolation.json'), {
+            'critical_threshold': results['critical_threshold'],
+            'max_G2': results['max_G2'],
+            'num_simulations': results['num_simulations'],
+            'targeted_critical_threshold': targeted['critical_threshold'],
+            'targeted_max_G2': targeted['max_G2'],
+            'critical_grade': targeted['critical_grade'],
+            'num_inaccessible': targeted['num_inaccessible'],
+            'pct_inaccessible': targeted['pct_inaccessible'],
+        })
+
+    return time.time() - start
+
+
+class BatchRunner:
+    def __init__(self, places, out_dir=BATCH_OUTPUT_DIR, cpu_workers=None, io_workers=4):
+        self.places = list(places)
+        self.out_dir = out_dir
+        self.cpu_workers = cpu_workers or os.cpu_count()
+        self.io_workers = io_workers
+        os.makedirs(out_dir, exist_ok=True)
+
+    def run(self) -> pd.DataFrame:
+        status = {}
+        timings = {}
+        for place in self.places:
+            # STAGES está em ordem topológica: uma etapa no cache cuja dependência
+            # vai rodar de novo nesta execução também é refeita
+            for stage, (deps, _) in STAGES.items():
+                fresh = _stage_done(stage, place, self.out_dir)
+                fresh = fresh and all(status[(place, d)] == 'done' for d in deps)
+                status[(place, stage)] = 'done' if fresh else 'pending'
+
+        skipped = sum(1 for s in status.values() if s == 'done')
+        print(f"[Batch] {len(self.places)} locais, {len(status)} etapas ({skipped} já concluídas no cache)")
+
+        with ProcessPoolExecutor(max_workers=self.cpu_workers) as cpu_pool, \
+                ThreadPoolExecutor(max_workers=self.io_workers) as io_pool:
+            running = {}
+            while True:
+                for (place, stage), st in status.items():
+                    if st != 'pending':
+                        continue
+                    deps = [status[(place, d)] for d in STAGES[stage][0]]
+                    if any(d in ('failed', 'blocked') for d in deps):
+                        status[(place, stage)] = 'blocked'
+                    elif all(d == 'done' for d in deps):
+                        pool = io_pool if STAGES[stage][1] == 'io' else cpu_pool
+                        running[pool.submit(run_stage, stage, place, self.out_dir)] = (place, stage)
+                        status[(place, stage)] = 'running'
+
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    place, stage = running.pop(fut)
+                    try:
+                        timings[(place, stage)] = fut.result()
+                        status[(place, stage)] = 'done'
+                        print(f"[Batch] {place}: {stage} concluída em {timings[(place, stage)]:.1f}s")
+                    except Exception:
+                        status[(place, stage)] = 'failed'
+                        print(f"[Batch] {place}: {stage} FALHOU\n{traceback.format_exc()}")
+
+        summary = self._summary(status, timings)
+        summary.to_csv(os.path.join(self.out_dir, 'summary.csv'), index=False)
+        print(f"[Batch] Resumo salvo em {os.path.join(self.out_dir, 'summary.csv')}")
+        return summary
+
+    def _summary(self, status, timings) -> pd.DataFrame:
+        rows = []
+        for place in self.places:
+            place_dir = _place_dir(self.out_dir, place)
+            row = {'place': place}
+            for name in ('stats', 'percolation'):
+                path = os.path.join(place_dir, f'{name}.json')
+                if os.path.exists(path):
+                    with open(path) as f:
+                        row.update(json.load(f))
+            problems = []
+            for st in ('failed', 'blocked'):
+                stages = [s for s in STAGES if status[(place, s)] == st]
+                if stages:
+                    problems.append(f"{st}: {','.join(stages)}")
+            row['status'] = '; '.join(problems) or 'ok'
+            for stage in STAGES:
+                row[f'time_{stage}'] = timings.get((place, stage))
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+
+def _read_places(args) -> list:
+    places = []
+    for key in args.places or []:
+        places.extend(PLACES.get(key, [key]))
+    if args.places_file:
+        with open(args.places_file) as f:
+            places.extend(line.strip() for line in f if line.strip() and not line.startswith('#'))
+    if args.all:
+        places.extend(p for names in PLACES.values() for p in names)
+    return list(dict.fromkeys(places))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Análise em lote de vários locais")
+    parser.add_argument('places', nargs='*', help="chaves de PLACES ou nomes de locais")
+    parser.add_argument('--places-file', help="arquivo com um local por linha")
+    parser.add_argument('--all', action='store_true', help="todos os locais de PLACES")
+    parser.add_argument('--out', default=BATCH_OUTPUT_DIR)
+    parser.add_argument('--cpu-workers', type=int, default=None)
+    parser.add_argument('--io-workers', type=int, default=4)
+    args = parser.parse_args()
+
+    places = _read_places(args)
+    if not places:
+        parser.error("nenhum local informado")
+    BatchRunner(places, args.out, args.cpu_workers, args.io_workers).run()
+
+
+if __name__ == "__main__":
+    main()
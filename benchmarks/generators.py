@@ -0,0 +1,66 @@
+import numpy as np
+import networkx as nx
+from shapely.geometry import LineString
+
+CRS = 'EPSG:31983'   # SIRGAS 2000 / UTM 23S (Rio de Janeiro)
+
+
+def _elevation(kind, xs, ys, rng):
+    if kind == 'favela':
+        # morros: soma de gaussianas altas, gerando muitas ladeiras > 8,33%
+        size = max(xs.max() - xs.min(), ys.max() - ys.min(), 1.0)
+        elev = np.zeros(len(xs))
+        for _ in range(6):
+            cx, cy = rng.uniform(xs.min(), xs.max()), rng.uniform(ys.min(), ys.max())
+            h, s = rng.uniform(40, 120), rng.uniform(0.05, 0.2) * size
+            elev += h * np.exp(-((xs - cx) ** 2 + (ys - cy) ** 2) / (2 * s ** 2))
+        return elev + rng.normal(0, 1.5, len(xs))
+    return rng.normal(0, 0.5, len(xs))
+
+
+def synthetic_street_network(kind='grid', num_edges=1000, block=100.0, seed=0):
+    # MultiDiGraph projetado no formato do osmnx (x/y, street_count; length,
+    # geometry, grade, grade_abs nas arestas), com ~num_edges arestas direcionadas.
+    # kind: 'grid' (quadras regulares), 'perturbed' (nós deslocados e ruas
+    # removidas) ou 'favela' (traçado irregular sobre relevo acidentado).
+    rng = np.random.default_rng(seed)
+    side = max(2, int(round(np.sqrt(num_edges / 4))))
+    ii, jj = np.meshgrid(np.arange(side), np.arange(side), indexing='ij')
+    xs = ii.ravel() * block
+    ys = jj.ravel() * block
+    if kind in ('perturbed', 'favela'):
+        jitter = 0.25 if kind == 'perturbed' else 0.4
+        xs = xs + rng.uniform(-jitter, jitter, xs.shape) * block
+        ys = ys + rng.uniform(-jitter, jitter, ys.shape) * block
+    elev = _elevation(kind, xs, ys, rng)
+
+    ids = np.arange(side * side).reshape(side, side)
+    pairs = np.concatenate((
+        np.stack((ids[:-1, :].ravel(), ids[1:, :].ravel()), axis=1),
+        np.stack((ids[:, :-1].ravel(), ids[:, 1:].ravel()), axis=1),
+    ))
+    if kind == 'perturbed':
+        pairs = pairs[rng.random(len(pairs)) > 0.1]
+    elif kind == 'favela':
+        pairs = pairs[rng.random(len(pairs)) > 0.3]
+
+    G = nx.MultiDiGraph(crs=CRS)
+    G.add_nodes_from((int(n), {'x': float(xs[n]), 'y': float(ys[n]), 'elevation': float(elev[n])})
+                     for n in range(side * side))
+
+    bend = 0.05 if kind == 'grid' else 0.2
+    for u, v in pairs.tolist():
+        p, q = np.array([xs[u], ys[u]]), np.array([xs[v], ys[v]])
+        mid = (p + q) / 2 + rng.normal(0, bend * block, 2)
+        geom = LineString([p, mid, q])
+        length = float(geom.length)
+        grade = float((elev[v] - elev[u]) / length)
+        attrs = {'osmid': len(G.edges), 'highway': 'footway', 'oneway': False}
+        G.add_edge(u, v, 0, length=length, geometry=geom, grade=grade, grade_abs=abs(grade),
+                   reversed=False, **attrs)
+        G.add_edge(v, u, 0, length=length, geometry=LineString(geom.coords[::-1]), grade=-grade,
+                   grade_abs=abs(grade), reversed=True, **attrs)
+
+    for n, deg in G.degree():
+        G.nodes[n]['street_count'] = deg // 2
+    return G
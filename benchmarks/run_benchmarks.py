@@ -0,0 +1,156 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from benchmarks.generators import synthetic_street_network
+from data.network_loader import NetworkLoader
+from utils.utils import to_simple_graph
+from analysis.basic_stats import NetworkStats
+from analysis.centrality import CentralityAnalyzer
+from analysis.percolation import PercolationSimulator
+from config.settings import MAX_GRADE_NBR9050
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+HISTORY_PATH = os.path.join(HERE, 'results', 'history.json')
+BASELINE_PATH = os.path.join(HERE, 'baseline.json')
+
+DEFAULT_SCALES = (1_000, 10_000, 100_000)
+TOPOLOGIES = ('grid', 'perturbed', 'favela')
+
+
+def _measure(fn, memory=True):
+    # (tempo de parede, pico de memória alocada em MB, resultado), sem os prints do pipeline.
+    # O tracemalloc distorce muito o tempo, então o pico vem de uma segunda execução rastreada.
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = fn()
+        wall = time.perf_counter() - start
+        if not memory:
+            return wall, float('nan'), result
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return wall, peak / 2 ** 20, result
+
+
+def run_suite(G, label, scale, betweenness_k=64, num_simulations=10, memory=True):
+    # Cada etapa mede sobre a saída da anterior, como no main.py
+    loader = NetworkLoader()
+    records = []
+
+    def record(name, fn):
+        wall, peak, result = _measure(fn, memory)
+        records.append({'benchmark': name, 'topology': label, 'scale': scale,
+                        'wall_s': round(wall, 4), 'peak_mb': round(peak, 2)})
+        print(f"  {name:<28} {wall:9.3f}s {peak:10.1f} MB")
+        return result
+
+    G_seg = record('segment_graph', lambda: loader.segment_graph(G, n_jobs=1))
+    G_simple = record('to_simple_graph', lambda: to_simple_graph(G))
+    G_simple_seg = to_simple_graph(G_seg)
+    record('NetworkStats.get_metrics', lambda: NetworkStats(G).get_metrics())
+    record(f'betweenness_k{betweenness_k}',
+           lambda: CentralityAnalyzer(G, n_jobs=1).calculate_betweenness(k=betweenness_k))
+    percolation = record('PercolationSimulator.init',
+                         lambda: PercolationSimulator(G_simple, G_simple_seg,
+                                                      num_simulations=num_simulations, n_jobs=1))
+    record('run_simulation', lambda: percolation.run_simulation(np.linspace(0, 1, 50)))
+    record('run_targeted_percolation',
+           lambda: percolation.run_targeted_percolation(max_grade_threshold=MAX_GRADE_NBR9050))
+    return records
+
+
+def compare(records, baseline, tolerance):
+    regressions = []
+    index = {(b['benchmark'], b['topology'], b['scale']): b for b in baseline}
+    for r in records:
+        base = index.get((r['benchmark'], r['topology'], r['scale']))
+        if base is None:
+            continue
+        for metric in ('wall_s', 'peak_mb'):
+            # ignora ruído de medições muito curtas/pequenas
+            floor = 0.05 if metric == 'wall_s' else 1.0
+            if r[metric] != r[metric] or base[metric] != base[metric]:
+                continue
+            if r[metric] > max(base[metric], floor) * (1 + tolerance):
+                regressions.append((r, metric, base[metric]))
+    return regressions
+
+
+def _load_json(path, default):
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return default
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks offline do pipeline com redes sintéticas")
+    parser.add_argument('--scales', type=int, nargs='+', default=list(DEFAULT_SCALES),
+                        help="número aproximado de arestas (ex.: 1000 10000 100000 1000000)")
+    parser.add_argument('--topologies', nargs='+', default=list(TOPOLOGIES), choices=TOPOLOGIES)
+    parser.add_argument('--cached', nargs='*', default=[],
+                        help="locais já presentes no cache de grafos (GraphCache 'proj')")
+    parser.add_argument('--betweenness-k', type=int, default=64)
+    parser.add_argument('--simulations', type=int, default=10)
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--no-memory', action='store_true', help="não mede o pico de memória (metade do tempo)")
+    args = parser.parse_args()
+
+    records = []
+    for topology in args.topologies:
+        for scale in args.scales:
+            G = synthetic_street_network(topology, scale)
+            print(f"[Bench] {topology} ~{scale} arestas (N={G.number_of_nodes()}, E={G.number_of_edges()})")
+            records += run_suite(G, topology, scale, args.betweenness_k, args.simulations, not args.no_memory)
+
+    if args.cached:
+        from data.graph_cache import GraphCache
+        cache = GraphCache()
+        for place in args.cached:
+            G = cache.load(place, 'proj')
+            print(f"[Bench] {place} (cache, N={G.number_of_nodes()}, E={G.number_of_edges()})")
+            records += run_suite(G, place, G.number_of_edges(), args.betweenness_k, args.simulations,
+                                 not args.no_memory)
+
+    run = {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'records': records,
+    }
+    history = _load_json(HISTORY_PATH, [])
+    history.append(run)
+    os.makedirs(os.path.dirname(HISTORY_PATH), exist_ok=True)
+    with open(HISTORY_PATH, 'w') as f:
+        json.dump(history, f, indent=2)
+    print(f"[Bench] Histórico atualizado em {HISTORY_PATH}")
+
+    if args.save_baseline:
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump(records, f, indent=2)
+        print(f"[Bench] Baseline salva em {BASELINE_PATH}")
+        return
+
+    regressions = compare(records, _load_json(BASELINE_PATH, []), args.tolerance)
+    for r, metric, base in regressions:
+        print(f"[Bench] REGRESSÃO {r['benchmark']} ({r['topology']}, {r['scale']}): "
+              f"{metric} {r[metric]} vs baseline {base}")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,23 +3,92 @@ OSMNX_CACHE = True
 OSMNX_LOG = True
 NETWORK_TYPE = 'walk'
 
-# Google Elevation API
+# Cache em disco dos grafos processados (projeção, segmentação, elevação)
+GRAPH_CACHE_ENABLED = True
+GRAPH_CACHE_DIR = 'cache/graphs'
+
+# Índice espacial R-tree (data/spatial_index.py), gravado junto de cada grafo do cache
+SPATIAL_INDEX_CANDIDATES = 8        # arestas candidatas por ponto na 1ª rodada do nearest_edges
+SPATIAL_INDEX_LEAF_CAPACITY = 100   # entradas por folha da R-tree
+
+# Google Elevation API (data/elevation_client.py)
 GOOGLE_ELEVATION_API_KEY = ""
-GOOGLE_ELEVATION_PAUSE = 0.05
+ELEVATION_API_URL = 'https://maps.googleapis.com/maps/api/elevation/json'   # outro endereço p/ servidor local de teste
+ELEVATION_CACHE_PATH = 'cache/elevation.sqlite'   # cache persistente coordenada -> elevação
+ELEVATION_CACHE_DECIMALS = 5        # casas decimais das chaves (lat, lon): 1e-5 grau ~ 1 m
+ELEVATION_BATCH_SIZE = 512          # máximo de pontos por requisição (limite da API)
+ELEVATION_MAX_URL_LENGTH = 16000    # a API recusa URLs maiores que 16384 caracteres
+ELEVATION_MAX_WORKERS = 4           # requisições simultâneas
+ELEVATION_RATE_LIMIT = 20.0         # requisições por segundo (token bucket)
+ELEVATION_RATE_BURST = 4            # rajada máxima do token bucket
+ELEVATION_MAX_RETRIES = 4           # novas tentativas por lote (429, 5xx, OVER_QUERY_LIMIT, rede)
+ELEVATION_BACKOFF = 0.5             # espera inicial entre tentativas (s), dobrada a cada uma
+ELEVATION_TIMEOUT = 30              # timeout de cada requisição (s)
+
+# Fonte de elevação: 'google' ou 'raster' (DEM GeoTIFF local, API só fora do raster)
+ELEVATION_SOURCE = 'google'
+ELEVATION_RASTER_PATH = ""
+ELEVATION_MAX_WINDOW_PIXELS = 64_000_000   # acima disso lê o DEM bloco a bloco
 
 # NBR9050
 SEGMENT_LENGTH = 50.0       
+SEGMENT_PARALLEL_MIN_EDGES = 200000   # acima disso a segmentação usa NUM_WORKERS processos
+SEGMENT_COMPACT = False     # True: SegmentedGraph (trecho = aresta-mãe + offsets) em vez de um MultiDiGraph
 MAX_GRADE_NBR9050 = 0.0833
 
+# Consultas de acessibilidade (analysis/accessibility.py)
+ACCESS_CACHE_ROWS = 256     # linhas de distância (float32, N valores cada) mantidas em cache
+ACCESS_BATCH_SIZE = 256     # origens por chamada do dijkstra
+ACCESS_SAMPLE_ORIGINS = 200 # origens sorteadas no main.py para a razão de distâncias
+
 # Visualização
 DEFAULT_NODE_SIZE = 4
 DEFAULT_NODE_COLOR = '#7FFF00'
 DEFAULT_EDGE_COLOR = '#800080'
 DEFAULT_EDGE_WIDTH = 0.5
 BACKGROUND_COLOR = 'white'
+PLOT_OUTPUT_DIR = None          # None = janelas interativas; diretório = grava arquivos (backend Agg)
+PLOT_FORMAT = 'png'             # 'png' ou 'svg'
+PLOT_DPI = 150
+PLOT_RASTER_MIN_EDGES = 200000  # acima disso arestas/nós são agregados em pixels
+PLOT_RASTER_RESOLUTION = 1000   # pixels no maior lado do modo raster
 
 NUM_SIMULATIONS = 100
 PERCOLATION_STEPS = 50
+RANDOM_SEED = 42
+NUM_WORKERS = 1             # processos para Monte Carlo e betweenness (None/1 = serial)
+
+# Monte Carlo adaptativo: None = exatamente NUM_SIMULATIONS; senão roda até o IC
+# de G1/N e G2/N em todas as frações ficar mais estreito que MC_CI_WIDTH
+MC_CI_WIDTH = None
+MC_CONFIDENCE = 0.95
+MC_MAX_SIMULATIONS = 2000
+MC_BATCH_SIZE = 32          # realizações por rodada (e por checkpoint)
+MC_CHECKPOINT_DIR = None    # diretório para retomar execuções interrompidas
+
+# Grade adaptativa de frações (percolação) e escala de tamanho finito
+FRACTION_COARSE_STEPS = 11  # pontos da grade inicial
+FRACTION_RESOLUTION = 0.001 # largura mínima dos intervalos refinados em torno de f*
+FSS_SIZES = (0.125, 0.25, 0.5, 1.0)   # frações da LCC usadas nas janelas
+FSS_NU = 4 / 3              # expoente de correlação da percolação 2D
+FSS_ENABLED = False         # roda a escala de tamanho finito no main.py (também --fss)
+
+# Ataques direcionados (analysis/attacks.py)
+ATTACK_BETWEENNESS_K = 256  # fontes amostradas na betweenness dos ataques (None = exato)
+ATTACK_BATCH_SIZE = 1       # nós removidos entre recálculos no ataque adaptativo
+
+# Betweenness: None = exato; (epsilon, delta) = amostragem adaptativa de fontes
+BETWEENNESS_EPSILON = None
+BETWEENNESS_DELTA = 0.1
+
+# Perfilamento por etapa (utils/profiling.py); também ligável pela CLI do main.py
+PROFILE_ENABLED = False
+PROFILE_OUTPUT_DIR = 'output/profile'
+PROFILE_MEMORY = True       # tracemalloc por etapa (deixa a execução bem mais lenta)
+PROFILE_CPROFILE = ()       # etapas com captura do cProfile, ex.: ('centrality.betweenness',); '*' = todas
+
+# Execução em lote (batch.py): resumo e curvas por local
+BATCH_OUTPUT_DIR = 'output/batch'
 
 PLACES = {
     'botafogo': ["Botafogo, Rio de Janeiro, Brazil"],
@@ -0,0 +1,191 @@
+import numpy as np
+import networkx as nx
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from utils.profiling import profiler
+
+NODE_ATTRS = ('x', 'y', 'street_count', 'elevation')
+EDGE_ATTRS = ('length', 'grade_abs')
+
+
+class CompactGraph:
+    # Grafo imutável em arrays: nós com ids inteiros contíguos (0..N-1),
+    # lista de arestas ordenada por origem (CSR) e atributos em colunas NumPy.
+    # Subgrafos (como a LCC) são representados por máscaras, não por cópias.
+    def __init__(self, node_ids, src, dst, node_data=None, edge_data=None, directed=True, graph=None):
+        self.node_ids = np.asarray(node_ids)
+        self.src = np.asarray(src, dtype=np.int64)
+        self.dst = np.asarray(dst, dtype=np.int64)
+        self.node_data = dict(node_data or {})
+        self.edge_data = dict(edge_data or {})
+        self.directed = directed
+        self.graph = dict(graph or {})
+        self.indptr = np.concatenate(([0], np.cumsum(np.bincount(self.src, minlength=len(self.node_ids)))))
+        self._index = None
+        self._adjacency = None
+
+    @classmethod
+    def from_networkx(cls, G, node_attrs=NODE_ATTRS, edge_attrs=EDGE_ATTRS):
+        nodes = list(G.nodes())
+        index = {n: i for i, n in enumerate(nodes)}
+        node_data = {}
+        for attr in node_attrs:
+            values = [d.get(attr) for _, d in G.nodes(data=True)]
+            if any(v is not None for v in values):
+                node_data[attr] = np.array([np.nan if v is None else v for v in values], dtype=float)
+
+        # edges() já sai agrupado por origem na ordem dos nós
+        edges = G.edges(data=True)
+        src = np.fromiter((index[u] for u, _, _ in edges), dtype=np.int64, count=G.number_of_edges())
+        dst = np.fromiter((index[v] for _, v, _ in edges), dtype=np.int64, count=G.number_of_edges())
+        edge_data = {}
+        for attr in edge_attrs:
+            values = [d.get(attr) for _, _, d in edges]
+            if any(v is not None for v in values):
+                edge_data[attr] = np.array([np.nan if v is None else v for v in values], dtype=float)
+
+        if all(isinstance(n, (int, np.integer)) for n in nodes):
+            node_ids = np.array(nodes, dtype=np.int64)
+        else:
+            node_ids = np.fromiter(nodes, dtype=object, count=len(nodes))
+        return cls(node_ids, src, dst, node_data, edge_data, G.is_directed(), G.graph)
+
+    @classmethod
+    def from_cache_arrays(cls, a, node_attrs=NODE_ATTRS, edge_attrs=EDGE_ATTRS):
+        # Colunas de GraphCache.load_arrays (mapeadas em memória), sem passar pelo networkx
+        src = np.repeat(np.arange(len(a['nodes']), dtype=np.int64), np.diff(a['indptr']))
+        node_data = {}
+        for attr in node_attrs:
+            if f'n.{attr}' in a:
+                node_data[attr] = cls._masked_column(a, f'n.{attr}')
+        edge_data = {}
+        for attr in edge_attrs:
+            if f'e.{attr}' in a:
+                edge_data[attr] = cls._masked_column(a, f'e.{attr}')
+        return cls(a['nodes'], src, a['indices'], node_data, edge_data, a['meta']['directed'], a['graph'])
+
+    @staticmethod
+    def _masked_column(a, col):
+        values = a[col]
+        present = a.get(col + '.present')
+        if present is None and values.dtype == np.float64:
+            return values
+        values = np.asarray(values, dtype=float)
+        if present is not None:
+            values = np.where(present, values, np.nan)
+        return values
+
+    def to_networkx(self):
+        if self.directed:
+            G = nx.MultiDiGraph()
+        else:
+            G = nx.Graph()
+        G.graph.update(self.graph)
+        ids = self.node_ids.tolist()
+        node_cols = {k: v.tolist() for k, v in self.node_data.items()}
+        G.add_nodes_from(
+            (n, {k: col[i] for k, col in node_cols.items() if col[i] == col[i]})
+            for i, n in enumerate(ids)
+        )
+        edge_cols = {k: v.tolist() for k, v in self.edge_data.items()}
+        G.add_edges_from(
+            (ids[u], ids[v], {k: col[e] for k, col in edge_cols.items() if col[e] == col[e]})
+            for e, (u, v) in enumerate(zip(self.src.tolist(), self.dst.tolist()))
+        )
+        return G
+
+    def number_of_nodes(self) -> int:
+        return len(self.node_ids)
+
+    def number_of_edges(self) -> int:
+        return len(self.src)
+
+    def is_directed(self) -> bool:
+        return self.directed
+
+    def __contains__(self, node) -> bool:
+        try:
+            self.index_of(node)
+        except (KeyError, TypeError):
+            return False
+        return True
+
+    def index_of(self, node) -> int:
+        if self._index is None:
+            self._index = {n: i for i, n in enumerate(self.node_ids.tolist())}
+        return self._index[node]
+
+    def edge_column(self, attr, default=np.nan) -> np.ndarray:
+        if attr in self.edge_data:
+            return self.edge_data[attr]
+        return np.full(self.number_of_edges(), default)
+
+    def set_elevation(self, elevations):
+        # Elevação por nó (nan = desconhecida) e grade/grade_abs em arrays, com a
+        # mesma regra de data.elevation.add_edge_grades
+        elev = np.asarray(elevations, dtype=float)
+        self.node_data['elevation'] = elev
+        length = self.edge_column('length')
+        valid = np.isfinite(elev[self.src]) & np.isfinite(elev[self.dst]) & (length > 0)
+        grade = np.zeros(self.number_of_edges())
+        grade[valid] = (elev[self.dst[valid]] - elev[self.src[valid]]) / length[valid]
+        self.edge_data['grade'] = grade
+        self.edge_data['grade_abs'] = np.abs(grade)
+
+        missing = int((~valid).sum())
+        if missing:
+            print(f"[Data] AVISO: {missing} arestas sem elevação nos extremos (grade=0).")
+        return self
+
+    def to_undirected_simple(self, keep='max_grade'):
+        # Um registro por par {u, v}, mantendo o de maior grade_abs (como
+        # utils.to_simple_graph) ou, com keep='min_length', o mais curto (como
+        # as distâncias do osmnx); laços são preservados.
+        a = np.minimum(self.src, self.dst)
+        b = np.maximum(self.src, self.dst)
+        if keep == 'min_length':
+            rank = self.edge_column('length', np.inf)
+            rank = np.where(np.isnan(rank), np.inf, rank)
+        elif keep == 'max_grade':
+            rank = -np.nan_to_num(self.edge_column('grade_abs', 0.0), nan=0.0)
+        else:
+            raise ValueError(f"keep inválido: {keep!r}")
+        order = np.lexsort((np.arange(len(a)), rank, b, a))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = (a[order][1:] != a[order][:-1]) | (b[order][1:] != b[order][:-1])
+        keep = order[first]
+        edge_data = {k: v[keep] for k, v in self.edge_data.items()}
+        return CompactGraph(self.node_ids, a[keep], b[keep], self.node_data, edge_data, False, self.graph)
+
+    def adjacency(self) -> tuple:
+        # (indptr, vizinhos, id da aresta); no grafo não-direcionado cada aresta aparece nos dois sentidos
+        if self._adjacency is None:
+            if self.directed:
+                self._adjacency = (self.indptr, self.dst, np.arange(len(self.src)))
+            else:
+                loops = self.src == self.dst
+                u = np.concatenate((self.src, self.dst[~loops]))
+                v = np.concatenate((self.dst, self.src[~loops]))
+                eid = np.concatenate((np.arange(len(self.src)), np.flatnonzero(~loops)))
+                order = np.argsort(u, kind='stable')
+                indptr = np.concatenate(([0], np.cumsum(np.bincount(u, minlength=len(self.node_ids)))))
+                self._adjacency = (indptr, v[order], eid[order])
+        return self._adjacency
+
+    def components(self, edge_mask=None) -> tuple:
+        src, dst = self.src, self.dst
+        if edge_mask is not None:
+            src, dst = src[edge_mask], dst[edge_mask]
+        n = self.number_of_nodes()
+        profiler.count('components_computed')
+        A = coo_matrix((np.ones(len(src), dtype=np.int8), (src, dst)), shape=(n, n))
+        return connected_components(A, directed=True, connection='weak')
+
+    def lcc_mask(self, edge_mask=None) -> np.ndarray:
+        n_comp, labels = self.components(edge_mask)
+        if n_comp == 0:
+            raise ValueError("Grafo vazio ou sem componentes conectados.")
+        return labels == np.argmax(np.bincount(labels))
+
+    def edge_mask(self, node_mask) -> np.ndarray:
+        return node_mask[self.src] & node_mask[self.dst]
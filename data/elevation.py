@@ -0,0 +1,91 @@
+import numpy as np
+import networkx as nx
+import rasterio
+from rasterio.crs import CRS
+from rasterio.warp import transform as warp_transform
+from rasterio.windows import Window
+from config.settings import ELEVATION_MAX_WINDOW_PIXELS
+
+
+class RasterElevation:
+    # Amostra um DEM GeoTIFF para muitos pontos de uma vez. Lê só a janela que
+    # cobre os pontos; se ela for grande demais, lê apenas os blocos (tiles)
+    # do raster que contêm algum ponto, sem carregar o arquivo inteiro.
+    def __init__(self, path: str, band: int = 1, max_window_pixels: int = ELEVATION_MAX_WINDOW_PIXELS):
+        self.path = path
+        self.band = band
+        self.max_window_pixels = max_window_pixels
+
+    def sample(self, xs, ys, crs=None) -> np.ndarray:
+        xs = np.asarray(xs, dtype=float)
+        ys = np.asarray(ys, dtype=float)
+        elevations = np.full(len(xs), np.nan)
+        if len(xs) == 0:
+            return elevations
+
+        with rasterio.open(self.path) as src:
+            if crs is not None and src.crs is not None and CRS.from_user_input(crs) != src.crs:
+                xs, ys = warp_transform(CRS.from_user_input(crs), src.crs, xs, ys)
+                xs = np.asarray(xs)
+                ys = np.asarray(ys)
+
+            cols, rows = ~src.transform * (xs, ys)
+            rows = np.floor(rows).astype(np.int64)
+            cols = np.floor(cols).astype(np.int64)
+            inside = (rows >= 0) & (rows < src.height) & (cols >= 0) & (cols < src.width)
+            if not inside.any():
+                return elevations
+
+            r, c = rows[inside], cols[inside]
+            r0, r1, c0, c1 = r.min(), r.max() + 1, c.min(), c.max() + 1
+            if (r1 - r0) * (c1 - c0) <= self.max_window_pixels:
+                data = src.read(self.band, window=Window(c0, r0, c1 - c0, r1 - r0), masked=True)
+                values = data[r - r0, c - c0]
+            else:
+                values = self._sample_blocks(src, r, c)
+
+            # DEMs inteiros (int16 do SRTM): float antes de preencher com nan
+            values = np.ma.masked_invalid(np.ma.asarray(values, dtype=float))
+            elevations[inside] = values.filled(np.nan)
+
+        return elevations
+
+    def _sample_blocks(self, src, rows, cols) -> np.ma.MaskedArray:
+        bh, bw = src.block_shapes[self.band - 1]
+        block_id = (rows // bh) * ((src.width + bw - 1) // bw) + cols // bw
+        values = np.ma.masked_all(len(rows), dtype=float)
+        order = np.argsort(block_id, kind='stable')
+        bounds = np.flatnonzero(np.diff(block_id[order])) + 1
+        for group in np.split(order, bounds):
+            br, bc = rows[group[0]] // bh, cols[group[0]] // bw
+            window = Window(bc * bw, br * bh, min(bw, src.width - bc * bw), min(bh, src.height - br * bh))
+            data = src.read(self.band, window=window, masked=True)
+            values[group] = data[rows[group] - br * bh, cols[group] - bc * bw]
+        return values
+
+
+def add_edge_grades(G):
+    # Equivalente vetorizado de ox.elevation.add_edge_grades; arestas com nó
+    # sem elevação ou comprimento nulo recebem grade 0.
+    edges = list(G.edges(keys=True, data='length'))
+    if not edges:
+        return G
+
+    u, v, k, lengths = zip(*edges)
+    elev = dict(G.nodes(data='elevation'))
+    elev_u = np.array([elev.get(n) for n in u], dtype=float)
+    elev_v = np.array([elev.get(n) for n in v], dtype=float)
+    lengths = np.array(lengths, dtype=float)
+
+    valid = np.isfinite(elev_u) & np.isfinite(elev_v) & (lengths > 0)
+    grades = np.zeros(len(edges))
+    grades[valid] = (elev_v[valid] - elev_u[valid]) / lengths[valid]
+
+    uvk = list(zip(u, v, k))
+    nx.set_edge_attributes(G, dict(zip(uvk, grades.tolist())), name='grade')
+    nx.set_edge_attributes(G, dict(zip(uvk, np.abs(grades).tolist())), name='grade_abs')
+
+    missing = int((~valid).sum())
+    if missing:
+        print(f"[Data] AVISO: {missing} arestas sem elevação nos extremos (grade=0).")
+    return G
@@ -0,0 +1,241 @@
+import os
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+import requests
+from utils.profiling import profiler
+from config.settings import (
+    GOOGLE_ELEVATION_API_KEY, ELEVATION_API_URL, ELEVATION_CACHE_PATH, ELEVATION_CACHE_DECIMALS,
+    ELEVATION_BATCH_SIZE, ELEVATION_MAX_URL_LENGTH, ELEVATION_MAX_WORKERS, ELEVATION_RATE_LIMIT,
+    ELEVATION_RATE_BURST, ELEVATION_MAX_RETRIES, ELEVATION_BACKOFF, ELEVATION_TIMEOUT
+)
+
+# status da API que valem nova tentativa; os demais (INVALID_REQUEST,
+# REQUEST_DENIED...) falham o lote de imediato
+RETRY_STATUS = {'OVER_QUERY_LIMIT', 'UNKNOWN_ERROR'}
+
+
+class TokenBucket:
+    # Limite de taxa compartilhado pelas threads: `rate` fichas por segundo,
+    # no máximo `capacity` acumuladas
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(1.0, float(capacity))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class ElevationRequestError(Exception):
+    def __init__(self, message, retry=False, wait=None):
+        super().__init__(message)
+        self.retry = retry
+        self.wait = wait
+
+
+class ElevationClient:
+    # Cliente da Elevation API (formato do Google): coordenadas arredondadas
+    # viram chaves inteiras, repetidas são consultadas uma vez, as já vistas
+    # vêm do cache SQLite e as restantes saem em lotes do maior tamanho que
+    # cabe na URL, em paralelo e sob um token bucket. Um lote que falha (após
+    # as novas tentativas) marca só os seus pontos como falhos.
+    def __init__(self, api_key=GOOGLE_ELEVATION_API_KEY, base_url=ELEVATION_API_URL,
+                 cache_path=ELEVATION_CACHE_PATH, decimals=ELEVATION_CACHE_DECIMALS,
+                 batch_size=ELEVATION_BATCH_SIZE, max_workers=ELEVATION_MAX_WORKERS,
+                 rate=ELEVATION_RATE_LIMIT, burst=ELEVATION_RATE_BURST,
+                 max_retries=ELEVATION_MAX_RETRIES, backoff=ELEVATION_BACKOFF, timeout=ELEVATION_TIMEOUT):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.cache_path = cache_path
+        self.decimals = decimals
+        self.batch_size = batch_size
+        self.max_workers = max(1, max_workers)
+        self.bucket = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _keys(self, lats, lons) -> np.ndarray:
+        scale = 10 ** self.decimals
+        return np.column_stack((np.round(np.asarray(lats, dtype=float) * scale),
+                                np.round(np.asarray(lons, dtype=float) * scale))).astype(np.int64)
+
+    def _connect(self):
+        if not self.cache_path:
+            return None
+        if os.path.dirname(self.cache_path):
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        conn = sqlite3.connect(self.cache_path)
+        conn.execute("CREATE TABLE IF NOT EXISTS elevation ("
+                     "decimals INTEGER, lat INTEGER, lon INTEGER, elevation REAL, "
+                     "PRIMARY KEY (decimals, lat, lon))")
+        return conn
+
+    def _cached(self, conn, keys) -> np.ndarray:
+        values = np.full(len(keys), np.nan)
+        if conn is None or not len(keys):
+            return values
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS wanted (i INTEGER, lat INTEGER, lon INTEGER)")
+        conn.execute("DELETE FROM wanted")
+        conn.executemany("INSERT INTO wanted VALUES (?, ?, ?)",
+                         zip(range(len(keys)), keys[:, 0].tolist(), keys[:, 1].tolist()))
+        rows = conn.execute("SELECT w.i, e.elevation FROM wanted w JOIN elevation e "
+                            "ON e.decimals = ? AND e.lat = w.lat AND e.lon = w.lon", (self.decimals,)).fetchall()
+        if rows:
+            idx, elev = zip(*rows)
+            values[list(idx)] = elev
+        return values
+
+    def _store(self, conn, keys, elevations):
+        if conn is None or not len(keys):
+            return
+        conn.executemany("INSERT OR REPLACE INTO elevation VALUES (?, ?, ?, ?)",
+                         zip([self.decimals] * len(keys), keys[:, 0].tolist(), keys[:, 1].tolist(),
+                             elevations.tolist()))
+        conn.commit()
+
+    def _batches(self, locations) -> list:
+        # lotes de até batch_size pontos e sem passar de ELEVATION_MAX_URL_LENGTH
+        base = len(self.base_url) + len(self.api_key or '') + 32
+        batches, current, size = [], [], base
+        for i, loc in enumerate(locations):
+            if current and (len(current) >= self.batch_size or size + len(loc) + 3 > ELEVATION_MAX_URL_LENGTH):
+                batches.append(current)
+                current, size = [], base
+            current.append(i)
+            size += len(loc) + 3    # '|' codificado como %7C
+        if current:
+            batches.append(current)
+        return batches
+
+    def _session(self) -> requests.Session:
+        # requests.Session não é segura entre threads: uma por thread do pool
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def _request(self, locations) -> list:
+        try:
+            resp = self._session().get(self.base_url, timeout=self.timeout, params={
+                'locations': '|'.join(locations), 'key': self.api_key,
+            })
+        except requests.RequestException as e:
+            # só o tipo do erro: a mensagem do requests traz a URL, com a chave
+            raise ElevationRequestError(f"erro de rede ({type(e).__name__})", retry=True)
+        if resp.status_code == 429 or resp.status_code >= 500:
+            wait = resp.headers.get('Retry-After')
+            raise ElevationRequestError(f"HTTP {resp.status_code}", retry=True,
+                                        wait=float(wait) if wait and wait.isdigit() else None)
+        if resp.status_code != 200:
+            raise ElevationRequestError(f"HTTP {resp.status_code}")
+        try:
+            payload = resp.json()
+        except ValueError:
+            raise ElevationRequestError("resposta não é JSON", retry=True)
+        if not isinstance(payload, dict):
+            raise ElevationRequestError(f"resposta inesperada ({type(payload).__name__})")
+
+        status = payload.get('status', 'OK')
+        if status != 'OK':
+            raise ElevationRequestError(f"{status}: {payload.get('error_message', '')}".strip(': '),
+                                        retry=status in RETRY_STATUS)
+        results = payload.get('results', [])
+        if not isinstance(results, list):
+            raise ElevationRequestError(f"'results' inesperado ({type(results).__name__})")
+        if len(results) != len(locations):
+            raise ElevationRequestError(f"{len(results)} resultados para {len(locations)} pontos")
+        # formato ou tipo errado em qualquer item falha o lote inteiro (e só ele)
+        elevations = []
+        for r in results:
+            if not isinstance(r, dict):
+                raise ElevationRequestError(f"resultado inválido: {str(r)[:80]}")
+            value = r.get('elevation')
+            if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+                raise ElevationRequestError(f"elevação inválida: {str(value)[:80]}")
+            elevations.append(value)
+        return elevations
+
+    def _fetch(self, locations) -> list:
+        # Um lote com novas tentativas: espera exponencial com jitter, ou o
+        # Retry-After do servidor quando houver
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            profiler.count('elevation_api_requests')
+            try:
+                return self._request(locations)
+            except ElevationRequestError as e:
+                if not e.retry or attempt == self.max_retries:
+                    raise
+                profiler.count('elevation_api_retries')
+                time.sleep(e.wait if e.wait is not None else self.backoff * 2 ** attempt * (0.5 + random.random()))
+
+    def lookup(self, lats, lons) -> tuple:
+        # (elevações em metros, nan onde falhou; {índice do ponto: motivo da falha})
+        keys = self._keys(lats, lons)
+        elevations = np.full(len(keys), np.nan)
+        if not len(keys):
+            return elevations, {}
+        unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+
+        conn = self._connect()
+        try:
+            values = self._cached(conn, unique)
+            missing = np.flatnonzero(np.isnan(values))
+            profiler.count('elevation_cache_hits', len(unique) - len(missing))
+            profiler.count('elevation_api_nodes', len(missing))
+            print(f"[Elevation] {len(keys)} pontos, {len(unique)} distintos, "
+                  f"{len(unique) - len(missing)} no cache, {len(missing)} para a API")
+
+            errors = {}
+            if len(missing):
+                fmt = f"{{:.{self.decimals}f}},{{:.{self.decimals}f}}"
+                scale = 10 ** self.decimals
+                locations = [fmt.format(lat / scale, lon / scale) for lat, lon in unique[missing].tolist()]
+                batches = self._batches(locations)
+                with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as pool:
+                    futures = {pool.submit(self._fetch, [locations[i] for i in b]): b for b in batches}
+                    for future in as_completed(futures):
+                        batch = missing[futures[future]]
+                        try:
+                            result = np.array([np.nan if v is None else v for v in future.result()], dtype=float)
+                        except Exception as e:
+                            # qualquer erro do lote (inclusive inesperado) falha só os seus pontos
+                            profiler.count('elevation_api_failures', len(batch))
+                            reason = str(e) if isinstance(e, ElevationRequestError) else f"{type(e).__name__}: {e}"
+                            errors.update((int(u), reason) for u in batch.tolist())
+                            continue
+                        values[batch] = result
+                        ok = ~np.isnan(result)
+                        errors.update((int(u), 'sem elevação na resposta') for u in batch[~ok].tolist())
+                        # cache gravado a cada lote: uma execução interrompida não perde o que já veio
+                        self._store(conn, unique[batch[ok]], result[ok])
+        finally:
+            if conn is not None:
+                conn.close()
+
+        elevations = values[inverse]
+        failed = {}
+        if errors:
+            bad = np.flatnonzero(np.isin(inverse, list(errors)))
+            failed = {int(i): errors[int(inverse[i])] for i in bad.tolist()}
+            print(f"[Elevation] AVISO: {len(failed)} pontos sem elevação ({len(errors)} coordenadas distintas)")
+        return elevations, failed
@@ -0,0 +1,217 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import networkx as nx
+import numpy as np
+import shapely
+from config.settings import (
+    GRAPH_CACHE_DIR, NETWORK_TYPE, SEGMENT_LENGTH, ELEVATION_SOURCE, ELEVATION_RASTER_PATH
+)
+
+CACHE_VERSION = 2
+
+
+def _column(values):
+    # (valores, máscara de presença) com o dtype mais compacto que preserva o tipo
+    present = np.array([v is not None for v in values], dtype=bool)
+    kinds = {type(v) for v in values if v is not None}
+    if kinds <= {bool, np.bool_}:
+        dtype = bool
+    elif kinds <= {int, np.int64, np.int32}:
+        dtype = np.int64
+    elif kinds <= {float, int, np.float64, np.float32}:
+        dtype = np.float64
+    else:
+        dtype = None
+
+    if dtype is None:
+        return np.fromiter(values, dtype=object, count=len(values)), present
+    fill = dtype(0)
+    return np.array([fill if v is None else v for v in values], dtype=dtype), present
+
+
+class GraphCache:
+    # Cache em disco dos grafos processados: um diretório por entrada, um .npy
+    # por coluna (nós, CSR das arestas, atributos), lidos com mmap_mode='r'.
+    def __init__(self, cache_dir: str = GRAPH_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def key(self, place_name: str) -> str:
+        params = {
+            'place': place_name,
+            'network_type': NETWORK_TYPE,
+            'segment_length': SEGMENT_LENGTH,
+            'elevation_source': ELEVATION_SOURCE,
+            'elevation_raster': ELEVATION_RASTER_PATH if ELEVATION_SOURCE == 'raster' else '',
+            'version': CACHE_VERSION,
+        }
+        if ELEVATION_SOURCE == 'raster':
+            # DEM substituído no mesmo caminho também invalida as elevações
+            try:
+                st = os.stat(ELEVATION_RASTER_PATH)
+                params['elevation_raster_stat'] = [st.st_mtime_ns, st.st_size]
+            except OSError:
+                params['elevation_raster_stat'] = None
+        return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+
+    def _path(self, place_name: str, name: str) -> str:
+        return os.path.join(self.cache_dir, self.key(place_name), name)
+
+    def has(self, place_name: str, *names) -> bool:
+        # entradas gravadas como incompletas (ex.: elevação faltando) contam
+        # como ausentes, mas continuam legíveis por load/load_compact
+        for n in names:
+            try:
+                with open(os.path.join(self._path(place_name, n), 'meta.json')) as f:
+                    if not json.load(f).get('complete', True):
+                        return False
+            except (OSError, ValueError):
+                return False
+        return True
+
+    def save(self, place_name: str, name: str, G, complete: bool = True):
+        from data.compact_graph import CompactGraph
+        if isinstance(G, CompactGraph):
+            # SegmentedGraph/CompactGraph: grava no mesmo formato do networkx
+            G = G.to_networkx()
+        path = self._path(place_name, name)
+        tmp = path + '.tmp'
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+
+        nodes = list(G.nodes())
+        index = {n: i for i, n in enumerate(nodes)}
+        node_attrs = sorted({k for _, d in G.nodes(data=True) for k in d})
+        multi = G.is_multigraph()
+        edges = list(G.edges(keys=True, data=True)) if multi else [(u, v, None, d) for u, v, d in G.edges(data=True)]
+        edge_attrs = sorted({k for *_, d in edges for k in d})
+
+        meta = {'directed': G.is_directed(), 'multigraph': multi, 'complete': bool(complete), 'columns': {}}
+        ids, _ = _column(nodes)
+        self._save_array(tmp, 'nodes', ids)
+
+        for attr in node_attrs:
+            values, present = _column([d.get(attr) for _, d in G.nodes(data=True)])
+            self._save_column(tmp, meta, f'n.{attr}', values, present)
+
+        # arestas já saem agrupadas por u na ordem dos nós: CSR direto
+        u_idx = np.fromiter((index[e[0]] for e in edges), dtype=np.int64, count=len(edges))
+        indptr = np.concatenate(([0], np.cumsum(np.bincount(u_idx, minlength=len(nodes)))))
+        self._save_array(tmp, 'indptr', indptr)
+        self._save_array(tmp, 'indices', np.fromiter((index[e[1]] for e in edges), dtype=np.int64, count=len(edges)))
+        if multi:
+            keys, _ = _column([e[2] for e in edges])
+            self._save_array(tmp, 'keys', keys)
+
+        for attr in edge_attrs:
+            values = [e[3].get(attr) for e in edges]
+            if attr == 'geometry':
+                present = np.array([v is not None for v in values], dtype=bool)
+                wkb = shapely.to_wkb(np.array(values, dtype=object))
+                sizes = np.array([len(b) if b is not None else 0 for b in wkb], dtype=np.int64)
+                self._save_array(tmp, 'e.geometry.offsets', np.concatenate(([0], np.cumsum(sizes))))
+                blob = b''.join(b for b in wkb if b is not None)
+                self._save_array(tmp, 'e.geometry.wkb', np.frombuffer(blob, dtype=np.uint8))
+                self._save_array(tmp, 'e.geometry.present', present)
+                meta['columns']['e.geometry'] = 'wkb'
+                continue
+            values, present = _column(values)
+            self._save_column(tmp, meta, f'e.{attr}', values, present)
+
+        with open(os.path.join(tmp, 'graph.pkl'), 'wb') as f:
+            pickle.dump(dict(G.graph), f)
+        with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp, path)
+
+    def _save_array(self, path, name, arr):
+        np.save(os.path.join(path, name + '.npy'), arr, allow_pickle=arr.dtype == object)
+
+    def _save_column(self, path, meta, name, values, present):
+        self._save_array(path, name, values)
+        if not present.all():
+            self._save_array(path, name + '.present', present)
+        meta['columns'][name] = str(values.dtype)
+
+    def load_arrays(self, place_name: str, name: str) -> dict:
+        # Colunas numéricas voltam mapeadas em memória; objetos são lidos inteiros
+        path = self._path(place_name, name)
+        arrays = {}
+        for fname in os.listdir(path):
+            if fname.endswith('.npy'):
+                try:
+                    arrays[fname[:-4]] = np.load(os.path.join(path, fname), mmap_mode='r')
+                except ValueError:
+                    arrays[fname[:-4]] = np.load(os.path.join(path, fname), allow_pickle=True)
+        with open(os.path.join(path, 'meta.json')) as f:
+            arrays['meta'] = json.load(f)
+        with open(os.path.join(path, 'graph.pkl'), 'rb') as f:
+            arrays['graph'] = pickle.load(f)
+        return arrays
+
+    def load_compact(self, place_name: str, name: str):
+        from data.compact_graph import CompactGraph
+        return CompactGraph.from_cache_arrays(self.load_arrays(place_name, name))
+
+    def spatial_index(self, place_name: str, name: str, G=None):
+        # Índice R-tree dentro do diretório da entrada: um novo save do grafo
+        # (ex.: outra segmentação) apaga o diretório e, com ele, o índice antigo
+        from data.spatial_index import SpatialIndex
+        path = os.path.join(self._path(place_name, name), 'spatial')
+        if G is not None:
+            return SpatialIndex.from_graph(G, path)
+        return SpatialIndex.from_cache_arrays(self.load_arrays(place_name, name), path)
+
+    def load(self, place_name: str, name: str):
+        a = self.load_arrays(place_name, name)
+        meta = a['meta']
+        if meta['multigraph']:
+            G = nx.MultiDiGraph() if meta['directed'] else nx.MultiGraph()
+        else:
+            G = nx.DiGraph() if meta['directed'] else nx.Graph()
+        G.graph.update(a['graph'])
+
+        node_ids = a['nodes'].tolist()
+        G.add_nodes_from((n, {}) for n in node_ids)
+        node_cols = [c for c in meta['columns'] if c.startswith('n.')]
+        for col in node_cols:
+            self._set_column(a, col, [G.nodes[n] for n in node_ids])
+
+        n_edges = len(a['indices'])
+        datas = [{} for _ in range(n_edges)]
+        for col in meta['columns']:
+            if not col.startswith('e.'):
+                continue
+            if col == 'e.geometry':
+                offsets = a['e.geometry.offsets'].tolist()
+                blob = a['e.geometry.wkb'].tobytes()
+                present = np.flatnonzero(a['e.geometry.present'])
+                wkb = [blob[offsets[i]:offsets[i + 1]] for i in present.tolist()]
+                for i, geom in zip(present.tolist(), shapely.from_wkb(wkb)):
+                    datas[i]['geometry'] = geom
+                continue
+            self._set_column(a, col, datas)
+
+        u = np.repeat(np.asarray(node_ids, dtype=object), np.diff(a['indptr'])).tolist()
+        v = np.asarray(node_ids, dtype=object)[a['indices']].tolist()
+        if meta['multigraph']:
+            G.add_edges_from(zip(u, v, a['keys'].tolist(), datas))
+        else:
+            G.add_edges_from(zip(u, v, datas))
+        return G
+
+    def _set_column(self, a, col, targets):
+        attr = col[2:]
+        values = a[col].tolist()
+        present = a.get(col + '.present')
+        if present is None:
+            for d, val in zip(targets, values):
+                d[attr] = val
+        else:
+            for d, val, p in zip(targets, values, present.tolist()):
+                if p:
+                    d[attr] = val
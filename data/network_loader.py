@@ -1,104 +1,271 @@
 import osmnx as ox
 import networkx as nx
-import math
-from shapely.geometry import LineString
+import numpy as np
+import shapely
+from concurrent.futures import ProcessPoolExecutor
+from rasterio.crs import CRS
+from rasterio.warp import transform as warp_transform
+from data.elevation import RasterElevation, add_edge_grades
+from data.elevation_client import ElevationClient
+from data.graph_cache import GraphCache
+from data.compact_graph import CompactGraph
+from data.segmented_graph import SegmentedGraph
+from utils.utils import to_simple_graph
+from utils.profiling import profiler
 from config.settings import (
     OSMNX_CACHE, OSMNX_LOG, NETWORK_TYPE, 
-    GOOGLE_ELEVATION_API_KEY, GOOGLE_ELEVATION_PAUSE, SEGMENT_LENGTH
+    GOOGLE_ELEVATION_API_KEY, SEGMENT_LENGTH,
+    SEGMENT_PARALLEL_MIN_EDGES, SEGMENT_COMPACT, NUM_WORKERS,
+    ELEVATION_SOURCE, ELEVATION_RASTER_PATH, GRAPH_CACHE_ENABLED
 )
 
+def _interpolate_chunk(geoms, total_lens, n_segs):
+    # distâncias de corte i * (L / n) para i = 0..n de cada aresta, em bloco
+    reps = n_segs + 1
+    step = np.repeat(total_lens / n_segs, reps)
+    i = np.arange(reps.sum()) - np.repeat(np.cumsum(reps) - reps, reps)
+    pts = shapely.line_interpolate_point(np.repeat(geoms, reps), i * step)
+    return shapely.get_coordinates(pts)
+
 class NetworkLoader:
     def __init__(self):
         ox.settings.use_cache = OSMNX_CACHE
         ox.settings.log_console = OSMNX_LOG
 
+    @profiler.profiled('loader.load_network')
     def load_network(self, place_name: str, simplify: bool = True):
         print(f"[Data] Baixando rede de {place_name}...")
         G = ox.graph_from_place(place_name, network_type=NETWORK_TYPE, simplify=simplify)
         G_proj = ox.project_graph(G)
         return G_proj
 
-    def segment_graph(self, G_proj, segment_length=SEGMENT_LENGTH):
+    @profiler.profiled('loader.segment_graph')
+    def segment_graph(self, G_proj, segment_length=SEGMENT_LENGTH, n_jobs=NUM_WORKERS,
+                      compact=SEGMENT_COMPACT):
         print(f"[Data] Segmentando arestas maiores que {segment_length} m...")
-        Gs = nx.MultiDiGraph()
-        Gs.graph.update(G_proj.graph)
-        Gs.add_nodes_from(G_proj.nodes(data=True))
-
-        next_virtual_id = -1
-
-        for u, v, k, data in G_proj.edges(keys=True, data=True):
+        edges = list(G_proj.edges(keys=True, data=True))
+        geoms = np.empty(len(edges), dtype=object)
+        total_lens = np.empty(len(edges), dtype=float)
+        missing = []
+        for e, (u, v, k, data) in enumerate(edges):
             geom = data.get("geometry")
             if geom is None:
-                p1 = G_proj.nodes[u]
-                p2 = G_proj.nodes[v]
-                geom = LineString([(p1['x'], p1['y']), (p2['x'], p2['y'])])
+                missing.append(e)
+            geoms[e] = geom
+            total_lens[e] = data.get("length", np.nan)
 
-            total_len = float(data.get("length", geom.length))
+        if missing:
+            # arestas sem geometria viram retas entre os nós, criadas em lote
+            coords = np.array([
+                [(G_proj.nodes[edges[e][0]]['x'], G_proj.nodes[edges[e][0]]['y']),
+                 (G_proj.nodes[edges[e][1]]['x'], G_proj.nodes[edges[e][1]]['y'])]
+                for e in missing
+            ], dtype=float)
+            geoms[missing] = shapely.linestrings(coords)
+        no_len = np.isnan(total_lens)
+        total_lens[no_len] = shapely.length(geoms[no_len])
 
-            if total_len <= segment_length * 1.05:
-                Gs.add_edge(u, v, key=k, **dict(data))
-                continue
+        split = total_lens > segment_length * 1.05
+        n_segs = np.zeros(len(edges), dtype=np.int64)
+        n_segs[split] = np.maximum(1, np.ceil(total_lens[split] / segment_length)).astype(np.int64)
 
-            n_segs = max(1, int(math.ceil(total_len / segment_length)))
-            cut_ds = [i * (total_len / n_segs) for i in range(n_segs + 1)]
+        split_idx = np.flatnonzero(split)
+        points = self._interpolate_cuts(geoms[split_idx], total_lens[split_idx], n_segs[split_idx], n_jobs)
 
-            prev_node = u
-            prev_pt = geom.interpolate(cut_ds[0])
+        if compact:
+            # trechos como (aresta-mãe, início/fim), sem dict nem LineString por trecho
+            Gs = SegmentedGraph(G_proj, edges, geoms, total_lens, n_segs, points)
+            print(f"[Data] Segmentação compacta concluída: {Gs.number_of_nodes()} nós, {Gs.number_of_edges()} arestas")
+            return Gs
 
-            for i in range(1, len(cut_ds)):
-                pt = geom.interpolate(cut_ds[i])
+        Gs = nx.MultiDiGraph()
+        Gs.graph.update(G_proj.graph)
+        Gs.add_nodes_from(G_proj.nodes(data=True))
+
+        # geometria e comprimento de todos os segmentos de uma vez: pares de
+        # pontos consecutivos, descartando os pares que cruzam de uma aresta à outra
+        offsets = np.concatenate(([0], np.cumsum(n_segs[split_idx] + 1)))
+        keep = np.ones(max(len(points) - 1, 0), dtype=bool)
+        keep[offsets[1:-1] - 1] = False
+        seg_geoms = shapely.linestrings(np.stack([points[:-1][keep], points[1:][keep]], axis=1)) if keep.any() else []
+        seg_lens = shapely.length(seg_geoms).tolist() if keep.any() else []
+        xs = points[:, 0].tolist()
+        ys = points[:, 1].tolist()
 
-                if i == len(cut_ds) - 1:
+        new_nodes = []
+        new_edges = []
+        next_virtual_id = -1
+        seg_pos = 0
+        split_list = split.tolist()
+        n_list = n_segs.tolist()
+        p = 0
+        for e, (u, v, k, data) in enumerate(edges):
+            if not split_list[e]:
+                new_edges.append((u, v, k, dict(data)))
+                continue
+
+            n = n_list[e]
+            base = int(offsets[p])
+            p += 1
+            prev_node = u
+            for i in range(1, n + 1):
+                if i == n:
                     curr_node = v
                 else:
                     curr_node = next_virtual_id
                     next_virtual_id -= 1
-                    Gs.add_node(curr_node, x=float(pt.x), y=float(pt.y), virtual=True)
+                    new_nodes.append((curr_node, {'x': xs[base + i], 'y': ys[base + i], 'virtual': True}))
 
-                seg_geom = LineString([(prev_pt.x, prev_pt.y), (pt.x, pt.y)])
                 seg_data = dict(data)
-                seg_data["geometry"] = seg_geom
-                seg_data["length"] = float(seg_geom.length)
+                seg_data["geometry"] = seg_geoms[seg_pos]
+                seg_data["length"] = seg_lens[seg_pos]
                 seg_data["orig_edge_key"] = k
-
-                new_key = f"{k}_{i-1}"
-                Gs.add_edge(prev_node, curr_node, key=new_key, **seg_data)
+                new_edges.append((prev_node, curr_node, f"{k}_{i-1}", seg_data))
                 prev_node = curr_node
-                prev_pt = pt
+                seg_pos += 1
+
+        Gs.add_nodes_from(new_nodes)
+        Gs.add_edges_from(new_edges)
 
         print(f"[Data] Segmentação concluída: {Gs.number_of_nodes()} nós, {Gs.number_of_edges()} arestas")
         return Gs
 
-    def add_elevation_data(self, G_proj, api_key=None):
+    def _interpolate_cuts(self, geoms, total_lens, n_segs, n_jobs=1):
+        # Todos os pontos de corte de todas as arestas numa chamada vetorizada;
+        # grafos muito grandes dividem o trabalho em blocos entre processos.
+        n_jobs = max(1, n_jobs or 1)
+        if n_jobs == 1 or len(geoms) < SEGMENT_PARALLEL_MIN_EDGES:
+            return _interpolate_chunk(geoms, total_lens, n_segs)
+
+        bounds = np.linspace(0, len(geoms), n_jobs * 4 + 1).astype(int)
+        chunks = [(geoms[a:b], total_lens[a:b], n_segs[a:b]) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            parts = list(pool.map(_interpolate_chunk, *zip(*chunks)))
+        return np.concatenate(parts)
+
+    @profiler.profiled('loader.add_elevation_data')
+    def add_elevation_data(self, G_proj, api_key=None, source=None):
         if api_key is None:
             api_key = GOOGLE_ELEVATION_API_KEY
+        if source is None:
+            source = ELEVATION_SOURCE
+
+        if isinstance(G_proj, CompactGraph):
+            return self._add_elevation_compact(G_proj, api_key, source)
+        if source == 'raster':
+            return self._add_elevation_raster(G_proj, api_key)
 
         if not api_key:
             print("[Data] AVISO: Sem chave de API. Pulando elevação (grade=0).")
             nx.set_edge_attributes(G_proj, 0, "grade_abs")
+            G_proj.graph['elevation_complete'] = False
             return G_proj
 
         print("[Data] Consultando Google Elevation API...")
-        G_ll = ox.project_graph(G_proj, to_crs="EPSG:4326")
-
-        try:
-            G_ll = ox.elevation.add_node_elevations_google(
-                G_ll, api_key=api_key, pause=GOOGLE_ELEVATION_PAUSE
-            )
-            G_ll = ox.elevation.add_edge_grades(G_ll, add_absolute=True)
-            G_final = ox.project_graph(G_ll)
-            print("[Data] Elevação adicionada com sucesso!")
-            return G_final
-        except Exception as e:
-            nx.set_edge_attributes(G_proj, 0, "grade_abs")
-            return G_proj
+        return self._set_node_elevations(
+            G_proj, lambda xs, ys: self._google_elevations(xs, ys, G_proj.graph.get('crs'), api_key))
+
+    def _add_elevation_raster(self, G_proj, api_key):
+        return self._set_node_elevations(
+            G_proj, lambda xs, ys: self._raster_elevations(xs, ys, G_proj.graph.get('crs'), api_key))
+
+    def _set_node_elevations(self, G_proj, fetch):
+        # fetch(xs, ys) -> elevação por nó (nan onde faltou); nós sem elevação
+        # deixam suas arestas com grade 0 (add_edge_grades avisa quantas)
+        nodes = list(G_proj.nodes())
+        xs = np.fromiter((G_proj.nodes[n]['x'] for n in nodes), dtype=float, count=len(nodes))
+        ys = np.fromiter((G_proj.nodes[n]['y'] for n in nodes), dtype=float, count=len(nodes))
+        elevations = fetch(xs, ys)
+
+        found = ~np.isnan(elevations)
+        nx.set_node_attributes(
+            G_proj, dict(zip(np.asarray(nodes, dtype=object)[found].tolist(), elevations[found].tolist())), "elevation"
+        )
+        add_edge_grades(G_proj)
+        # com nós sem elevação o grafo não vai para o cache como completo
+        G_proj.graph['elevation_complete'] = bool(found.all())
+        print("[Data] Elevação adicionada com sucesso!")
+        return G_proj
+
+    def _add_elevation_compact(self, Gs, api_key, source):
+        # SegmentedGraph/CompactGraph: elevação dos nós e grades direto nos arrays
+        xs, ys = Gs.node_data['x'], Gs.node_data['y']
+        crs = Gs.graph.get('crs')
+        if source == 'raster':
+            elevations = self._raster_elevations(xs, ys, crs, api_key)
+        elif not api_key:
+            print("[Data] AVISO: Sem chave de API. Pulando elevação (grade=0).")
+            Gs.edge_data['grade_abs'] = np.zeros(Gs.number_of_edges())
+            Gs.graph['elevation_complete'] = False
+            return Gs
+        else:
+            print("[Data] Consultando Google Elevation API...")
+            elevations = self._google_elevations(xs, ys, crs, api_key)
+        Gs.set_elevation(elevations)
+        Gs.graph['elevation_complete'] = bool(np.isfinite(elevations).all())
+        print("[Data] Elevação adicionada com sucesso!")
+        return Gs
+
+    def _raster_elevations(self, xs, ys, crs, api_key) -> np.ndarray:
+        print(f"[Data] Amostrando elevação do DEM {ELEVATION_RASTER_PATH}...")
+        elevations = RasterElevation(ELEVATION_RASTER_PATH).sample(xs, ys, crs=crs)
+        profiler.count('elevation_raster_nodes', len(xs))
+
+        outside = np.flatnonzero(np.isnan(elevations))
+        if len(outside) and api_key:
+            # só os nós fora do raster (ou em nodata) vão para a API
+            print(f"[Data] {len(outside)} nós fora do DEM, consultando Google Elevation API...")
+            elevations[outside] = self._google_elevations(xs[outside], ys[outside], crs, api_key)
+        elif len(outside):
+            print(f"[Data] AVISO: {len(outside)} nós fora do DEM e sem chave de API.")
+        return elevations
+
+    def _google_elevations(self, xs, ys, crs, api_key) -> np.ndarray:
+        # elevação por ponto (CRS do grafo) pelo ElevationClient; nan nos pontos
+        # cujo lote falhou, sem descartar os demais
+        lon, lat = warp_transform(CRS.from_user_input(crs), CRS.from_epsg(4326), np.asarray(xs), np.asarray(ys))
+        elevations, failed = ElevationClient(api_key=api_key).lookup(lat, lon)
+        if failed:
+            reasons = sorted(set(failed.values()))
+            print(f"[Data] AVISO: {len(failed)} nós sem elevação da API ({'; '.join(reasons[:3])}).")
+        return elevations
+
+    @profiler.profiled('loader.load_and_segment_with_elevation')
+    def load_and_segment_with_elevation(self, place_name: str, use_cache: bool = GRAPH_CACHE_ENABLED,
+                                        with_simple: bool = False, compact: bool = SEGMENT_COMPACT):
+        # compact=True: os grafos segmentados voltam como SegmentedGraph (ou
+        # CompactGraph, quando lidos do cache) em vez de networkx
+        cache = GraphCache()
+        names = ('proj', 'seg_elev') + (('simple', 'simple_seg') if with_simple else ())
+
+        if use_cache and cache.has(place_name, *names):
+            print(f"[Data] Carregando grafos de {place_name} do cache ({cache.key(place_name)})...")
+            profiler.count('graph_cache_hits')
+            with profiler.stage('loader.cache_load', place=place_name):
+                return tuple(cache.load_compact(place_name, name)
+                             if compact and name in ('seg_elev', 'simple_seg') else cache.load(place_name, name)
+                             for name in names)
 
-    def load_and_segment_with_elevation(self, place_name: str):
         G_proj = self.load_network(place_name)
 
-        G_seg = self.segment_graph(G_proj)
+        G_seg = self.segment_graph(G_proj, compact=compact)
 
         G_seg_elev = self.add_elevation_data(G_seg)
 
-        return G_proj, G_seg_elev
+        graphs = (G_proj, G_seg_elev)
+        if with_simple:
+            with profiler.stage('loader.to_simple_graph'):
+                graphs += (to_simple_graph(G_proj), to_simple_graph(G_seg_elev))
+
+        if use_cache:
+            profiler.count('graph_cache_misses')
+            # sem chave ou com lotes da API que falharam, os grafos com elevação
+            # ficam marcados como incompletos e são refeitos na próxima execução
+            complete = G_seg_elev.graph.get('elevation_complete', True)
+            for name, G in zip(names, graphs):
+                cache.save(place_name, name, G, complete=complete or name in ('proj', 'simple'))
+            print(f"[Data] Grafos salvos no cache ({cache.key(place_name)}).")
+            if not complete:
+                print("[Data] AVISO: Elevação incompleta; o cache será refeito na próxima execução.")
 
+        return graphs
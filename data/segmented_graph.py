@@ -0,0 +1,147 @@
+import networkx as nx
+import numpy as np
+import shapely
+from data.compact_graph import CompactGraph
+
+
+class SegmentedGraph(CompactGraph):
+    # Grafo segmentado sem materializar os trechos: cada aresta é (aresta-mãe,
+    # trecho i de n, início/fim em metros ao longo da mãe) e os nós virtuais são
+    # só coordenadas. Atributos da via (name, osmid, highway...) continuam nos
+    # dicts do G_proj, compartilhados por todos os trechos; geometria e chave
+    # são montadas sob demanda. Como é um CompactGraph, PercolationSimulator,
+    # AccessibilityEngine e to_simple_graph o usam direto.
+    def __init__(self, G_proj, edges, geoms, total_lens, n_segs, points):
+        nodes = list(G_proj.nodes())
+        index = {n: i for i, n in enumerate(nodes)}
+        n_real = len(nodes)
+        n_segs = np.asarray(n_segs, dtype=np.int64)
+        split = n_segs > 0
+
+        # nós virtuais: pontos de corte internos, na mesma ordem (e com os mesmos
+        # ids -1, -2, ...) do NetworkLoader.segment_graph
+        block = n_segs[split] + 1
+        starts = np.cumsum(block) - block
+        interior = np.ones(len(points), dtype=bool)
+        interior[starts] = False
+        interior[starts + block - 1] = False
+        n_virtual = int(interior.sum())
+
+        xs = np.concatenate((np.fromiter((G_proj.nodes[n]['x'] for n in nodes), dtype=float, count=n_real),
+                             points[interior, 0]))
+        ys = np.concatenate((np.fromiter((G_proj.nodes[n]['y'] for n in nodes), dtype=float, count=n_real),
+                             points[interior, 1]))
+        virtual_ids = -np.arange(1, n_virtual + 1, dtype=np.int64)
+        if all(isinstance(n, (int, np.integer)) for n in nodes):
+            node_ids = np.concatenate((np.array(nodes, dtype=np.int64), virtual_ids))
+        else:
+            node_ids = np.concatenate((np.fromiter(nodes, dtype=object, count=n_real),
+                                       virtual_ids.astype(object)))
+
+        # trecho i da aresta e liga o ponto de corte i ao i + 1; arestas não
+        # divididas são um único trecho de u a v
+        counts = np.where(split, n_segs, 1)
+        parent = np.repeat(np.arange(len(edges)), counts)
+        seg_i = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        seg_n = counts[parent]
+        inner = np.where(split, n_segs - 1, 0)
+        first_virtual = n_real + np.cumsum(inner) - inner
+        u_idx = np.fromiter((index[e[0]] for e in edges), dtype=np.int64, count=len(edges))
+        v_idx = np.fromiter((index[e[1]] for e in edges), dtype=np.int64, count=len(edges))
+
+        def cut_node(i):
+            return np.where(i == 0, u_idx[parent],
+                            np.where(i == seg_n, v_idx[parent], first_virtual[parent] + i - 1))
+
+        src, dst = cut_node(seg_i), cut_node(seg_i + 1)
+        total_lens = np.asarray(total_lens, dtype=float)
+        lengths = np.where(split[parent], np.hypot(xs[dst] - xs[src], ys[dst] - ys[src]), total_lens[parent])
+
+        # CompactGraph espera as arestas ordenadas por origem
+        order = np.argsort(src, kind='stable')
+        self.parent = G_proj
+        self.parent_edges = [(u, v, k) for u, v, k, _ in edges]
+        self._parent_data = [d for *_, d in edges]
+        self._parent_geoms = geoms
+        self._parent_split = split
+        self.virtual = np.arange(len(node_ids)) >= n_real
+        self.seg_parent = parent[order]
+        self.seg_index = seg_i[order]
+        self.seg_start = (seg_i * total_lens[parent] / seg_n)[order]
+        self.seg_end = ((seg_i + 1) * total_lens[parent] / seg_n)[order]
+
+        node_data = {'x': xs, 'y': ys}
+        for attr in ('street_count', 'elevation'):
+            values = [G_proj.nodes[n].get(attr) for n in nodes]
+            if any(v is not None for v in values):
+                node_data[attr] = np.concatenate((
+                    np.array([np.nan if v is None else v for v in values], dtype=float), np.full(n_virtual, np.nan)))
+        super().__init__(node_ids, src[order], dst[order], node_data, {'length': lengths[order]},
+                         G_proj.is_directed(), G_proj.graph)
+
+    def parent_attribute(self, attr) -> np.ndarray:
+        # atributo da aresta-mãe de cada trecho (object), lido dos dicts do G_proj
+        values = np.empty(len(self._parent_data), dtype=object)
+        values[:] = [d.get(attr) for d in self._parent_data]
+        return values[self.seg_parent]
+
+    def edge_column(self, attr, default=np.nan) -> np.ndarray:
+        if attr not in self.edge_data and any(attr in d for d in self._parent_data):
+            values = self.parent_attribute(attr)
+            try:
+                return np.array([default if v is None else v for v in values.tolist()], dtype=float)
+            except (TypeError, ValueError):
+                pass
+        return super().edge_column(attr, default)
+
+    def geometries(self, edges=None) -> np.ndarray:
+        # Trecho de aresta dividida: reta entre os pontos de corte (como no
+        # segment_graph); aresta inteira: a geometria da mãe (ou reta u-v)
+        edges = np.arange(self.number_of_edges()) if edges is None else np.asarray(edges)
+        parent = self.seg_parent[edges]
+        out = self._parent_geoms[parent].copy()
+        cut = self._parent_split[parent]
+        if cut.any():
+            s, d = self.src[edges[cut]], self.dst[edges[cut]]
+            x, y = self.node_data['x'], self.node_data['y']
+            out[cut] = shapely.linestrings(np.stack((np.column_stack((x[s], y[s])),
+                                                     np.column_stack((x[d], y[d]))), axis=1))
+        return out
+
+    def edge_key(self, e):
+        k = self.parent_edges[self.seg_parent[e]][2]
+        return f"{k}_{self.seg_index[e]}" if self._parent_split[self.seg_parent[e]] else k
+
+    def to_networkx(self):
+        # Materializa o mesmo MultiDiGraph do NetworkLoader.segment_graph (para o
+        # GraphCache e código que ainda espera networkx)
+        Gs = nx.MultiDiGraph()
+        Gs.graph.update(self.graph)
+        ids = self.node_ids.tolist()
+        elev = self.node_data.get('elevation')
+        elev = elev.tolist() if elev is not None else [np.nan] * len(ids)
+        xs, ys = self.node_data['x'].tolist(), self.node_data['y'].tolist()
+        virtual = self.virtual.tolist()
+        for i, n in enumerate(ids):
+            data = {'x': xs[i], 'y': ys[i], 'virtual': True} if virtual[i] else dict(self.parent.nodes[n])
+            if elev[i] == elev[i]:
+                data['elevation'] = elev[i]
+            Gs.add_node(n, **data)
+
+        order = np.lexsort((self.seg_index, self.seg_parent)).tolist()
+        geoms = self.geometries()
+        cols = {k: v.tolist() for k, v in self.edge_data.items() if k != 'length'}
+        length = self.edge_data['length'].tolist()
+        src, dst = self.src.tolist(), self.dst.tolist()
+        parent = self.seg_parent.tolist()
+        for e in order:
+            p = parent[e]
+            data = dict(self._parent_data[p])
+            if self._parent_split[p]:
+                data['geometry'] = geoms[e]
+                data['length'] = length[e]
+                data['orig_edge_key'] = self.parent_edges[p][2]
+            for k, col in cols.items():
+                data[k] = col[e]
+            Gs.add_edge(ids[src[e]], ids[dst[e]], key=self.edge_key(e), **data)
+        return Gs
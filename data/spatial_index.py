@@ -0,0 +1,212 @@
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+import shapely
+from rtree import index as rtree_index
+from utils.profiling import profiler
+from config.settings import SPATIAL_INDEX_CANDIDATES, SPATIAL_INDEX_LEAF_CAPACITY
+
+SPATIAL_INDEX_VERSION = 1
+
+
+class SpatialIndex:
+    # Índice R-tree dos nós e das geometrias das arestas (no grafo segmentado,
+    # os trechos de ~50 m), para consultas em lote com arrays de coordenadas no
+    # CRS projetado do grafo. A árvore filtra candidatos pela caixa envolvente;
+    # a distância exata vem do shapely, vetorizada sobre todos os pares.
+    # Com `path`, as árvores ficam em disco e só são reconstruídas quando a
+    # assinatura (coordenadas dos nós e caixas das arestas) muda.
+    def __init__(self, node_ids, xs, ys, edges, geoms, path=None):
+        self.node_ids = np.asarray(node_ids)
+        self.xs = np.asarray(xs, dtype=float)
+        self.ys = np.asarray(ys, dtype=float)
+        self.edges = edges
+        self.geoms = geoms
+        self.path = path
+
+        node_box = np.column_stack((self.xs, self.ys))
+        edge_box = shapely.bounds(geoms) if len(geoms) else np.empty((0, 4))
+        self.signature = self._signature(node_box, edge_box)
+
+        if path and self._is_current(path):
+            self._nodes = rtree_index.Index(os.path.join(path, 'nodes'))
+            self._edges = rtree_index.Index(os.path.join(path, 'edges'))
+            profiler.count('spatial_index_hits')
+            return
+
+        with profiler.stage('spatial.build', nodes=len(self.xs), edges=len(geoms)):
+            if path:
+                tmp = path + '.tmp'
+                shutil.rmtree(tmp, ignore_errors=True)
+                os.makedirs(tmp)
+                self._build(tmp, node_box, edge_box)
+                with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+                    json.dump({'version': SPATIAL_INDEX_VERSION, 'signature': self.signature}, f)
+                # os arquivos do rtree só ficam completos ao fechar o índice
+                self._nodes.close()
+                self._edges.close()
+                shutil.rmtree(path, ignore_errors=True)
+                os.replace(tmp, path)
+                self._nodes = rtree_index.Index(os.path.join(path, 'nodes'))
+                self._edges = rtree_index.Index(os.path.join(path, 'edges'))
+            else:
+                self._build(None, node_box, edge_box)
+        print(f"[Spatial] Índice R-tree: {len(self.xs)} nós, {len(geoms)} arestas")
+
+    @classmethod
+    def from_graph(cls, G, path=None):
+        # Arestas sem geometria viram a reta entre os nós, como no ox.plot_graph
+        nodes = list(G.nodes())
+        xs = np.fromiter((G.nodes[n]['x'] for n in nodes), dtype=float, count=len(nodes))
+        ys = np.fromiter((G.nodes[n]['y'] for n in nodes), dtype=float, count=len(nodes))
+        index = {n: i for i, n in enumerate(nodes)}
+        if G.is_multigraph():
+            edges = [(u, v, k) for u, v, k in G.edges(keys=True)]
+            geoms = [g for _, _, _, g in G.edges(keys=True, data='geometry')]
+        else:
+            edges = list(G.edges())
+            geoms = [g for _, _, g in G.edges(data='geometry')]
+        if all(isinstance(n, (int, np.integer)) for n in nodes):
+            node_ids = np.array(nodes, dtype=np.int64)
+        else:
+            node_ids = np.fromiter(nodes, dtype=object, count=len(nodes))
+        u = np.fromiter((index[e[0]] for e in edges), dtype=np.int64, count=len(edges))
+        v = np.fromiter((index[e[1]] for e in edges), dtype=np.int64, count=len(edges))
+        geom_arr = np.empty(len(geoms), dtype=object)
+        geom_arr[:] = geoms
+        return cls(node_ids, xs, ys, edges, cls._fill_geometries(geom_arr, xs, ys, u, v), path)
+
+    @classmethod
+    def from_cache_arrays(cls, a, path=None):
+        # Colunas de GraphCache.load_arrays, sem montar o grafo networkx
+        node_ids = np.asarray(a['nodes'])
+        xs, ys = np.asarray(a['n.x'], dtype=float), np.asarray(a['n.y'], dtype=float)
+        u = np.repeat(np.arange(len(node_ids), dtype=np.int64), np.diff(a['indptr']))
+        v = np.asarray(a['indices'], dtype=np.int64)
+        objs = np.asarray(node_ids, dtype=object)
+        if a['meta']['multigraph']:
+            edges = list(zip(objs[u].tolist(), objs[v].tolist(), a['keys'].tolist()))
+        else:
+            edges = list(zip(objs[u].tolist(), objs[v].tolist()))
+
+        geoms = np.full(len(v), None, dtype=object)
+        if 'e.geometry.wkb' in a:
+            offsets = a['e.geometry.offsets'].tolist()
+            blob = a['e.geometry.wkb'].tobytes()
+            present = np.flatnonzero(a['e.geometry.present'])
+            geoms[present] = shapely.from_wkb([blob[offsets[i]:offsets[i + 1]] for i in present.tolist()])
+        geoms = cls._fill_geometries(geoms, xs, ys, u, v)
+        return cls(node_ids, xs, ys, edges, geoms, path)
+
+    @staticmethod
+    def _fill_geometries(geoms, xs, ys, u, v) -> np.ndarray:
+        missing = np.flatnonzero(shapely.is_missing(geoms))
+        if len(missing):
+            coords = np.stack((np.column_stack((xs[u[missing]], ys[u[missing]])),
+                               np.column_stack((xs[v[missing]], ys[v[missing]]))), axis=1)
+            geoms[missing] = shapely.linestrings(coords)
+        return geoms
+
+    @staticmethod
+    def _signature(node_box, edge_box) -> str:
+        h = hashlib.sha1()
+        for arr in (node_box, edge_box):
+            h.update(np.ascontiguousarray(arr, dtype=np.float64).tobytes())
+            h.update(str(arr.shape).encode())
+        return h.hexdigest()
+
+    def _is_current(self, path) -> bool:
+        try:
+            with open(os.path.join(path, 'meta.json')) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return False
+        return meta.get('version') == SPATIAL_INDEX_VERSION and meta.get('signature') == self.signature
+
+    def _build(self, directory, node_box, edge_box):
+        # carga em bloco (STR) direto dos arrays: sem laço Python por item
+        for name, mins, maxs in (('nodes', node_box, node_box),
+                                 ('edges', edge_box[:, :2], edge_box[:, 2:])):
+            props = rtree_index.Property(leaf_capacity=SPATIAL_INDEX_LEAF_CAPACITY, overwrite=True)
+            ids = np.arange(len(mins), dtype=np.int64)
+            arrays = (ids, np.ascontiguousarray(mins), np.ascontiguousarray(maxs))
+            if directory is None:
+                tree = rtree_index.Index(arrays, properties=props) if len(ids) else rtree_index.Index(properties=props)
+            elif len(ids):
+                tree = rtree_index.Index(os.path.join(directory, name), arrays, properties=props)
+            else:
+                tree = rtree_index.Index(os.path.join(directory, name), properties=props)
+            setattr(self, f'_{name}', tree)
+
+    @staticmethod
+    def _points(xs, ys) -> np.ndarray:
+        return np.column_stack((np.atleast_1d(np.asarray(xs, dtype=float)),
+                                np.atleast_1d(np.asarray(ys, dtype=float))))
+
+    def nearest_nodes(self, xs, ys, return_dist=False):
+        # Para pontos, a distância à caixa já é a distância exata
+        pts = self._points(xs, ys)
+        ids, counts = self._nodes.nearest_v(pts, pts, num_results=1, strict=True)
+        counts = counts.astype(np.int64)
+        first = np.cumsum(counts) - counts
+        idx = ids[first]
+        profiler.count('spatial_node_queries', len(pts))
+        if not return_dist:
+            return self.node_ids[idx]
+        return self.node_ids[idx], np.hypot(self.xs[idx] - pts[:, 0], self.ys[idx] - pts[:, 1])
+
+    def nearest_edges(self, xs, ys, return_dist=False):
+        # Busca k candidatas pela caixa e refina com a distância exata; o ponto
+        # está resolvido quando a melhor distância exata não passa da maior
+        # distância de caixa devolvida (nenhuma aresta fora da lista pode ser
+        # mais próxima). Os demais repetem a busca com 2k candidatas.
+        pts = self._points(xs, ys)
+        best = np.full(len(pts), -1, dtype=np.int64)
+        best_dist = np.full(len(pts), np.inf)
+        pending = np.arange(len(pts))
+        k = SPATIAL_INDEX_CANDIDATES
+        while len(pending) and len(self.geoms):
+            q = pts[pending]
+            ids, counts, max_dists = self._edges.nearest_v(q, q, num_results=k, return_max_dists=True)
+            counts = counts.astype(np.int64)
+            owner = np.repeat(np.arange(len(q)), counts)
+            dist = shapely.distance(self.geoms[ids], shapely.points(q[owner]))
+            order = np.lexsort((ids, dist, owner))
+            first = order[np.concatenate(([True], owner[order][1:] != owner[order][:-1]))]
+            best[pending[owner[first]]] = ids[first]
+            best_dist[pending[owner[first]]] = dist[first]
+
+            done = (dist[first] <= max_dists) | (counts < k)
+            pending = pending[~done]
+            k *= 2
+        profiler.count('spatial_edge_queries', len(pts))
+
+        edges = [self.edges[i] for i in best.tolist()]
+        return (edges, best_dist) if return_dist else edges
+
+    def _within(self, tree, pts, radius) -> tuple:
+        radius = np.broadcast_to(np.asarray(radius, dtype=float), (len(pts),))
+        ids, counts = tree.intersection_v(pts - radius[:, None], pts + radius[:, None])
+        owner = np.repeat(np.arange(len(pts)), counts.astype(np.int64))
+        return ids, owner, radius
+
+    def nodes_within(self, xs, ys, radius) -> pd.DataFrame:
+        # Um registro por par (ponto, nó) a até `radius` metros (escalar ou por ponto)
+        pts = self._points(xs, ys)
+        ids, owner, radius = self._within(self._nodes, pts, radius)
+        dist = np.hypot(self.xs[ids] - pts[owner, 0], self.ys[ids] - pts[owner, 1])
+        keep = dist <= radius[owner]
+        out = pd.DataFrame({'point': owner[keep], 'node': self.node_ids[ids[keep]], 'dist': dist[keep]})
+        return out.sort_values(['point', 'dist'], kind='stable', ignore_index=True)
+
+    def edges_within(self, xs, ys, radius) -> pd.DataFrame:
+        pts = self._points(xs, ys)
+        ids, owner, radius = self._within(self._edges, pts, radius)
+        dist = shapely.distance(self.geoms[ids], shapely.points(pts[owner])) if len(ids) else np.empty(0)
+        keep = dist <= radius[owner]
+        ids, owner, dist = ids[keep], owner[keep], dist[keep]
+        out = pd.DataFrame({'point': owner, 'edge': [self.edges[i] for i in ids.tolist()], 'dist': dist})
+        return out.sort_values(['point', 'dist'], kind='stable', ignore_index=True)
@@ -1,19 +1,51 @@
-from config.settings import PLACES, MAX_GRADE_NBR9050
-from utils.utils import to_simple_graph
+from config.settings import (
+    PLACES, MAX_GRADE_NBR9050, BETWEENNESS_EPSILON, BETWEENNESS_DELTA, PLOT_OUTPUT_DIR, PLOT_FORMAT,
+    ACCESS_SAMPLE_ORIGINS, RANDOM_SEED, FSS_ENABLED
+)
 from data.network_loader import NetworkLoader
 from analysis.basic_stats import NetworkStats
 from analysis.centrality import CentralityAnalyzer
 from analysis.percolation import PercolationSimulator
+from analysis.accessibility import AccessibilityEngine
 from visualization.plots import NetworkVisualizer
+from utils.profiling import profiler
+import argparse
 import numpy as np
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Análise da rede pedonal")
+    parser.add_argument('--plots-dir', default=None, help="grava as figuras neste diretório, sem janelas")
+    parser.add_argument('--plots-format', default=None, choices=('png', 'svg'))
+    parser.add_argument('--fss', action='store_true', help="estima f*(N→∞) por escala de tamanho finito")
+    parser.add_argument('--profile', action='store_true', help="registra tempo/memória por etapa")
+    parser.add_argument('--profile-dir', default=None, help="diretório do relatório e do trace")
+    parser.add_argument('--no-profile-memory', action='store_true', help="desliga o tracemalloc por etapa")
+    parser.add_argument('--cprofile', nargs='*', default=None,
+                        help="etapas com captura do cProfile (sem nomes = todas)")
+    return parser.parse_args()
+
 def main():
-    
+    args = parse_args()
+    profiler.configure(
+        enabled=True if args.profile or args.cprofile is not None else None,
+        output_dir=args.profile_dir,
+        memory=False if args.no_profile_memory else None,
+        cprofile=(args.cprofile or ['*']) if args.cprofile is not None else None,
+    )
+    with profiler.stage('main'):
+        run(args)
+
+    if profiler.enabled:
+        profiler.summary()
+        report, trace = profiler.save()
+        print(f"[Profile] Relatório em {report}; trace (chrome://tracing) em {trace}")
+
+def run(args):
     loader = NetworkLoader()
     # Pipeline completo: download -> segmentação -> elevação
-    G_proj, G_seg_elev = loader.load_and_segment_with_elevation(PLACES['botafogo'][0])
-    G_simple = to_simple_graph(G_proj)
-    G_simple_seg = to_simple_graph(G_seg_elev)
+    G_proj, G_seg_elev, G_simple, G_simple_seg = loader.load_and_segment_with_elevation(
+        PLACES['botafogo'][0], with_simple=True
+    )
 
     stats = NetworkStats(G_proj)
     basic_metrics = stats.get_basic_metrics()
@@ -27,30 +59,35 @@ def main():
     for key, value in topo_metrics.items():
         print(f"  {key}: {value:.4f}" if isinstance(value, float) else f"  {key}: {value}")
 
-    viz = NetworkVisualizer(G_proj)
+    viz = NetworkVisualizer(G_proj, output_dir=args.plots_dir or PLOT_OUTPUT_DIR,
+                            fmt=args.plots_format or PLOT_FORMAT)
     viz.plot_basic_network("Rede Pedonal de Botafogo", basic_metrics)
     
     centrality = CentralityAnalyzer(G_proj)
 
-    print("\n[Centrality] Calculando centralidade métrica (weight=length)...")
-    bc_metric = centrality.calculate_betweenness(weight='length')
-    top_metric = centrality.get_top_nodes(bc_metric)
-
-    print("\n[Centrality] Calculando centralidade topológica (sem peso)...")
-    bc_topo = centrality.calculate_betweenness(weight=None, normalized=True, attribute='betweenness_topo')
-    top_topo = centrality.get_top_nodes(bc_topo)
+    # Métrica (weight=length) e topológica (sem peso) no mesmo pool e com as mesmas fontes
+    print("\n[Centrality] Calculando centralidade métrica (weight=length) e topológica (sem peso)...")
+    bc = centrality.calculate_betweenness_variants(
+        {'betweenness': 'length', 'betweenness_topo': None}, normalized=True,
+        epsilon=BETWEENNESS_EPSILON, delta=BETWEENNESS_DELTA
+    )
+    top_metric = centrality.get_top_nodes(bc['betweenness'])
+    top_topo = centrality.get_top_nodes(bc['betweenness_topo'])
 
     viz.plot_centrality_heatmap(attribute='betweenness', title="Centralidade Métrica (Distância)")
     viz.plot_centrality_heatmap(attribute='betweenness_topo', title="Centralidade Topológica (Estrutura)")
     viz.plot_centrality_divergence(top_metric.items(), top_topo.items())
 
     percolation = PercolationSimulator(G_simple, G_simple_seg, num_simulations=100)
-    fractions = np.linspace(0, 1, 50)
     print("\n" + "="*60)
     print("PERCOLAÇÃO - ARESTAS ALEATORIAS")
-    results = percolation.run_simulation(fractions)
+    # grade adaptativa: refinada em torno de f* em vez de um linspace fixo
+    results = percolation.run_simulation()
 
     print(f"\n[Resultado] Limiar Crítico: {results['critical_threshold']:.4f}")
+    if args.fss or FSS_ENABLED:
+        fss = percolation.finite_size_scaling()
+        print(f"[Resultado] Limiar por escala de tamanho finito (N→∞): {fss['f_inf']:.4f}")
     viz.plot_percolation_results(results, title="Percolação Aleatória - Robustez da Rede")
 
     print("\n" + "="*60)
@@ -67,25 +104,22 @@ def main():
         title=f"Percolação Direcionada - Remoção de Ladeiras (>{MAX_GRADE_NBR9050*100:.1f}%)"
     )
 
-    if results_targeted['num_inaccessible'] > 0:
-        if results_targeted['g2_sizes'] and len(results_targeted['g2_sizes']) > 0:
-            idx_critical = int(np.argmax(results_targeted['g2_sizes']))
-        else:
-            idx_critical = 0
-        f_critical = results_targeted['fractions'][idx_critical]
-
-        print(f"[Resultado] Limiar crítico (remoção de inacessíveis): {f_critical:.4f}")
-
-        viz.plot_percolation_results(
-            {
-                'fractions': results_targeted['fractions'],
-                'avg_G1': results_targeted['g1_sizes'],
-                'avg_G2': results_targeted['g2_sizes'],
-                'critical_threshold': f_critical,
-                'max_G2': results_targeted['g2_sizes'][idx_critical]
-            },
-            title=f"Percolação Direcionada - Remoção de Ladeiras (>{MAX_GRADE_NBR9050*100:.1f}%)"
-        )
+    if results_targeted['critical_edge'] is not None:
+        u, v = results_targeted['critical_edge']
+        print(f"[Resultado] Aresta crítica: ({u}, {v}) com inclinação {results_targeted['critical_grade']*100:.2f}%")
+
+    print("\n" + "="*60)
+    print("ACESSIBILIDADE - DISTÂNCIA COM E SEM LADEIRAS")
+    print("="*60)
+    access = AccessibilityEngine(G_seg_elev, max_grade=MAX_GRADE_NBR9050)
+    # origens sorteadas entre os nós reais (os virtuais da segmentação têm id negativo)
+    real_nodes = [n for n in G_proj.nodes() if n in G_seg_elev]
+    rng = np.random.default_rng(RANDOM_SEED)
+    origins = rng.choice(len(real_nodes), min(ACCESS_SAMPLE_ORIGINS, len(real_nodes)), replace=False)
+    ratios = access.distance_ratio([real_nodes[i] for i in origins])
+
+    print(f"[Resultado] Razão acessível/sem restrição (mediana das origens): {ratios['ratio_mean'].median():.3f}")
+    print(f"[Resultado] Destinos perdidos por origem (mediana): {ratios['pct_lost'].median():.2f}%")
 
     print("\n" + "="*60)
     print("ANÁLISE CONCLUÍDA")
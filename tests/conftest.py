@@ -0,0 +1,5 @@
+import os
+import sys
+
+# os módulos do projeto são importados a partir da raiz (analysis, data, config...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,48 @@
+import networkx as nx
+import numpy as np
+import pytest
+from analysis.accessibility import AccessibilityEngine
+from benchmarks.generators import synthetic_street_network
+
+MAX_GRADE = 0.0833
+
+
+@pytest.fixture(scope='module')
+def graph():
+    return synthetic_street_network('favela', 600, seed=5)
+
+
+def _reference(graph, origin, accessible):
+    G = graph
+    if accessible:
+        G = nx.edge_subgraph(graph, [(u, v, k) for u, v, k, g in graph.edges(keys=True, data='grade_abs')
+                                     if g <= MAX_GRADE]).copy()
+        G.add_nodes_from(graph.nodes())
+    return nx.single_source_dijkstra_path_length(G, origin, weight='length')
+
+
+@pytest.mark.parametrize('accessible', [True, False])
+def test_distances_and_isochrones_match_networkx(graph, accessible):
+    engine = AccessibilityEngine(graph, max_grade=MAX_GRADE, cache_rows=2, batch_size=2)
+    nodes = list(graph.nodes())
+    origins = nodes[::37]
+    dist = engine.many_to_many(origins, nodes, accessible=accessible)
+    # de novo, agora com parte das linhas vindo do cache LRU
+    np.testing.assert_array_equal(engine.many_to_many(origins, nodes, accessible=accessible), dist)
+
+    iso = engine.isochrone(origins, 300.0, accessible=accessible)
+    for i, o in enumerate(origins):
+        ref = _reference(graph, o, accessible)
+        expected = np.array([ref.get(n, np.inf) for n in nodes])
+        np.testing.assert_allclose(dist[i], expected, rtol=1e-5)
+        reach, d = iso[o]
+        assert set(reach.tolist()) == {n for n, x in ref.items() if x <= 300.0}
+        np.testing.assert_allclose(d, [ref[n] for n in reach.tolist()], rtol=1e-5)
+
+
+def test_constrained_distances_never_shorter(graph):
+    engine = AccessibilityEngine(graph, max_grade=MAX_GRADE)
+    df = engine.distance_ratio(list(graph.nodes())[:20])
+    assert df['ratio_mean'].dropna().ge(1 - 1e-5).all()
+    assert (df['pct_lost'] > 0).any()
+    assert (df['reachable_accessible'] <= df['reachable_unconstrained']).all()
@@ -0,0 +1,54 @@
+import networkx as nx
+import numpy as np
+import pytest
+from analysis.attacks import ATTACK_STRATEGIES, DegreeAttack
+from analysis.percolation import PercolationSimulator
+from benchmarks.generators import synthetic_street_network
+from utils.utils import to_simple_graph
+
+
+@pytest.fixture(scope='module')
+def graph():
+    return to_simple_graph(synthetic_street_network('perturbed', 300, seed=21))
+
+
+def _component_sizes(G):
+    sizes = sorted((len(c) for c in nx.connected_components(G)), reverse=True) + [0, 0]
+    return sizes[0], sizes[1]
+
+
+@pytest.mark.parametrize('strategy', list(ATTACK_STRATEGIES))
+def test_attack_curves_match_networkx_removal(graph, strategy):
+    sim = PercolationSimulator(graph, num_simulations=1)
+    lcc_graph = sim._lcc_graph(sim.lcc)
+    columns = set(lcc_graph.node_data)
+    result = sim.run_attack(strategy)
+    # o grafo da LCC é compartilhado entre ataques: nenhuma coluna nova nele
+    assert set(lcc_graph.node_data) == columns
+
+    H = graph.subgraph(max(nx.connected_components(graph), key=len)).copy()
+    n = H.number_of_nodes()
+    removed = result['removed']
+    assert len(removed) == (n if result['target'] == 'node' else H.number_of_edges())
+    for r in range(len(removed) + 1):
+        if r:
+            if result['target'] == 'node':
+                H.remove_node(removed[r - 1])
+            else:
+                H.remove_edge(*removed[r - 1])
+        g1, g2 = _component_sizes(H)
+        assert round(result['g1_sizes'][r] * n) == g1
+        assert round(result['g2_sizes'][r] * n) == g2
+
+
+def test_adaptive_degree_removes_current_maximum(graph):
+    sim = PercolationSimulator(graph, num_simulations=1)
+    lcc_graph = sim._lcc_graph(sim.lcc)
+    order = DegreeAttack(adaptive=True).order(lcc_graph)
+    indptr, nbrs, _ = lcc_graph.adjacency()
+    H = nx.Graph()
+    H.add_nodes_from(range(lcc_graph.number_of_nodes()))
+    H.add_edges_from(zip(np.repeat(np.arange(len(indptr) - 1), np.diff(indptr)).tolist(), nbrs.tolist()))
+    for v in order.tolist():
+        assert H.degree(v) == max(d for _, d in H.degree())
+        H.remove_node(v)
@@ -0,0 +1,37 @@
+import networkx as nx
+import numpy as np
+import pytest
+from analysis.basic_stats import NetworkStats
+from benchmarks.generators import synthetic_street_network
+
+
+def _simple_min_length(G):
+    # nx.Graph com a aresta mais curta de cada par, como NetworkStats.G_simple
+    H = nx.Graph()
+    H.add_nodes_from(G.nodes())
+    for u, v, length in G.edges(data='length'):
+        if u != v and (not H.has_edge(u, v) or length < H[u][v]['length']):
+            H.add_edge(u, v, length=length)
+    return H
+
+
+@pytest.mark.parametrize('kind', ['perturbed', 'favela'])
+def test_ifub_diameter_and_metrics_match_networkx(kind):
+    G = synthetic_street_network(kind, 600, seed=4)
+    # rua paralela mais longa: a distância deve usar a mais curta
+    u, v, k, d = next(iter(G.edges(keys=True, data=True)))
+    G.add_edge(u, v, 7, length=d['length'] * 10)
+
+    stats = NetworkStats(G)
+    H = _simple_min_length(G)
+    lcc = H.subgraph(max(nx.connected_components(H), key=len))
+
+    assert stats.diameter() == nx.diameter(lcc)
+    assert stats.diameter(weight='length') == pytest.approx(nx.diameter(lcc, weight='length'))
+    assert stats.avg_clustering == pytest.approx(nx.average_clustering(H))
+    assert stats.transitivity == pytest.approx(nx.transitivity(H))
+
+    ids, lower, upper = stats.eccentricity_bounds(weight='length')
+    ecc = nx.eccentricity(lcc, weight='length')
+    exact = np.array([ecc[n] for n in ids.tolist()])
+    assert np.all(lower <= exact + 1e-6) and np.all(exact <= upper + 1e-6)
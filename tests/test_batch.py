@@ -0,0 +1,23 @@
+from concurrent.futures import ThreadPoolExecutor
+import batch
+
+
+def test_stale_dependents_rerun_and_blocked_stages_reported(tmp_path, monkeypatch):
+    # tudo no cache menos 'segment', que falha ao rodar de novo
+    ran = []
+
+    def run_stage(stage, place_name, out_dir):
+        ran.append(stage)
+        if stage == 'segment':
+            raise RuntimeError("falha simulada")
+        return 0.0
+
+    monkeypatch.setattr(batch, '_stage_done', lambda stage, place, out_dir: stage != 'segment')
+    monkeypatch.setattr(batch, 'run_stage', run_stage)
+    monkeypatch.setattr(batch, 'ProcessPoolExecutor', ThreadPoolExecutor)
+
+    summary = batch.BatchRunner(['Teste'], str(tmp_path), cpu_workers=1, io_workers=1).run()
+
+    # elevation e percolation estavam no cache, mas dependem de 'segment'
+    assert ran == ['segment']
+    assert summary.loc[0, 'status'] == 'failed: segment; blocked: elevation,percolation'
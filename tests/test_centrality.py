@@ -0,0 +1,31 @@
+import networkx as nx
+import numpy as np
+import pytest
+from analysis.centrality import CentralityAnalyzer
+from benchmarks.generators import synthetic_street_network
+from data.compact_graph import CompactGraph
+
+
+@pytest.fixture(scope='module')
+def graph():
+    return synthetic_street_network('perturbed', 150, seed=6)
+
+
+@pytest.mark.parametrize('weight', ['length', None])
+@pytest.mark.parametrize('compact', [False, True])
+def test_exact_betweenness_matches_networkx(graph, weight, compact):
+    G = CompactGraph.from_networkx(graph) if compact else graph
+    bc = CentralityAnalyzer(G, n_jobs=1).calculate_betweenness(weight=weight)
+    expected = nx.betweenness_centrality(graph, weight=weight, normalized=True)
+    np.testing.assert_allclose([bc[n] for n in graph.nodes()], [expected[n] for n in graph.nodes()],
+                               rtol=1e-9, atol=1e-12)
+
+
+def test_sampled_betweenness_within_reported_epsilon():
+    graph = synthetic_street_network('perturbed', 2000, seed=6)
+    analyzer = CentralityAnalyzer(graph, n_jobs=1, seed=1)
+    bc = analyzer.calculate_betweenness(weight='length', epsilon=0.1, delta=0.1)
+    info = analyzer.sampling_info['betweenness']
+    assert info['k'] < graph.number_of_nodes()
+    expected = nx.betweenness_centrality(graph, weight='length', normalized=True)
+    assert max(abs(bc[n] - expected[n]) for n in graph.nodes()) <= info['epsilon']
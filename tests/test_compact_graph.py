@@ -0,0 +1,14 @@
+import numpy as np
+from data.compact_graph import CompactGraph
+
+
+def test_to_undirected_simple_keep_rule():
+    # duas arestas paralelas 0-1: a longa é a mais íngreme
+    cg = CompactGraph([10, 11, 12], [0, 1, 1], [1, 0, 2], {},
+                      {'length': np.array([100.0, 40.0, 5.0]), 'grade_abs': np.array([0.10, 0.02, 0.0])})
+
+    steep = cg.to_undirected_simple()
+    short = cg.to_undirected_simple(keep='min_length')
+    assert steep.number_of_edges() == short.number_of_edges() == 2
+    assert steep.edge_data['length'].tolist() == [100.0, 5.0]
+    assert short.edge_data['length'].tolist() == [40.0, 5.0]
@@ -0,0 +1,31 @@
+import networkx as nx
+import numpy as np
+import pytest
+from analysis.dynamic_centrality import DynamicBetweenness
+from benchmarks.generators import synthetic_street_network
+
+
+def _remove_street(G, u, v):
+    for a, b in ((u, v), (v, u)):
+        while G.has_edge(a, b):
+            G.remove_edge(a, b)
+
+
+@pytest.mark.parametrize('weight', ['length', None])
+def test_dynamic_betweenness_matches_recomputation(weight):
+    graph = synthetic_street_network('perturbed', 300, seed=12)
+    dyn = DynamicBetweenness(graph, weight=weight)
+    streets = list({tuple(sorted((u, v))) for u, v in graph.edges()})
+    removals = [streets[i] for i in np.random.default_rng(0).choice(len(streets), 12, replace=False)]
+
+    H = graph.copy()
+    # uma a uma e depois em lote: o resultado deve ser o recálculo do zero
+    for batch in [removals[:1], removals[1:2], removals[2:6], removals[6:]]:
+        recomputed = dyn.remove_edges(batch)
+        assert recomputed <= len(dyn.sources)
+        for u, v in batch:
+            _remove_street(H, u, v)
+        expected = nx.betweenness_centrality(H, weight=weight, normalized=True)
+        values = dyn.values()
+        np.testing.assert_allclose([values[n] for n in H.nodes()], [expected[n] for n in H.nodes()],
+                                   rtol=1e-9, atol=1e-12)
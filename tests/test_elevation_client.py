@@ -0,0 +1,86 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import numpy as np
+import pytest
+from data.elevation_client import ElevationClient
+
+
+class ElevationHandler(BaseHTTPRequestHandler):
+    # Servidor local no formato da Elevation API; a resposta de cada lote é
+    # escolhida pela primeira coordenada pedida
+    def do_GET(self):
+        locations = parse_qs(urlparse(self.path).query)['locations'][0].split('|')
+        first = locations[0]
+        self.server.requests.append(first)
+        if first == '1.0,1.0' and self.server.requests.count(first) == 1:
+            self._send(429, b'', {'Retry-After': '0'})
+        elif first == '3.0,3.0':
+            self._send(200, b'<html>erro</html>')
+        elif first == '5.0,5.0':
+            self._send(200, json.dumps(['não', 'é', 'dict']).encode())
+        elif first == '7.0,7.0':
+            self._send(200, json.dumps({'status': 'OK', 'results': [{'elevation': 'abc'}] * len(locations)}).encode())
+        else:
+            results = [{'elevation': float(loc.split(',')[0]) * 10} for loc in locations]
+            self._send(200, json.dumps({'status': 'OK', 'results': results}).encode())
+
+    def _send(self, code, body, headers=None):
+        self.send_response(code)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), ElevationHandler)
+    httpd.requests = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _client(server, **kwargs):
+    return ElevationClient(api_key='x', base_url=f'http://127.0.0.1:{server.server_port}/json',
+                           cache_path=None, decimals=1, batch_size=2, max_workers=2,
+                           rate=0, max_retries=1, backoff=0, **kwargs)
+
+
+def test_retry_after_429_then_success(server):
+    elevations, failed = _client(server).lookup([1, 2], [1, 2])
+    assert elevations.tolist() == [10.0, 20.0]
+    assert failed == {}
+    assert server.requests == ['1.0,1.0', '1.0,1.0']
+
+
+def test_malformed_batches_fail_only_their_points(server):
+    lats = lons = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
+    elevations, failed = _client(server).lookup(lats, lons)
+    assert elevations[[0, 1, 8, 9]].tolist() == [10.0, 20.0, 90.0, 100.0]
+    assert np.isnan(elevations[2:8]).all()
+    assert sorted(failed) == [2, 3, 4, 5, 6, 7]
+
+
+def test_unexpected_error_fails_only_its_batch(server, monkeypatch):
+    client = _client(server)
+    original = client._request
+
+    def request(locations):
+        if locations[0] == '9.0,9.0':
+            raise KeyError('elevation')
+        return original(locations)
+
+    monkeypatch.setattr(client, '_request', request)
+    elevations, failed = client.lookup([1, 2, 9, 10], [1, 2, 9, 10])
+    assert elevations[:2].tolist() == [10.0, 20.0]
+    assert sorted(failed) == [2, 3]
+    assert failed[2].startswith('KeyError')
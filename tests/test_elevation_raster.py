@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+import rasterio
+from rasterio.transform import from_origin
+from data.elevation import RasterElevation
+
+NODATA = -32768
+
+
+@pytest.fixture
+def int16_dem(tmp_path):
+    # DEM 64x64 em int16 (como o SRTM), pixel de 10 m, blocos de 16x16
+    data = (np.arange(64 * 64).reshape(64, 64) % 3000).astype(np.int16)
+    data[5, 7] = NODATA
+    path = str(tmp_path / 'dem.tif')
+    with rasterio.open(path, 'w', driver='GTiff', width=64, height=64, count=1, dtype='int16',
+                       crs='EPSG:31983', transform=from_origin(0, 640, 10, 10), nodata=NODATA,
+                       tiled=True, blockxsize=16, blockysize=16) as dst:
+        dst.write(data, 1)
+    return path, data
+
+
+@pytest.mark.parametrize('max_window_pixels', [64 * 64, 1])
+def test_int16_dem_window_and_block_paths(int16_dem, max_window_pixels):
+    path, data = int16_dem
+    rows = np.array([0, 5, 40, 63])
+    cols = np.array([0, 7, 33, 63])
+    xs = cols * 10 + 5.0
+    ys = 640 - (rows * 10 + 5.0)
+    # um ponto fora do raster
+    xs, ys = np.append(xs, -50.0), np.append(ys, 100.0)
+
+    values = RasterElevation(path, max_window_pixels=max_window_pixels).sample(xs, ys)
+    expected = data[rows, cols].astype(float)
+    expected[1] = np.nan
+    np.testing.assert_array_equal(values, np.append(expected, np.nan))
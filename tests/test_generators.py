@@ -0,0 +1,30 @@
+import networkx as nx
+import numpy as np
+import pytest
+from benchmarks.generators import synthetic_street_network
+
+
+@pytest.mark.parametrize('kind', ['grid', 'perturbed', 'favela'])
+def test_synthetic_network_in_osmnx_format(kind):
+    G = synthetic_street_network(kind, 2000, seed=1)
+    H = synthetic_street_network(kind, 2000, seed=1)
+    assert nx.utils.graphs_equal(G, H)
+    assert G.graph['crs'] and G.is_multigraph() and G.is_directed()
+    assert 0.5 * 2000 <= G.number_of_edges() <= 1.1 * 2000
+
+    for u, v, k, d in G.edges(keys=True, data=True):
+        # toda rua nos dois sentidos, com a geometria invertida e a grade oposta
+        back = G[v][u][k]
+        assert back['grade'] == -d['grade'] and back['length'] == d['length']
+        assert d['length'] == pytest.approx(d['geometry'].length)
+        assert d['grade'] == pytest.approx((G.nodes[v]['elevation'] - G.nodes[u]['elevation']) / d['length'])
+        assert d['geometry'].coords[0] == (G.nodes[u]['x'], G.nodes[u]['y'])
+
+
+def test_favela_is_steeper_than_grid():
+    steep = {}
+    for kind in ('grid', 'favela'):
+        grades = np.array([g for *_, g in synthetic_street_network(kind, 2000, seed=2).edges(data='grade_abs')])
+        steep[kind] = (grades > 0.0833).mean()
+    assert steep['grid'] == 0
+    assert steep['favela'] > 0.1
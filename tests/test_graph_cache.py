@@ -0,0 +1,34 @@
+import numpy as np
+from benchmarks.generators import synthetic_street_network
+from data.graph_cache import GraphCache
+from data.network_loader import NetworkLoader
+
+
+def test_graph_without_elevation_is_cached_as_incomplete(tmp_path):
+    cache = GraphCache(str(tmp_path))
+    G = NetworkLoader().add_elevation_data(synthetic_street_network('grid', 100, seed=3), api_key='', source='google')
+    assert G.graph['elevation_complete'] is False
+
+    cache.save('Teste', 'seg_elev', G, complete=G.graph['elevation_complete'])
+    cache.save('Teste', 'proj', G)
+    # incompleta: refeita na próxima execução, mas ainda legível nesta
+    assert not cache.has('Teste', 'seg_elev')
+    assert not cache.has('Teste', 'proj', 'seg_elev')
+    assert cache.has('Teste', 'proj')
+    loaded = cache.load('Teste', 'seg_elev')
+    assert loaded.number_of_edges() == G.number_of_edges()
+    assert np.all([g == 0 for _, _, g in loaded.edges(data='grade_abs')])
+
+
+def test_key_changes_when_raster_is_replaced(tmp_path, monkeypatch):
+    import data.graph_cache as graph_cache
+    dem = tmp_path / 'dem.tif'
+    dem.write_bytes(b'a' * 10)
+    monkeypatch.setattr(graph_cache, 'ELEVATION_SOURCE', 'raster')
+    monkeypatch.setattr(graph_cache, 'ELEVATION_RASTER_PATH', str(dem))
+    cache = GraphCache(str(tmp_path / 'cache'))
+
+    before = cache.key('Teste')
+    assert cache.key('Teste') == before
+    dem.write_bytes(b'b' * 20)
+    assert cache.key('Teste') != before
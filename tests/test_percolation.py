@@ -0,0 +1,57 @@
+import networkx as nx
+import numpy as np
+import pytest
+from analysis.percolation import PercolationSimulator
+from benchmarks.generators import synthetic_street_network
+from utils.utils import to_simple_graph
+
+FRACTIONS = np.linspace(0, 1, 11)
+
+
+@pytest.fixture(scope='module')
+def graph():
+    return to_simple_graph(synthetic_street_network('grid', 225, seed=4))
+
+
+def test_parallel_monte_carlo_is_reproducible(graph):
+    # mesmas sementes por realização: o nº de processos não muda o resultado
+    runs = []
+    for n_jobs in (1, 2):
+        sim = PercolationSimulator(graph, num_simulations=40, seed=3, n_jobs=n_jobs)
+        runs.append((sim, sim.run_simulation(FRACTIONS, ci_width=None, checkpoint_dir=None)))
+    (a, ra), (b, rb) = runs
+    np.testing.assert_array_equal(a.curve_G1, b.curve_G1)
+    np.testing.assert_array_equal(a.curve_G2, b.curve_G2)
+    assert ra['avg_G2'] == rb['avg_G2']
+    assert ra['critical_threshold'] == rb['critical_threshold']
+
+
+def _component_sizes(G):
+    sizes = sorted((len(c) for c in nx.connected_components(G)), reverse=True) + [0]
+    return sizes[0], sizes[1]
+
+
+def test_targeted_percolation_matches_networkx_removal():
+    G = nx.convert_node_labels_to_integers(nx.grid_2d_graph(12, 12))
+    rng = np.random.default_rng(8)
+    for u, v in G.edges():
+        G[u][v]['grade_abs'] = float(rng.uniform(0, 0.15))
+        G[u][v]['length'] = 50.0
+    threshold = 0.0833
+
+    result = PercolationSimulator(G, G, num_simulations=1).run_targeted_percolation(threshold)
+    removed = result['removed_edges']
+    grades = [G[u][v]['grade_abs'] for u, v in removed]
+    assert len(removed) == sum(g > threshold for *_, g in G.edges(data='grade_abs'))
+    assert grades == sorted(grades, reverse=True)
+
+    # remoção uma a uma, recalculando as componentes do zero
+    H = G.copy()
+    n = G.number_of_nodes()
+    for r in range(len(removed) + 1):
+        if r:
+            H.remove_edge(*removed[r - 1])
+        g1, g2 = _component_sizes(H)
+        assert round(result['g1_sizes'][r] * n) == g1
+        assert round(result['g2_sizes'][r] * n) == g2
+    assert result['max_G2'] == result['g2_sizes'].max()
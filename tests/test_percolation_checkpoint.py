@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from analysis.percolation import PercolationSimulator, refine_fractions
+from benchmarks.generators import synthetic_street_network
+from config.settings import MC_BATCH_SIZE
+from utils.utils import to_simple_graph
+
+FRACTIONS = np.linspace(0, 1, 21)
+NUM_SIMULATIONS = 4 * MC_BATCH_SIZE + 5
+
+
+@pytest.fixture(scope='module')
+def graph():
+    return to_simple_graph(synthetic_street_network('grid', 400, seed=7))
+
+
+def _run(graph, checkpoint_dir=None):
+    sim = PercolationSimulator(graph, num_simulations=NUM_SIMULATIONS, seed=11, n_jobs=1)
+    return sim, sim.run_simulation(FRACTIONS, checkpoint_dir=checkpoint_dir)
+
+
+def test_fixed_count_run_resumes_bit_identical(graph, tmp_path, monkeypatch):
+    ref_sim, ref = _run(graph)
+
+    # interrompe logo depois do 2º checkpoint, como um processo morto no meio
+    original = PercolationSimulator._save_checkpoint
+    calls = []
+
+    def interrupted(self, state, done):
+        original(self, state, done)
+        calls.append(done)
+        if len(calls) == 2:
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(PercolationSimulator, '_save_checkpoint', interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        _run(graph, tmp_path)
+    assert calls == [MC_BATCH_SIZE, 2 * MC_BATCH_SIZE]
+    assert (tmp_path / 'state.json').exists()
+
+    monkeypatch.setattr(PercolationSimulator, '_save_checkpoint', original)
+    sim, resumed = _run(graph, tmp_path)
+
+    assert resumed['num_simulations'] == NUM_SIMULATIONS
+    np.testing.assert_array_equal(sim.curve_G1, ref_sim.curve_G1)
+    np.testing.assert_array_equal(sim.curve_G2, ref_sim.curve_G2)
+    for key in ('avg_G1', 'avg_G2', 'se_G1', 'se_G2'):
+        assert resumed[key] == ref[key]
+    assert resumed['critical_threshold'] == ref['critical_threshold']
+
+
+def test_adaptive_grid_recentred_on_final_curves(graph):
+    sim = PercolationSimulator(graph, num_simulations=NUM_SIMULATIONS, seed=11, n_jobs=1)
+    results = sim.run_simulation(ci_width=None, checkpoint_dir=None)
+
+    final = refine_fractions(sim.curve_G1, sim.curve_G2, sim.M_lcc)
+    assert np.isin(final, results['fractions']).all()
+    # f* é o pico exato da curva completa, não o da grade (que pode parar num máximo local)
+    assert results['critical_threshold'] == np.argmax(sim.curve_G2) / sim.M_lcc
+    assert results['max_G2'] == sim.curve_G2.max()
+    # erro padrão só nas frações realmente amostradas
+    se = np.asarray(results['se_G2'])
+    assert len(se) == len(results['fractions'])
+    assert np.isfinite(se).any()
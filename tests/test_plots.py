@@ -0,0 +1,38 @@
+import matplotlib
+import numpy as np
+import pytest
+from benchmarks.generators import synthetic_street_network
+from visualization.plots import NetworkVisualizer
+
+
+@pytest.fixture(scope='module')
+def graph():
+    G = synthetic_street_network('perturbed', 300, seed=2)
+    u, v, k = next(iter(G.edges(keys=True)))
+    del G[u][v][k]['geometry']
+    return G
+
+
+def test_segments_cover_every_edge_geometry(graph, tmp_path):
+    viz = NetworkVisualizer(graph, output_dir=str(tmp_path))
+    expected = []
+    for u, v, geom in graph.edges(data='geometry'):
+        coords = np.asarray(geom.coords) if geom is not None else np.array(
+            [(graph.nodes[u]['x'], graph.nodes[u]['y']), (graph.nodes[v]['x'], graph.nodes[v]['y'])])
+        expected.extend(zip(coords[:-1].tolist(), coords[1:].tolist()))
+    got = [tuple(map(tuple, s)) for s in viz._segments.tolist()]
+    assert sorted(got) == sorted((tuple(a), tuple(b)) for a, b in expected)
+
+
+@pytest.mark.parametrize('raster_min_edges', [0, 10 ** 9])
+def test_headless_plots_written_to_files(graph, tmp_path, raster_min_edges):
+    viz = NetworkVisualizer(graph, output_dir=str(tmp_path), fmt='png', raster_min_edges=raster_min_edges)
+    assert matplotlib.get_backend().lower() == 'agg'
+    assert viz.raster == (raster_min_edges == 0)
+
+    path = viz.plot_basic_network("Rede Básica — São Paulo")
+    assert path.endswith('rede_basica_sao_paulo.png')
+    assert (tmp_path / 'rede_basica_sao_paulo.png').stat().st_size > 0
+    if viz.raster:
+        # cada trecho cai em pelo menos um pixel do histograma
+        assert viz._edge_density.sum() >= len(viz._segments)
@@ -0,0 +1,43 @@
+import json
+import time
+from data.compact_graph import CompactGraph
+from utils.profiling import Profiler
+
+
+def test_nested_stages_counters_and_trace(tmp_path):
+    profiler = Profiler(enabled=True, output_dir=str(tmp_path), memory=True, cprofile=())
+
+    @profiler.profiled('build')
+    def build():
+        profiler.count('items', 3)
+        return CompactGraph([1, 2, 3], [0, 1], [1, 2])
+
+    with profiler.stage('outer', place='Teste'):
+        time.sleep(0.001)
+        build()
+        profiler.count('items')
+
+    stages = {s['name']: s for s in profiler.stages}
+    assert stages['build']['depth'] == 1 and stages['outer']['depth'] == 0
+    assert stages['build']['args'] == {'out_nodes': 3, 'out_edges': 2}
+    # contadores das etapas filhas somam na mãe
+    assert stages['build']['counters'] == {'items': 3}
+    assert stages['outer']['counters'] == {'items': 4}
+    assert profiler.counters == {'items': 4}
+    assert stages['outer']['wall_s'] >= stages['build']['wall_s']
+    assert 'traced_peak_mb' in stages['outer']
+
+    report, trace = profiler.save()
+    with open(trace) as f:
+        events = [e for e in json.load(f)['traceEvents'] if e['ph'] == 'X']
+    assert [e['name'] for e in events] == ['outer', 'build']
+    with open(report) as f:
+        assert json.load(f)['counters'] == {'items': 4}
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = Profiler(enabled=False)
+    with profiler.stage('x'):
+        profiler.count('items')
+    assert profiler.profiled('y')(lambda: 5)() == 5
+    assert profiler.stages == [] and profiler.counters == {}
@@ -0,0 +1,98 @@
+import math
+import numpy as np
+import networkx as nx
+import pytest
+from shapely.geometry import LineString
+from benchmarks.generators import synthetic_street_network
+from data.network_loader import NetworkLoader
+
+SEGMENT = 50
+
+
+def _reference_segment_graph(G_proj, segment_length):
+    # segment_graph anterior à versão vetorizada (uma aresta por vez, com interpolate)
+    Gs = nx.MultiDiGraph()
+    Gs.graph.update(G_proj.graph)
+    Gs.add_nodes_from(G_proj.nodes(data=True))
+    next_virtual_id = -1
+    for u, v, k, data in G_proj.edges(keys=True, data=True):
+        geom = data.get("geometry")
+        if geom is None:
+            p1, p2 = G_proj.nodes[u], G_proj.nodes[v]
+            geom = LineString([(p1['x'], p1['y']), (p2['x'], p2['y'])])
+        total_len = float(data.get("length", geom.length))
+        if total_len <= segment_length * 1.05:
+            Gs.add_edge(u, v, key=k, **dict(data))
+            continue
+        n_segs = max(1, int(math.ceil(total_len / segment_length)))
+        cut_ds = [i * (total_len / n_segs) for i in range(n_segs + 1)]
+        prev_node, prev_pt = u, geom.interpolate(cut_ds[0])
+        for i in range(1, len(cut_ds)):
+            pt = geom.interpolate(cut_ds[i])
+            if i == len(cut_ds) - 1:
+                curr_node = v
+            else:
+                curr_node = next_virtual_id
+                next_virtual_id -= 1
+                Gs.add_node(curr_node, x=float(pt.x), y=float(pt.y), virtual=True)
+            seg_geom = LineString([(prev_pt.x, prev_pt.y), (pt.x, pt.y)])
+            seg_data = dict(data, geometry=seg_geom, length=float(seg_geom.length), orig_edge_key=k)
+            Gs.add_edge(prev_node, curr_node, key=f"{k}_{i-1}", **seg_data)
+            prev_node, prev_pt = curr_node, pt
+    return Gs
+
+
+@pytest.fixture(scope='module')
+def graph():
+    G = synthetic_street_network('favela', 400, seed=9)
+    # algumas arestas sem geometria: viram retas entre os nós
+    for i, (u, v, k) in enumerate(list(G.edges(keys=True))):
+        if i % 7 == 0:
+            del G[u][v][k]['geometry']
+    return G
+
+
+def assert_same_segmentation(Gs, ref):
+    assert list(Gs.nodes()) == list(ref.nodes())
+    for n, data in ref.nodes(data=True):
+        assert Gs.nodes[n].get('virtual') == data.get('virtual')
+        assert Gs.nodes[n]['x'] == pytest.approx(data['x'])
+        assert Gs.nodes[n]['y'] == pytest.approx(data['y'])
+
+    assert sorted(map(str, Gs.edges(keys=True))) == sorted(map(str, ref.edges(keys=True)))
+    for u, v, k, data in ref.edges(keys=True, data=True):
+        seg = Gs[u][v][k]
+        assert seg['length'] == pytest.approx(data['length'])
+        assert seg.get('orig_edge_key') == data.get('orig_edge_key')
+        if 'geometry' in data:
+            np.testing.assert_allclose(np.asarray(seg['geometry'].coords), np.asarray(data['geometry'].coords))
+
+
+def test_vectorized_segmentation_matches_reference(graph):
+    ref = _reference_segment_graph(graph, SEGMENT)
+    assert ref.number_of_edges() > graph.number_of_edges()
+    assert_same_segmentation(NetworkLoader().segment_graph(graph, SEGMENT, n_jobs=1, compact=False), ref)
+
+
+def test_parallel_cut_interpolation_matches_serial(graph, monkeypatch):
+    import data.network_loader as network_loader
+    monkeypatch.setattr(network_loader, 'SEGMENT_PARALLEL_MIN_EDGES', 0)
+    serial = NetworkLoader().segment_graph(graph, SEGMENT, n_jobs=1, compact=False)
+    assert_same_segmentation(NetworkLoader().segment_graph(graph, SEGMENT, n_jobs=2, compact=False), serial)
+
+
+def test_compact_segmented_graph_matches_materialized(graph):
+    loader = NetworkLoader()
+    full = loader.segment_graph(graph, SEGMENT, n_jobs=1, compact=False)
+    Gs = loader.segment_graph(graph, SEGMENT, n_jobs=1, compact=True)
+    assert Gs.number_of_nodes() == full.number_of_nodes()
+    assert Gs.number_of_edges() == full.number_of_edges()
+    # trechos sob demanda: a geometria e a chave de cada um batem com as materializadas
+    for e in range(0, Gs.number_of_edges(), 13):
+        u, v = Gs.node_ids[Gs.src[e]], Gs.node_ids[Gs.dst[e]]
+        data = full[u][v][Gs.edge_key(e)]
+        assert Gs.edge_data['length'][e] == pytest.approx(data['length'])
+        np.testing.assert_allclose(np.asarray(Gs.geometries([e])[0].coords),
+                                   np.asarray(data['geometry'].coords) if 'geometry' in data else
+                                   [(graph.nodes[u]['x'], graph.nodes[u]['y']), (graph.nodes[v]['x'], graph.nodes[v]['y'])])
+    assert_same_segmentation(Gs.to_networkx(), full)
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+import shapely
+from benchmarks.generators import synthetic_street_network
+from data.spatial_index import SpatialIndex
+
+
+@pytest.fixture(scope='module')
+def graph():
+    return synthetic_street_network('favela', 800, seed=3)
+
+
+@pytest.fixture(scope='module')
+def points(graph):
+    xs = np.array([x for _, x in graph.nodes(data='x')])
+    ys = np.array([y for _, y in graph.nodes(data='y')])
+    rng = np.random.default_rng(1)
+    return (rng.uniform(xs.min() - 50, xs.max() + 50, 200), rng.uniform(ys.min() - 50, ys.max() + 50, 200))
+
+
+def _brute(graph):
+    nodes = list(graph.nodes())
+    xy = np.array([(graph.nodes[n]['x'], graph.nodes[n]['y']) for n in nodes])
+    edges = list(graph.edges(keys=True))
+    geoms = np.array([g for *_, g in graph.edges(keys=True, data='geometry')], dtype=object)
+    return nodes, xy, edges, geoms
+
+
+def test_queries_match_brute_force(graph, points):
+    index = SpatialIndex.from_graph(graph)
+    nodes, xy, edges, geoms = _brute(graph)
+    xs, ys = points
+    pts = shapely.points(xs, ys)
+
+    node_dist = np.hypot(xy[:, 0][None] - xs[:, None], xy[:, 1][None] - ys[:, None])
+    got, dist = index.nearest_nodes(xs, ys, return_dist=True)
+    np.testing.assert_allclose(dist, node_dist.min(axis=1))
+    assert [nodes.index(n) for n in got.tolist()] == node_dist.argmin(axis=1).tolist()
+
+    edge_dist = shapely.distance(geoms[None, :], pts[:, None])
+    got, dist = index.nearest_edges(xs, ys, return_dist=True)
+    np.testing.assert_allclose(dist, edge_dist.min(axis=1))
+    # empates (ida e volta da mesma rua) aceitam qualquer uma das arestas
+    for i, e in enumerate(got):
+        assert edge_dist[i, edges.index(e)] == pytest.approx(edge_dist[i].min())
+
+    within = index.nodes_within(xs, ys, 120.0)
+    expected = {(i, nodes[j]) for i, j in zip(*np.nonzero(node_dist <= 120.0))}
+    assert set(zip(within['point'], within['node'])) == expected
+
+    within = index.edges_within(xs, ys, 60.0)
+    expected = {(i, edges[j]) for i, j in zip(*np.nonzero(edge_dist <= 60.0))}
+    assert set(zip(within['point'], within['edge'])) == expected
+
+
+def test_persisted_index_is_reused_and_rebuilt_on_change(graph, points, tmp_path, monkeypatch):
+    path = str(tmp_path / 'spatial')
+    first = SpatialIndex.from_graph(graph, path)
+    expected = first.nearest_edges(*points)
+    builds = []
+    original = SpatialIndex._build
+    monkeypatch.setattr(SpatialIndex, '_build', lambda self, *a: builds.append(1) or original(self, *a))
+
+    again = SpatialIndex.from_graph(graph, path)
+    assert builds == []
+    assert again.signature == first.signature
+    assert again.nearest_edges(*points) == expected
+
+    moved = graph.copy()
+    n = next(iter(moved.nodes()))
+    moved.nodes[n]['x'] += 1000.0
+    assert SpatialIndex.from_graph(moved, path).signature != first.signature
+    assert builds == [1]
@@ -0,0 +1,23 @@
+import networkx as nx
+import numpy as np
+from analysis.union_find import percolation_curve
+
+
+def _g1_g2(n, edges):
+    G = nx.Graph()
+    G.add_nodes_from(range(n))
+    G.add_edges_from(edges)
+    sizes = sorted((len(c) for c in nx.connected_components(G)), reverse=True) + [0]
+    return sizes[0], sizes[1]
+
+
+def test_percolation_curve_matches_networkx_components():
+    n = 60
+    G = nx.gnm_random_graph(n, 150, seed=5)
+    src, dst = map(np.array, zip(*G.edges()))
+    order = np.random.default_rng(2).permutation(len(src))
+
+    g1, g2 = percolation_curve(n, src, dst, order)
+    added = [(int(src[e]), int(dst[e])) for e in order]
+    for k in range(len(order) + 1):
+        assert (g1[k], g2[k]) == _g1_g2(n, added[:k]), k
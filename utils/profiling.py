@@ -0,0 +1,200 @@
+import cProfile
+import functools
+import json
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from config.settings import PROFILE_ENABLED, PROFILE_OUTPUT_DIR, PROFILE_MEMORY, PROFILE_CPROFILE
+
+
+def _rss_mb():
+    # RSS atual via /proc (Linux); em outros sistemas cai no pico do processo
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError):
+        return _peak_rss_mb()
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+def graph_size(G) -> dict:
+    # nx.Graph, CompactGraph ou qualquer objeto com number_of_nodes/edges
+    if G is None or not hasattr(G, 'number_of_nodes'):
+        return {}
+    return {'nodes': int(G.number_of_nodes()), 'edges': int(G.number_of_edges())}
+
+
+class Profiler:
+    # Registro de etapas do pipeline: tempo, RSS, pico do tracemalloc, tamanho
+    # dos grafos e contadores. Etapas podem ser aninhadas; a saída é um JSON
+    # com as etapas e um trace no formato do Chrome (chrome://tracing, Perfetto).
+    def __init__(self, enabled=PROFILE_ENABLED, output_dir=PROFILE_OUTPUT_DIR,
+                 memory=PROFILE_MEMORY, cprofile=PROFILE_CPROFILE):
+        self.configure(enabled, output_dir, memory, cprofile)
+        self.reset()
+
+    def configure(self, enabled=None, output_dir=None, memory=None, cprofile=None):
+        if enabled is not None:
+            self.enabled = enabled
+        if output_dir is not None:
+            self.output_dir = output_dir
+        if memory is not None:
+            self.memory = memory
+        if cprofile is not None:
+            # nomes de etapas (ou '*' para todas) com captura do cProfile
+            self.cprofile = set(cprofile)
+
+    def reset(self):
+        self.stages = []
+        self.counters = {}
+        self._stack = []
+        self._active_cprofile = None
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def count(self, name: str, value=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+            if self._stack:
+                frame = self._stack[-1]['counters']
+                frame[name] = frame.get(name, 0) + value
+
+    def annotate(self, **fields):
+        # campos extras (ex.: tamanho do grafo de saída) na etapa corrente
+        if self.enabled and self._stack:
+            self._stack[-1]['args'].update(fields)
+
+    def _wants_cprofile(self, name):
+        return self._active_cprofile is None and ('*' in self.cprofile or name in self.cprofile)
+
+    @contextmanager
+    def stage(self, name: str, graph=None, **fields):
+        if not self.enabled:
+            yield
+            return
+
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        frame = {
+            'name': name, 'args': {**fields, **graph_size(graph)}, 'counters': {},
+            'depth': len(self._stack), 'peak': 0,
+        }
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            # o pico é zerado por etapa; a etapa-mãe guarda o que já tinha visto
+            if self._stack:
+                self._stack[-1]['peak'] = max(self._stack[-1]['peak'], peak)
+            tracemalloc.reset_peak()
+            frame['traced_start'] = current
+        profile = None
+        if self._wants_cprofile(name):
+            profile = cProfile.Profile()
+            self._active_cprofile = profile
+        self._stack.append(frame)
+        rss_start = _rss_mb()
+        start = time.perf_counter()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+                self._active_cprofile = None
+            end = time.perf_counter()
+            self._stack.pop()
+            record = {
+                'name': name,
+                'depth': frame['depth'],
+                'start_s': round(start - self._t0, 6),
+                'wall_s': round(end - start, 6),
+                'rss_mb': round(_rss_mb(), 2),
+                'rss_delta_mb': round(_rss_mb() - rss_start, 2),
+                'rss_peak_mb': round(_peak_rss_mb(), 2),
+                'thread': threading.get_ident(),
+                'args': frame['args'],
+                'counters': frame['counters'],
+            }
+            if self.memory:
+                current, peak = tracemalloc.get_traced_memory()
+                peak = max(peak, frame['peak'])
+                if self._stack:
+                    self._stack[-1]['peak'] = max(self._stack[-1]['peak'], peak)
+                record['traced_peak_mb'] = round((peak - frame['traced_start']) / 2 ** 20, 2)
+                record['traced_delta_mb'] = round((current - frame['traced_start']) / 2 ** 20, 2)
+            if profile is not None:
+                os.makedirs(self.output_dir, exist_ok=True)
+                path = os.path.join(self.output_dir, f"{name.replace('/', '_')}_{len(self.stages)}.prof")
+                profile.dump_stats(path)
+                record['cprofile'] = path
+            # contadores das etapas filhas também contam para a mãe
+            if self._stack:
+                parent = self._stack[-1]['counters']
+                for k, v in frame['counters'].items():
+                    parent[k] = parent.get(k, 0) + v
+            self.stages.append(record)
+
+    def profiled(self, name: str):
+        # decorador: a etapa registra o tamanho do grafo devolvido, se houver
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with self.stage(name):
+                    result = fn(*args, **kwargs)
+                    self.annotate(**{f'out_{k}': v for k, v in graph_size(result).items()})
+                return result
+            return wrapper
+        return decorator
+
+    def chrome_trace(self) -> dict:
+        pid = os.getpid()
+        events = []
+        for s in self.stages:
+            args = {**s['args'], **s['counters'], 'rss_mb': s['rss_mb']}
+            if 'traced_peak_mb' in s:
+                args['traced_peak_mb'] = s['traced_peak_mb']
+            events.append({
+                'name': s['name'], 'ph': 'X', 'pid': pid, 'tid': s['thread'],
+                'ts': s['start_s'] * 1e6, 'dur': s['wall_s'] * 1e6, 'args': args,
+            })
+            events.append({
+                'name': 'rss_mb', 'ph': 'C', 'pid': pid,
+                'ts': (s['start_s'] + s['wall_s']) * 1e6, 'args': {'rss': s['rss_mb']},
+            })
+        return {'traceEvents': sorted(events, key=lambda e: e['ts']), 'displayTimeUnit': 'ms'}
+
+    def save(self, prefix='profile') -> tuple:
+        os.makedirs(self.output_dir, exist_ok=True)
+        report_path = os.path.join(self.output_dir, f'{prefix}.json')
+        trace_path = os.path.join(self.output_dir, f'{prefix}.trace.json')
+        stages = sorted(self.stages, key=lambda s: s['start_s'])
+        with open(report_path, 'w') as f:
+            json.dump({'stages': stages, 'counters': self.counters}, f, indent=2, default=float)
+        with open(trace_path, 'w') as f:
+            json.dump(self.chrome_trace(), f, default=float)
+        return report_path, trace_path
+
+    def summary(self):
+        print(f"\n[Profile] {'etapa':<40} {'tempo (s)':>10} {'RSS (MB)':>10} {'pico tm (MB)':>13}")
+        for s in sorted(self.stages, key=lambda s: s['start_s']):
+            label = '  ' * s['depth'] + s['name']
+            peak = s.get('traced_peak_mb', float('nan'))
+            print(f"[Profile] {label:<40} {s['wall_s']:>10.3f} {s['rss_mb']:>10.1f} {peak:>13.1f}")
+        for name, value in self.counters.items():
+            print(f"[Profile] contador {name}: {value}")
+
+
+# Instância única usada por todo o pipeline
+profiler = Profiler()
@@ -1,6 +1,10 @@
 import networkx as nx
+from data.compact_graph import CompactGraph
 
 def to_simple_graph(G_multidigraph):
+        if isinstance(G_multidigraph, CompactGraph):
+            # SegmentedGraph/CompactGraph: mesma regra (maior grade_abs por par) em arrays
+            return G_multidigraph.to_undirected_simple()
         G_simple = nx.Graph()
         G_simple.add_nodes_from(G_multidigraph.nodes(data=True))
 
@@ -1,99 +1,223 @@
+import os
+import re
+import unicodedata
+from functools import cached_property
+import matplotlib
 import matplotlib.pyplot as plt
-import osmnx as ox
+import numpy as np
+import shapely
+from matplotlib.collections import LineCollection
 from config.settings import *
+from utils.profiling import profiler
 
 class NetworkVisualizer:
-    def __init__(self, G_proj):
+    # Com output_dir (ou PLOT_OUTPUT_DIR) roda sem janela, no backend Agg, e grava
+    # cada figura em arquivo. Coordenadas dos nós e segmentos das arestas são
+    # extraídos uma vez e reaproveitados por todos os gráficos do mesmo grafo.
+    def __init__(self, G_proj, output_dir=PLOT_OUTPUT_DIR, fmt=PLOT_FORMAT,
+                 raster_min_edges=PLOT_RASTER_MIN_EDGES):
         self.G_proj = G_proj
-    
+        self.output_dir = output_dir
+        self.fmt = fmt
+        self.raster = G_proj.number_of_edges() >= raster_min_edges
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+            if matplotlib.get_backend().lower() != 'agg':
+                plt.switch_backend('Agg')
+
+    @cached_property
+    def _nodes(self) -> tuple:
+        nodes = list(self.G_proj.nodes())
+        xs = np.fromiter((self.G_proj.nodes[n]['x'] for n in nodes), dtype=float, count=len(nodes))
+        ys = np.fromiter((self.G_proj.nodes[n]['y'] for n in nodes), dtype=float, count=len(nodes))
+        return nodes, xs, ys
+
+    @cached_property
+    def _segments(self) -> np.ndarray:
+        # (S, 2, 2): todos os trechos retos de todas as arestas, pronto para LineCollection;
+        # arestas sem geometria viram a reta entre os nós, como no ox.plot_graph
+        nodes, xs, ys = self._nodes
+        index = {n: i for i, n in enumerate(nodes)}
+        geoms, straight = [], []
+        for u, v, geom in self.G_proj.edges(data='geometry'):
+            if geom is None:
+                straight.append((index[u], index[v]))
+            else:
+                geoms.append(geom)
+        parts = []
+        if geoms:
+            coords, idx = shapely.get_coordinates(np.asarray(geoms, dtype=object), return_index=True)
+            same = idx[1:] == idx[:-1]
+            parts.append(np.stack((coords[:-1][same], coords[1:][same]), axis=1))
+        if straight:
+            u, v = np.asarray(straight).T
+            parts.append(np.stack((np.column_stack((xs[u], ys[u])), np.column_stack((xs[v], ys[v]))), axis=1))
+        return np.concatenate(parts) if parts else np.empty((0, 2, 2))
+
+    @cached_property
+    def _extent(self) -> tuple:
+        seg = self._segments.reshape(-1, 2)
+        _, xs, ys = self._nodes
+        allx = np.concatenate((seg[:, 0], xs))
+        ally = np.concatenate((seg[:, 1], ys))
+        return allx.min(), allx.max(), ally.min(), ally.max()
+
+    @cached_property
+    def _bins(self) -> tuple:
+        x0, x1, y0, y1 = self._extent
+        span = max(x1 - x0, y1 - y0, 1e-9)
+        pixel = span / PLOT_RASTER_RESOLUTION
+        nx_bins = max(1, int(np.ceil((x1 - x0) / pixel)))
+        ny_bins = max(1, int(np.ceil((y1 - y0) / pixel)))
+        return pixel, (np.linspace(x0, x0 + nx_bins * pixel, nx_bins + 1),
+                       np.linspace(y0, y0 + ny_bins * pixel, ny_bins + 1))
+
+    @cached_property
+    def _edge_density(self) -> np.ndarray:
+        # Modo raster: cada trecho amostrado a cada ~meio pixel e agregado num
+        # histograma 2D; custo limitado pela resolução, não pelo nº de arestas.
+        pixel, (bx, by) = self._bins
+        seg = self._segments
+        d = seg[:, 1] - seg[:, 0]
+        n = np.maximum(1, np.ceil(np.hypot(d[:, 0], d[:, 1]) / (pixel / 2)).astype(np.int64))
+        t = (np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)) / np.repeat(n, n)
+        pts = np.repeat(seg[:, 0], n, axis=0) + np.repeat(d, n, axis=0) * t[:, None]
+        H, _, _ = np.histogram2d(pts[:, 0], pts[:, 1], bins=(bx, by))
+        return H.T
+
+    def _new_axes(self):
+        fig, ax = plt.subplots(figsize=(8, 8), facecolor=BACKGROUND_COLOR)
+        ax.set_facecolor(BACKGROUND_COLOR)
+        ax.set_aspect('equal')
+        ax.axis('off')
+        x0, x1, y0, y1 = self._extent
+        mx, my = (x1 - x0) * 0.02, (y1 - y0) * 0.02
+        ax.set_xlim(x0 - mx, x1 + mx)
+        ax.set_ylim(y0 - my, y1 + my)
+        return fig, ax
+
+    def _draw_edges(self, ax, color, width):
+        if self.raster:
+            H = self._edge_density
+            if H.max() > 0:
+                # tons da cor da aresta proporcionais a log(densidade), fundo transparente
+                rgba = np.zeros(H.shape + (4,))
+                rgba[..., :3] = matplotlib.colors.to_rgb(color)
+                rgba[..., 3] = np.where(H > 0, 0.3 + 0.7 * np.log1p(H) / np.log1p(H.max()), 0.0)
+                _, (bx, by) = self._bins
+                ax.imshow(rgba, origin='lower', extent=(bx[0], bx[-1], by[0], by[-1]),
+                          interpolation='nearest', zorder=1)
+        else:
+            ax.add_collection(LineCollection(self._segments, colors=color, linewidths=width, zorder=1))
+
+    def _node_values(self, attribute) -> np.ndarray:
+        nodes, _, _ = self._nodes
+        return np.fromiter((self.G_proj.nodes[n].get(attribute, 0) or 0 for n in nodes),
+                           dtype=float, count=len(nodes))
+
+    def _finish(self, fig, name):
+        if not self.output_dir:
+            plt.show()
+            return None
+        ascii_name = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode()
+        slug = re.sub(r'[^a-z0-9]+', '_', ascii_name.lower()).strip('_')
+        path = os.path.join(self.output_dir, f"{slug}.{self.fmt}")
+        fig.savefig(path, dpi=PLOT_DPI, facecolor=fig.get_facecolor())
+        plt.close(fig)
+        print(f"[Viz] Figura salva em {path}")
+        return path
+
+    @profiler.profiled('viz.plot_basic_network')
     def plot_basic_network(self, title: str, stats: dict = None):
-        fig, ax = ox.plot_graph(
-            self.G_proj,
-            node_size=DEFAULT_NODE_SIZE,
-            edge_color=DEFAULT_EDGE_COLOR,
-            edge_linewidth=DEFAULT_EDGE_WIDTH,
-            bgcolor=BACKGROUND_COLOR,
-            show=False
-        )
-        
+        fig, ax = self._new_axes()
+        self._draw_edges(ax, DEFAULT_EDGE_COLOR, DEFAULT_EDGE_WIDTH)
+        if not self.raster:
+            _, xs, ys = self._nodes
+            ax.scatter(xs, ys, s=DEFAULT_NODE_SIZE, c=DEFAULT_NODE_COLOR, linewidths=0, zorder=2)
+
         if stats:
             info_text = f"Nós: {stats['nodes']}\nArestas: {stats['edges']}"
             ax.text(0.95, 0.05, info_text, transform=ax.transAxes,
                    ha='right', va='bottom', fontsize=10,
                    bbox=dict(boxstyle='round,pad=0.5', facecolor='white'))
-        
+
         plt.title(title)
-        plt.show()
-    
+        return self._finish(fig, title)
+
+    @profiler.profiled('viz.plot_centrality_heatmap')
     def plot_centrality_heatmap(self, attribute='betweenness', cmap='plasma', title="Mapa de Centralidade"):
-        nc = ox.plot.get_node_colors_by_attr(self.G_proj, attribute, cmap=cmap)
-        
-        fig, ax = ox.plot_graph(
-            self.G_proj,
-            node_color=nc,
-            node_size=30,
-            edge_color='#333333',
-            edge_linewidth=0.5,
-            bgcolor=BACKGROUND_COLOR,
-            show=False
-        )
-        
-        values = [self.G_proj.nodes[n].get(attribute, 0) for n in self.G_proj.nodes()]
-        sm = plt.cm.ScalarMappable(cmap=cmap, 
-                                   norm=plt.Normalize(vmin=min(values), vmax=max(values)))
+        values = self._node_values(attribute)
+        norm = plt.Normalize(vmin=values.min(), vmax=values.max()) if len(values) else plt.Normalize()
+
+        fig, ax = self._new_axes()
+        self._draw_edges(ax, '#333333', 0.5)
+        _, xs, ys = self._nodes
+        if self.raster:
+            # média do atributo em células de 8x8 pixels
+            _, (bx, by) = self._bins
+            bx, by = bx[::8], by[::8]
+            total, _, _ = np.histogram2d(xs, ys, bins=(bx, by), weights=values)
+            count, _, _ = np.histogram2d(xs, ys, bins=(bx, by))
+            mean = np.divide(total, count, out=np.full_like(total, np.nan), where=count > 0).T
+            ax.imshow(np.ma.masked_invalid(mean), origin='lower', extent=(bx[0], bx[-1], by[0], by[-1]),
+                      cmap=cmap, norm=norm, interpolation='nearest', zorder=2)
+        else:
+            ax.scatter(xs, ys, s=30, c=values, cmap=cmap, norm=norm, linewidths=0, zorder=2)
+
+        sm = plt.cm.ScalarMappable(cmap=cmap, norm=norm)
         sm._A = []
         cbar = plt.colorbar(sm, ax=ax, shrink=0.5)
         cbar.set_label(f'{attribute.capitalize()}')
-        
+
         plt.title(title)
-        plt.show()
-    
+        return self._finish(fig, title)
+
+    @profiler.profiled('viz.plot_percolation_results')
     def plot_percolation_results(self, results: dict, title = "Remoção de Arestas Aleatórias"):
         fig, ax1 = plt.subplots(figsize=(10, 6))
-        
+
         # G1
-        ax1.plot(results['fractions'], results['avg_G1'], 
+        ax1.plot(results['fractions'], results['avg_G1'],
                 color='tab:blue', linewidth=2, label='G1')
         ax1.set_xlabel('Fração Removida (f)')
         ax1.set_ylabel('G1/N', color='tab:blue')
         ax1.grid(True, alpha=0.3)
-        
+
         # G2
         ax2 = ax1.twinx()
-        ax2.plot(results['fractions'], results['avg_G2'], 
+        ax2.plot(results['fractions'], results['avg_G2'],
                 color='tab:red', linewidth=2, linestyle='--', label='G2')
         ax2.set_ylabel('G2/N', color='tab:red')
-        
+
         # Limiar crítico
-        plt.axvline(x=results['critical_threshold'], color='green', 
+        plt.axvline(x=results['critical_threshold'], color='green',
                    linestyle=':', label=f"f*={results['critical_threshold']:.2f}")
-        
+
         plt.title("Análise de Percolação")
         plt.tight_layout()
-        plt.show()
-        
+        return self._finish(fig, title)
+
+    @profiler.profiled('viz.plot_centrality_divergence')
     def plot_centrality_divergence(self, top_topo, top_metric):
-        node_colors = ['#dddddd' for _ in self.G_proj.nodes()]
-        node_sizes = [10 for _ in self.G_proj.nodes()]
-        node_to_idx = {node: i for i, node in enumerate(self.G_proj.nodes())}
-
-        for node, _ in top_topo:
-            if node in node_to_idx:
-                idx = node_to_idx[node]
-                node_colors[idx] = 'blue'
-                node_sizes[idx] = 100
-
-        for node, _ in top_metric:
-            if node in node_to_idx:
-                idx = node_to_idx[node]
-                node_colors[idx] = 'red'
-                node_sizes[idx] = 100
-
-        fig, ax = ox.plot_graph(self.G_proj, node_color=node_colors, node_size=node_sizes,
-                                edge_color='#999999', edge_linewidth=0.5,
-                                bgcolor='white', show=False)
-        
-        ax.text(0.05, 0.95, "AZUL: Topológico (Estrutura)\nVERMELHO: Métrico (Distância)", 
+        nodes, xs, ys = self._nodes
+        node_colors = np.full(len(nodes), '#dddddd', dtype=object)
+        node_sizes = np.full(len(nodes), 10.0)
+        node_to_idx = {node: i for i, node in enumerate(nodes)}
+
+        for nodes_top, color in ((top_topo, 'blue'), (top_metric, 'red')):
+            for node, _ in nodes_top:
+                if node in node_to_idx:
+                    idx = node_to_idx[node]
+                    node_colors[idx] = color
+                    node_sizes[idx] = 100
+
+        fig, ax = self._new_axes()
+        self._draw_edges(ax, '#999999', 0.5)
+        # no modo raster só os nós destacados são desenhados
+        show = node_sizes > 10 if self.raster else slice(None)
+        ax.scatter(xs[show], ys[show], s=node_sizes[show], c=node_colors[show].tolist(), linewidths=0, zorder=2)
+
+        ax.text(0.05, 0.95, "AZUL: Topológico (Estrutura)\nVERMELHO: Métrico (Distância)",
                 transform=ax.transAxes, bbox=dict(boxstyle='round', facecolor='white'))
         plt.title("Divergência de Centralidade")
-        plt.show()
\ No newline at end of file
+        return self._finish(fig, "Divergência de Centralidade")